@@ -0,0 +1,90 @@
+# pylint: disable=attribute-defined-outside-init
+"""Module for providing a requests transport adapter that times connection phases."""
+import socket
+import threading
+from time import perf_counter
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+_phase_timings = threading.local()
+
+
+def start_phase_timings() -> dict:
+    """Returns an empty dict in which connections opened by the calling thread
+    record the duration of their dns, connect and tls phases in seconds."""
+    _phase_timings.current = {}
+    return _phase_timings.current
+
+
+def _record_phase(phase, duration):
+    timings = getattr(_phase_timings, 'current', None)
+    if timings is not None:
+        timings[phase] = duration
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """HTTP connection resolving the host itself, so name resolution and
+    TCP connect are timed as separate phases."""
+
+    def _new_conn(self):
+        start_time = perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port,
+                                           allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as error:
+            raise NewConnectionError(
+                self, f"Failed to establish a new connection: {error}") from error
+        _record_phase('dns', perf_counter() - start_time)
+
+        dns_host = self._dns_host
+        start_time = perf_counter()
+        try:
+            for index, address in enumerate(addresses):
+                # Connect to the resolved address, TLS still uses the original host.
+                self._dns_host = address[4][0]
+                try:
+                    conn = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+        _record_phase('connect', perf_counter() - start_time)
+        return conn
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """HTTPS connection additionally timing the TLS handshake."""
+
+    def connect(self):
+        start_time = perf_counter()
+        super().connect()
+        timings = getattr(_phase_timings, 'current', None) or {}
+        _record_phase('tls', perf_counter() - start_time
+                      - timings.get('dns', 0) - timings.get('connect', 0))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """Connection pool using TimedHTTPConnection."""
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """Connection pool using TimedHTTPSConnection."""
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Transport adapter whose connections record phase timings, see
+    start_phase_timings."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
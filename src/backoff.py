@@ -0,0 +1,35 @@
+"""Module for spreading reconnects of many subscriptions over time."""
+import random
+import threading
+from time import monotonic
+
+
+def full_jitter(attempt: int, base: float, cap: float) -> float:
+    """Returns a random delay between zero and the exponential backoff of the
+    attempt, capped at cap seconds."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket():  # pylint: disable=too-few-public-methods
+    """A token bucket shared between threads, refilling rate tokens per
+    second up to burst tokens."""
+
+    def __init__(self, rate: float, burst: float):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns the seconds the caller has to wait until
+        it is available. Callers in excess of the burst queue up behind each
+        other instead of failing."""
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
@@ -0,0 +1,97 @@
+"""Module for encoding and decoding JSON with the fastest library installed."""
+import json
+from json.decoder import JSONDecodeError
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class StdlibCodec():
+    """Codec using the json module of the standard library."""
+    name = 'json'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def decode(self, data):
+        """Returns the object decoded from JSON text or bytes."""
+        return json.loads(data)
+
+    def encode_text(self, obj) -> str:
+        """Returns the compact JSON text of obj."""
+        return self._encoder.encode(obj)
+
+    def encode(self, obj) -> bytes:
+        """Returns the compact JSON text of obj encoded as UTF-8."""
+        return self.encode_text(obj).encode('utf-8')
+
+
+class OrjsonCodec():
+    """Codec using orjson. Integers beyond 64 bit are decoded as floats."""
+    name = 'orjson'
+
+    def decode(self, data):
+        """Returns the object decoded from JSON text or bytes."""
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError.
+        return orjson.loads(data)  # pylint: disable=no-member
+
+    def encode_text(self, obj) -> str:
+        """Returns the compact JSON text of obj."""
+        return orjson.dumps(obj).decode('utf-8')  # pylint: disable=no-member
+
+    def encode(self, obj) -> bytes:
+        """Returns the compact JSON text of obj encoded as UTF-8."""
+        return orjson.dumps(obj)  # pylint: disable=no-member
+
+
+class MsgspecCodec():
+    """Codec using msgspec."""
+    name = 'msgspec'
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+
+    def decode(self, data):
+        """Returns the object decoded from JSON text or bytes."""
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as error:
+            text = data if isinstance(data, str) else data.decode('utf-8', 'replace')
+            raise JSONDecodeError(str(error), text, 0) from error
+
+    def encode_text(self, obj) -> str:
+        """Returns the compact JSON text of obj."""
+        return self._encoder.encode(obj).decode('utf-8')
+
+    def encode(self, obj) -> bytes:
+        """Returns the compact JSON text of obj encoded as UTF-8."""
+        return self._encoder.encode(obj)
+
+
+CODECS = {'orjson': OrjsonCodec, 'msgspec': MsgspecCodec, 'json': StdlibCodec}
+# Libraries the codecs depend on, None if not installed.
+CODEC_LIBRARIES = {'orjson': orjson, 'msgspec': msgspec, 'json': json}
+
+
+def available_codecs() -> list:
+    """Returns the names of the codecs whose library is installed, fastest first."""
+    return [name for name in CODECS if CODEC_LIBRARIES[name] is not None]
+
+
+def get_codec(name=None):
+    """Returns the codec called name, or the fastest one installed. Every codec
+    raises json.JSONDecodeError for malformed input."""
+    if name is None:
+        name = available_codecs()[0]
+    if CODEC_LIBRARIES[name] is None:
+        raise ValueError(f"JSON codec {name} is not installed")
+    return CODECS[name]()
+
+
+codec = get_codec()
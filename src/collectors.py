@@ -1,9 +1,38 @@
+# pylint: disable=too-many-lines
 """Module for providing interfaces to interact with https and websocket RPC endpoints."""
-from interfaces import WebsocketInterface, HttpsInterface
+import functools
+from time import monotonic, time
+from interfaces import WebsocketInterface, WebsocketSubscription, ZmqSubscription, HttpsInterface
 from helpers import validate_dict_and_return_key_value, strip_url
+from heads import HeadArrivalIndex
+from prepared import PreparedRequest
+from log import logger
+
+CLIENT_VERSION_REFRESH_INTERVAL = 300
+# Pushed blockchain info is polled again after this many learned notification
+# intervals without a notification, and at the latest after
+# BLOCKCHAIN_INFO_MAX_AGE seconds, three mean Bitcoin block intervals.
+BLOCKCHAIN_INFO_MAX_AGE_MULTIPLE = 3
+BLOCKCHAIN_INFO_MAX_AGE = 1800
+NOTIFICATION_INTERVAL_EWMA_ALPHA = 0.1
+# Conflux epoch tags and the label their lag behind the head is exported with.
+CONFLUX_EPOCH_TAGS = {
+    'latest_confirmed': 'confirmed',
+    'latest_finalized': 'finalized',
+    'latest_state': 'state'
+}
+SOLANA_COMMITMENTS = ('processed', 'confirmed', 'finalized')
+# Error code of getHealth while the node is behind the cluster.
+SOLANA_NODE_UNHEALTHY_CODE = -32005
+XRPL_SYNCED_SERVER_STATES = ('full', 'validating', 'proposing')
+
 
 class EvmCollector():
     """A collector to fetch information about evm compatible RPC endpoints."""
+    # Read from the subscription, so the probes are not submitted to the executor.
+    INLINE_PROBES = ('alive', 'block_height')
+    # Shared by all subscriptions of a chain to compare head arrival between providers.
+    _head_arrivals = {}
 
     def __init__(self, url, labels, chain_id, **client_parameters):
         self.labels = labels
@@ -15,10 +44,29 @@ class EvmCollector():
             "id": chain_id,
             "params": ["newHeads"]
         }
+        rpc_probe_payload = {
+            "method": 'eth_blockNumber',
+            "jsonrpc": "2.0",
+            "params": []
+        }
+        head_arrivals = self._head_arrivals.setdefault(chain_id, HeadArrivalIndex())
         self.interface = WebsocketInterface(
-            url, sub_payload, **client_parameters)
+            url, sub_payload, rpc_probe_payload=rpc_probe_payload,
+            head_number_key='number', head_arrivals=head_arrivals, **client_parameters)
         self.interface.daemon = True
         self.interface.start()
+        self.finalized_block_height_request = PreparedRequest({
+            "jsonrpc": "2.0",
+            "method": "eth_getBlockByNumber",
+            "params": ["finalized", False],
+            "id": chain_id
+        })
+        self.client_version_request = PreparedRequest({
+            "jsonrpc": "2.0",
+            "method": "web3_clientVersion",
+            "params": [],
+            "id": chain_id
+        })
 
     def alive(self):
         """Returns if the websocket subscription is healthy."""
@@ -30,14 +78,7 @@ class EvmCollector():
 
     def finalized_block_height(self):
         """Runs a query to return finalized block height"""
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "eth_getBlockByNumber",
-            "params": ["finalized", False],
-            "id": self.chain_id
-        }
-
-        finalized_block = self.interface.query(payload)
+        finalized_block = self.interface.query(self.finalized_block_height_request)
         if finalized_block is None:
             return None
         block_number_hex = finalized_block.get('number')
@@ -59,13 +100,7 @@ class EvmCollector():
 
     def client_version(self):
         """Runs a cached query to return client version."""
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "web3_clientVersion",
-            "params": [],
-            "id": self.chain_id
-        }
-        version = self.interface.cached_query(payload)
+        version = self.interface.cached_query(self.client_version_request)
         if version is None:
             return None
         client_version = {"client_version": version}
@@ -73,6 +108,8 @@ class EvmCollector():
 
 class ConfluxCollector():
     """A collector to fetch information about conflux RPC endpoints."""
+    # Read from the subscription, so the probes are not submitted to the executor.
+    INLINE_PROBES = ('alive', 'block_height')
 
     def __init__(self, url, labels, chain_id, **client_parameters):
         self.labels = labels
@@ -84,11 +121,36 @@ class ConfluxCollector():
             "id": chain_id,
             "params": ["newHeads"]
         }
+        rpc_probe_payload = {
+            "method": 'cfx_epochNumber',
+            "jsonrpc": "2.0",
+            "params": ["latest_mined"]
+        }
+        self.epoch_number_request = PreparedRequest([{
+            "method": 'cfx_epochNumber',
+            "jsonrpc": "2.0",
+            "params": [tag]
+        } for tag in CONFLUX_EPOCH_TAGS])
+        self.client_version_request = PreparedRequest({
+            "jsonrpc": "2.0",
+            "method": "cfx_clientVersion",
+            "params": [],
+            "id": chain_id
+        })
         self.interface = WebsocketInterface(
-            url, sub_payload, **client_parameters)
+            url, sub_payload, rpc_probe_payload=rpc_probe_payload, **client_parameters)
         self.interface.daemon = True
         self.interface.start()
 
+    def _epoch_numbers(self):
+        """Returns the epoch number of each tag, requested over the open
+        subscription socket once per scrape."""
+        results = self.interface.cached_request(self.epoch_number_request)
+        if results is None:
+            return None
+        return {CONFLUX_EPOCH_TAGS[tag]: int(result, 16)
+                for tag, result in zip(CONFLUX_EPOCH_TAGS, results) if result is not None}
+
     def alive(self):
         """Returns if the websocket subscription is healthy."""
         return self.interface.healthy
@@ -97,6 +159,23 @@ class ConfluxCollector():
         """Returns latest block height."""
         return self.interface.get_message_property_to_hex('height')
 
+    def finalized_block_height(self):
+        """Returns the latest finalized epoch number."""
+        epoch_numbers = self._epoch_numbers()
+        if epoch_numbers is None:
+            return None
+        return epoch_numbers.get('finalized')
+
+    def head_lag(self):
+        """Returns how many epochs the confirmed, finalized and executed state
+        epochs trail the epoch of the latest head. The head height counts
+        blocks, not epochs, so it is not compared."""
+        head = self.interface.get_message_property_to_hex('epochNumber')
+        epoch_numbers = self._epoch_numbers()
+        if head is None or epoch_numbers is None:
+            return None
+        return {tag: head - epoch_number for tag, epoch_number in epoch_numbers.items()}
+
     def heads_received(self):
         """Returns amount of received messages from the subscription."""
         return self.interface.heads_received
@@ -111,13 +190,7 @@ class ConfluxCollector():
 
     def client_version(self):
         """Runs a cached query to return client version."""
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "cfx_clientVersion",
-            "params": [],
-            "id": self.chain_id
-        }
-        version = self.interface.cached_query(payload)
+        version = self.interface.cached_query(self.client_version_request)
         if version is None:
             return None
         client_version = {"client_version": version}
@@ -126,6 +199,8 @@ class ConfluxCollector():
 
 class CardanoCollector():
     """A collector to fetch information about cardano RPC endpoints."""
+    # Read from the subscription, so the probes are not submitted to the executor.
+    INLINE_PROBES = ('alive', 'block_height')
 
     def __init__(self, url, labels, chain_id, **client_parameters):
         self.labels = labels
@@ -135,28 +210,36 @@ class CardanoCollector():
             "jsonrpc": "2.0",
             "method": "queryNetwork/blockHeight"
         }
+        # Ogmios has no push notification for the tip, the block height is
+        # polled over a single long lived connection instead.
         self.interface = WebsocketInterface(
-            url, **client_parameters)
-        self.interface.daemon = None
+            url, rpc_probe_payload=self.block_height_payload, **client_parameters)
+        self.interface.daemon = True
+        self.interface.start()
 
     def alive(self):
         """Returns true if endpoint is alive, false if not."""
-        return self.interface.cached_query(self.block_height_payload,
-                                           skip_checks=True) is not None
+        return self.interface.healthy
 
     def block_height(self):
-        """Returns latest block height."""
-        return self.interface.cached_query(self.block_height_payload, skip_checks=True)
+        """Returns latest polled block height."""
+        return self.interface.latest_probe_result
 
     def latency(self):
-        """Returns connection latency."""
-        return self.interface.latest_query_latency
+        """Returns the round trip of the latest block height query. The query
+        reuses the open connection, so no handshake is included."""
+        return self.interface.latest_probe_latency
 
 
-class BitcoinCollector():
-    """A collector to fetch information about Bitcoin RPC endpoints."""
+class BitcoinCollector():  # pylint: disable=too-many-instance-attributes
+    """A collector to fetch information about Bitcoin RPC endpoints. All probes
+    are served by one JSON-RPC batch per scrape. When a ZMQ subscribe_url is
+    configured, blockchain info is refreshed on every hashblock notification
+    and only requested in the batch if none arrived for a few learned
+    notification intervals, capped by the blockchain_info_max_age connection
+    parameter."""
 
-    def __init__(self, url, labels, chain_id, **client_parameters):
+    def __init__(self, url, labels, chain_id, subscribe_url=None, **client_parameters):
 
         self.labels = labels
         self.chain_id = chain_id
@@ -168,48 +251,151 @@ class BitcoinCollector():
         }
         self.network_info_payload = {
             "jsonrpc": "1.0",
-            "id": "exporter",
+            "id": "getnetworkinfo",
             "method": "getnetworkinfo"
         }
         self.blockchain_info_payload = {
             "jsonrpc": "1.0",
-            "id": "exporter",
+            "id": "getblockchaininfo",
             "method": "getblockchaininfo",
             "params": []
         }
+        self.chain_tips_payload = {
+            "jsonrpc": "1.0",
+            "id": "getchaintips",
+            "method": "getchaintips",
+            "params": []
+        }
+        self.mempool_info_payload = {
+            "jsonrpc": "1.0",
+            "id": "getmempoolinfo",
+            "method": "getmempoolinfo",
+            "params": []
+        }
+        self.blockchain_info_request = PreparedRequest(self.blockchain_info_payload)
+        # The batch without blockchain info is sent while notifications arrive.
+        self.batch_requests = {
+            notified: PreparedRequest(
+                [self.network_info_payload, self.chain_tips_payload, self.mempool_info_payload] +
+                ([] if notified else [self.blockchain_info_payload]))
+            for notified in (False, True)
+        }
+        self.subscription = None
+        self._blockchain_info = None
+        self._blockchain_info_updated = None
+        self._last_notification = None
+        self.notification_interval = None
+        self._blockchain_info_max_age = client_parameters.get(
+            'blockchain_info_max_age', BLOCKCHAIN_INFO_MAX_AGE)
+        if subscribe_url is not None:
+            self.subscription = ZmqSubscription(
+                subscribe_url, [b'hashblock'], self._on_notification)
+            self.subscription.daemon = True
+            self.subscription.start()
+
+    def _on_notification(self, topic, body):  # pylint: disable=unused-argument
+        """Refreshes blockchain info when the node announces a new block."""
+        arrival = monotonic()
+        if self._last_notification is not None:
+            gap = arrival - self._last_notification
+            if self.notification_interval is None:
+                self.notification_interval = gap
+            else:
+                self.notification_interval += NOTIFICATION_INTERVAL_EWMA_ALPHA * (
+                    gap - self.notification_interval)
+        self._last_notification = arrival
+        blockchain_info = self.interface.json_rpc_post(self.blockchain_info_request)
+        if blockchain_info is not None:
+            self._blockchain_info = blockchain_info
+            self._blockchain_info_updated = monotonic()
+
+    @property
+    def blockchain_info_max_age(self):
+        """Returns seconds pushed blockchain info is used without a new
+        notification, a few notification intervals once they were learned."""
+        if self.notification_interval is None:
+            return self._blockchain_info_max_age
+        return min(self._blockchain_info_max_age,
+                   BLOCKCHAIN_INFO_MAX_AGE_MULTIPLE * self.notification_interval)
+
+    def _has_recent_notification(self):
+        return self._blockchain_info_updated is not None and \
+            monotonic() - self._blockchain_info_updated <= self.blockchain_info_max_age
+
+    def _batch_request(self):
+        """Returns the scrape batch. The batch is cached, so every probe of a
+        scrape shares one request regardless of the order the probes run in."""
+        return self.batch_requests[self._has_recent_notification()]
+
+    def _result(self, request_id):
+        return self.interface.cached_json_rpc_batch_result(self._batch_request(), request_id)
+
+    def _get_blockchain_info(self):
+        """Returns blockchain info, pushed by notifications when subscribed."""
+        if self._has_recent_notification():
+            return self._blockchain_info
+        return self._result('getblockchaininfo')
 
     def alive(self):
         """Returns true if endpoint is alive, false if not."""
-        # Run cached query because we can also fetch client version from this
-        # later on. This will save us an RPC call per run.
-        return self.interface.cached_json_rpc_post(self.network_info_payload) is not None
+        return self.interface.cached_json_rpc_batch_results(self._batch_request()) is not None
 
     def block_height(self):
-        """Returns latest block height. Cache is cleared when total_difficulty is fetched.
-        In order for this collector to work, alive and block_height calls need to be
-        followed with total_difficulty and client_version calls so the cache is cleared."""
-        blockchain_info = self.interface.cached_json_rpc_post(
-            self.blockchain_info_payload)
+        """Returns latest block height."""
         return validate_dict_and_return_key_value(
-            blockchain_info, 'blocks', self._logger_metadata)
+            self._get_blockchain_info(), 'blocks', self._logger_metadata)
 
     def total_difficulty(self):
-        """Gets total difficulty from a previous call and clears the cache."""
-        blockchain_info = self.interface.cached_json_rpc_post(
-            self.blockchain_info_payload)
+        """Returns the difficulty of the latest block."""
+        return validate_dict_and_return_key_value(
+            self._get_blockchain_info(), 'difficulty', self._logger_metadata)
+
+    def syncing(self):
+        """Returns 1 while the node is in initial block download."""
+        initial_block_download = validate_dict_and_return_key_value(
+            self._get_blockchain_info(), 'initialblockdownload', self._logger_metadata)
+        if initial_block_download is None:
+            return None
+        return int(initial_block_download)
+
+    def peer_count(self):
+        """Returns the number of peer connections."""
+        return validate_dict_and_return_key_value(
+            self._result('getnetworkinfo'), 'connections', self._logger_metadata)
+
+    def chain_tips(self):
+        """Returns the number of known chain tips by status. Besides the
+        active tip, these are forks the node has seen headers or blocks of."""
+        chain_tips = self._result('getchaintips')
+        if not isinstance(chain_tips, list):
+            return None
+        counts = {}
+        for tip in chain_tips:
+            status = validate_dict_and_return_key_value(
+                tip, 'status', self._logger_metadata, stringify=True)
+            if status is not None:
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def mempool_size(self):
+        """Returns the number of transactions in the mempool."""
+        return validate_dict_and_return_key_value(
+            self._result('getmempoolinfo'), 'size', self._logger_metadata)
+
+    def mempool_bytes(self):
+        """Returns the sum of virtual sizes of mempool transactions."""
         return validate_dict_and_return_key_value(
-            blockchain_info, 'difficulty', self._logger_metadata)
+            self._result('getmempoolinfo'), 'bytes', self._logger_metadata)
 
     def client_version(self):
-        """Runs a cached query to return client version."""
-        blockchain_info = self.interface.cached_json_rpc_post(
-            self.network_info_payload)
+        """Returns client version from network info."""
+        network_info = self._result('getnetworkinfo')
         version = validate_dict_and_return_key_value(
-            blockchain_info, 'version', self._logger_metadata, stringify=True)
+            network_info, 'version', self._logger_metadata, stringify=True)
         subversion = validate_dict_and_return_key_value(
-            blockchain_info, 'subversion', self._logger_metadata, stringify=True)
+            network_info, 'subversion', self._logger_metadata, stringify=True)
         protocol_version = validate_dict_and_return_key_value(
-            blockchain_info, 'protocolversion', self._logger_metadata, stringify=True)
+            network_info, 'protocolversion', self._logger_metadata, stringify=True)
         if version is None:
             return None
         client_version = {
@@ -235,37 +421,33 @@ class FilecoinCollector():
             'component': 'FilecoinCollector',
             'url': strip_url(url)
         }
-        self.client_version_payload = {
+        self.client_version_request = PreparedRequest({
             'jsonrpc': '2.0',
             'method': "Filecoin.Version",
             'id': 1
-        }
-        self.block_height_payload = {
+        })
+        self.block_height_request = PreparedRequest({
             'jsonrpc': '2.0',
             'method': "Filecoin.ChainHead",
             'id': 1
-        }
+        })
 
     def alive(self):
         """Returns true if endpoint is alive, false if not."""
         # Run cached query because we can also fetch client version from this
         # later on. This will save us an RPC call per run.
         return self.interface.cached_json_rpc_post(
-            self.client_version_payload) is not None
+            self.client_version_request) is not None
 
     def block_height(self):
-        """Returns latest block height. Cache is cleared when total_difficulty is fetched.
-        In order for this collector to work, alive and block_height calls need to be
-        followed with total_difficulty and client_version calls so the cache is cleared."""
-        blockchain_info = self.interface.cached_json_rpc_post(
-            self.block_height_payload)
-        return validate_dict_and_return_key_value(
-            blockchain_info, 'Height', self._logger_metadata)
+        """Returns latest block height. Only the Height of the chain head tipset
+        is extracted, its block headers are skipped as the response streams in."""
+        return self.interface.json_rpc_post_field(self.block_height_request, ('Height',))
 
     def client_version(self):
         """Runs a cached query to return client version."""
         blockchain_info = self.interface.cached_json_rpc_post(
-            self.client_version_payload)
+            self.client_version_request)
         version = validate_dict_and_return_key_value(
             blockchain_info, 'Version', self._logger_metadata, stringify=True)
         api_version = validate_dict_and_return_key_value(
@@ -281,10 +463,16 @@ class FilecoinCollector():
         return self.interface.latest_query_latency
 
 
-class SolanaCollector():
-    """A collector to fetch information about solana RPC endpoints."""
+class SolanaCollector():  # pylint: disable=too-many-instance-attributes
+    """A collector to fetch information about solana RPC endpoints. Over https
+    all probes are served by one JSON-RPC batch per scrape. When a
+    subscribe_url is configured, slots are pushed over a websocket subscription
+    and https is only used for the block height and occasional version queries."""
+    INLINE_PROBES = ()
+    # Read from the subscription, so the probes are not submitted to the executor.
+    SUBSCRIPTION_INLINE_PROBES = ('alive', 'slots', 'slot_lag', 'syncing')
 
-    def __init__(self, url, labels, chain_id, **client_parameters):
+    def __init__(self, url, labels, chain_id, subscribe_url=None, **client_parameters):
 
         self.labels = labels
         self.chain_id = chain_id
@@ -297,45 +485,130 @@ class SolanaCollector():
         self.client_version_payload = {
             'jsonrpc': '2.0',
             'method': "getVersion",
-            'id': 1
+            'id': "getVersion"
         }
         self.block_height_payload = {
             'jsonrpc': '2.0',
             'method': "getBlockHeight",
-            'id': 1
+            'id': "getBlockHeight"
         }
+        self.health_payload = {
+            'jsonrpc': '2.0',
+            'method': "getHealth",
+            'id': "getHealth"
+        }
+        self.slot_payloads = [{
+            'jsonrpc': '2.0',
+            'method': "getSlot",
+            'params': [{'commitment': commitment}],
+            'id': f"getSlot:{commitment}"
+        } for commitment in SOLANA_COMMITMENTS]
+        self.batch_payloads = [self.client_version_payload, self.block_height_payload,
+                               self.health_payload, *self.slot_payloads]
+        self.batch_request = PreparedRequest(self.batch_payloads)
+        self.client_version_request = PreparedRequest(self.client_version_payload)
+        self.block_height_request = PreparedRequest(self.block_height_payload)
+        self.subscription = None
+        self._client_version = None
+        self._client_version_updated = None
+        if subscribe_url is not None:
+            sub_payload = [{
+                'jsonrpc': '2.0',
+                'method': "slotSubscribe",
+                'id': 1
+            }, {
+                'jsonrpc': '2.0',
+                'method': "rootSubscribe",
+                'id': 2
+            }]
+            self.subscription = WebsocketSubscription(
+                subscribe_url, sub_payload, **client_parameters)
+            self.subscription.daemon = True
+            self.subscription.start()
+            self.INLINE_PROBES = self.SUBSCRIPTION_INLINE_PROBES  # pylint: disable=invalid-name
+
+    def _processed_slot(self):
+        notification = self.subscription.latest_notifications.get('slotNotification')
+        return validate_dict_and_return_key_value(
+            notification, 'slot', self._logger_metadata) if notification is not None else None
 
     def alive(self):
         """Returns true if endpoint is alive, false if not."""
-        # Run cached query because we can also fetch client version from this
-        # later on. This will save us an RPC call per run.
-        return self.interface.cached_json_rpc_post(
-            self.client_version_payload) is not None
+        if self.subscription is not None:
+            return self.subscription.healthy
+        return self.interface.cached_json_rpc_batch_results(self.batch_request) is not None
 
     def block_height(self):
-        """Returns latest block height. Cache is cleared when total_difficulty is fetched.
-        In order for this collector to work, alive and block_height calls need to be
-        followed with total_difficulty and client_version calls so the cache is cleared."""
-        return self.interface.cached_json_rpc_post(self.block_height_payload)
+        """Returns latest block height. Slots of the subscription are only
+        reported by slots, they are not block heights."""
+        if self.subscription is not None:
+            return self.interface.cached_json_rpc_post(self.block_height_request)
+        return self.interface.cached_json_rpc_batch_result(self.batch_request, 'getBlockHeight')
+
+    def slots(self):
+        """Returns the latest slot per commitment level."""
+        if self.subscription is None:
+            batch = self.interface.cached_json_rpc_batch_results(self.batch_request)
+            if batch is None:
+                return None
+            slots = {commitment: batch.get(f"getSlot:{commitment}")
+                     for commitment in SOLANA_COMMITMENTS}
+        else:
+            slots = {'processed': self._processed_slot(),
+                     'finalized': self.subscription.latest_notifications.get('rootNotification')}
+        return {commitment: slot for commitment, slot in slots.items() if slot is not None}
+
+    def slot_lag(self):
+        """Returns how many slots each commitment level trails the processed slot."""
+        slots = self.slots()
+        if not slots or 'processed' not in slots:
+            return None
+        return {commitment: slots['processed'] - slot
+                for commitment, slot in slots.items() if commitment != 'processed'}
+
+    def syncing(self):
+        """Returns 1 if getHealth reports the node as behind the cluster and 0
+        if it is healthy. Returns None if the health is unknown, such as when
+        the batch failed or getHealth is not supported."""
+        if self.subscription is not None:
+            return None
+        if self.interface.cached_json_rpc_batch_result(self.batch_request, 'getHealth') == 'ok':
+            return 0
+        if self.interface.cached_json_rpc_batch_error(
+                self.batch_request, 'getHealth') == SOLANA_NODE_UNHEALTHY_CODE:
+            return 1
+        return None
 
     def client_version(self):
-        """Runs a cached query to return client version."""
-        blockchain_info = self.interface.cached_json_rpc_post(
-            self.client_version_payload)
+        """Returns client version from the scrape batch. With a subscription
+        the version is only queried every CLIENT_VERSION_REFRESH_INTERVAL."""
+        if self.subscription is None:
+            version_info = self.interface.cached_json_rpc_batch_result(
+                self.batch_request, 'getVersion')
+        elif self._client_version is not None and \
+                monotonic() - self._client_version_updated < CLIENT_VERSION_REFRESH_INTERVAL:
+            return self._client_version
+        else:
+            version_info = self.interface.cached_json_rpc_post(self.client_version_request)
         version = validate_dict_and_return_key_value(
-            blockchain_info, 'solana-core', self._logger_metadata, stringify=True)
+            version_info, 'solana-core', self._logger_metadata, stringify=True)
         if version is None:
             return None
         client_version = {"client_version": version}
+        self._client_version = client_version
+        self._client_version_updated = monotonic()
         return client_version
 
     def latency(self):
         """Returns connection latency."""
+        if self.subscription is not None:
+            return self.subscription.subscription_ping_latency
         return self.interface.latest_query_latency
 
 
-class StarknetCollector():
-    """A collector to fetch information about starknet RPC endpoints."""
+class StarknetCollector():  # pylint: disable=too-many-instance-attributes
+    """A collector to fetch information about starknet RPC endpoints. All probes
+    are served by one JSON-RPC batch per scrape."""
 
     def __init__(self, url, labels, chain_id, **client_parameters):
 
@@ -343,26 +616,83 @@ class StarknetCollector():
         self.chain_id = chain_id
         self.interface = HttpsInterface(url, client_parameters.get('open_timeout'),
                                         client_parameters.get('ping_timeout'))
-
+        self._logger_metadata = {
+            'component': 'StarknetCollector',
+            'url': strip_url(url)
+        }
         self.block_height_payload = {
             "method": "starknet_blockNumber",
             "jsonrpc": "2.0",
-            "id": 1
+            "id": "starknet_blockNumber"
+        }
+        self.spec_version_payload = {
+            "method": "starknet_specVersion",
+            "jsonrpc": "2.0",
+            "id": "starknet_specVersion"
+        }
+        self.syncing_payload = {
+            "method": "starknet_syncing",
+            "jsonrpc": "2.0",
+            "id": "starknet_syncing"
         }
+        self.latest_block_payload = {
+            "method": "starknet_getBlockWithTxHashes",
+            "params": ["latest"],
+            "jsonrpc": "2.0",
+            "id": "starknet_getBlockWithTxHashes"
+        }
+        self.batch_payloads = [self.block_height_payload, self.spec_version_payload,
+                               self.syncing_payload, self.latest_block_payload]
+        self.batch_request = PreparedRequest(self.batch_payloads)
+
+    def _result(self, request_id):
+        return self.interface.cached_json_rpc_batch_result(self.batch_request, request_id)
 
     def alive(self):
         """Returns true if endpoint is alive, false if not."""
-        # Run cached query because we can also fetch client version from this
-        # later on. This will save us an RPC call per run.
-        return self.interface.cached_json_rpc_post(self.block_height_payload) is not None
+        return self.interface.cached_json_rpc_batch_results(self.batch_request) is not None
 
     def block_height(self):
-        """Returns latest block height. Cache is cleared when total_difficulty is fetched.
-        In order for this collector to work, alive and block_height calls need to be
-        followed with total_difficulty and client_version calls so the cache is cleared."""
-        block_height = self.interface.cached_json_rpc_post(
-            self.block_height_payload)
-        return block_height
+        """Returns latest block height."""
+        return self._result('starknet_blockNumber')
+
+    def head_age(self):
+        """Returns seconds since the timestamp of the latest block."""
+        timestamp = validate_dict_and_return_key_value(
+            self._result('starknet_getBlockWithTxHashes'), 'timestamp', self._logger_metadata)
+        if timestamp is None:
+            return None
+        return time() - timestamp
+
+    def syncing(self):
+        """Returns 1 while the node is syncing. starknet_syncing returns false
+        when the node is in sync and a sync status object otherwise."""
+        status = self._result('starknet_syncing')
+        if status is None:
+            return None
+        return int(status is not False)
+
+    def sync_lag(self):
+        """Returns the number of blocks the node trails the highest known block."""
+        status = self._result('starknet_syncing')
+        if status is None:
+            return None
+        if status is False:
+            return 0
+        highest = validate_dict_and_return_key_value(
+            status, 'highest_block_num', self._logger_metadata)
+        current = validate_dict_and_return_key_value(
+            status, 'current_block_num', self._logger_metadata)
+        if highest is None or current is None:
+            return None
+        return max(0, highest - current)
+
+    def client_version(self):
+        """Returns the version of the Starknet JSON-RPC spec the node implements."""
+        version = self._result('starknet_specVersion')
+        if version is None:
+            return None
+        return {"client_version": str(version)}
 
     def latency(self):
         """Returns connection latency."""
@@ -396,6 +726,33 @@ class AptosCollector():
         return validate_dict_and_return_key_value(
             blockchain_info, 'block_height', self._logger_metadata, to_number=True)
 
+    def head_age(self):
+        """Returns seconds since the ledger timestamp, which Aptos reports in
+        microseconds."""
+        blockchain_info = self.interface.cached_json_rest_api_get()
+        ledger_timestamp = validate_dict_and_return_key_value(
+            blockchain_info, 'ledger_timestamp', self._logger_metadata, to_number=True)
+        if ledger_timestamp is None:
+            return None
+        return time() - ledger_timestamp / 1e6
+
+    def ledger_version(self):
+        """Runs a cached query to return the latest ledger version."""
+        blockchain_info = self.interface.cached_json_rest_api_get()
+        return validate_dict_and_return_key_value(
+            blockchain_info, 'ledger_version', self._logger_metadata, to_number=True)
+
+    def pruning_window(self):
+        """Returns the number of ledger versions retained before pruning."""
+        blockchain_info = self.interface.cached_json_rest_api_get()
+        ledger_version = validate_dict_and_return_key_value(
+            blockchain_info, 'ledger_version', self._logger_metadata, to_number=True)
+        oldest_ledger_version = validate_dict_and_return_key_value(
+            blockchain_info, 'oldest_ledger_version', self._logger_metadata, to_number=True)
+        if ledger_version is None or oldest_ledger_version is None:
+            return None
+        return ledger_version - oldest_ledger_version
+
     def client_version(self):
         """Runs a cached query to return client version."""
         blockchain_info = self.interface.cached_json_rest_api_get()
@@ -410,8 +767,9 @@ class AptosCollector():
         """Returns connection latency."""
         return self.interface.latest_query_latency
 
-class EvmHttpCollector():
-    """A collector to fetch information from EVM HTTPS endpoints."""
+class EvmHttpCollector():  # pylint: disable=too-many-instance-attributes
+    """A collector to fetch information from EVM HTTPS endpoints. All probes
+    are served by one JSON-RPC batch per scrape."""
 
     def __init__(self, url, labels, chain_id, **client_parameters):
 
@@ -432,25 +790,55 @@ class EvmHttpCollector():
         self.block_height_payload = {
             'jsonrpc': '2.0',
             'method': "eth_blockNumber",
-            'id': 1
+            'id': 2
+        }
+        self.syncing_payload = {
+            'jsonrpc': '2.0',
+            'method': "eth_syncing",
+            'id': 3
+        }
+        self.peer_count_payload = {
+            'jsonrpc': '2.0',
+            'method': "net_peerCount",
+            'id': 4
+        }
+        self.safe_block_height_payload = {
+            "jsonrpc": "2.0",
+            "method": "eth_getBlockByNumber",
+            "params": ["safe", False],
+            "id": 5
         }
         self.finalized_block_height_payload = {
             "jsonrpc": "2.0",
             "method": "eth_getBlockByNumber",
             "params": ["finalized", False],
-            "id": 1
+            "id": 6
         }
+        self.batch_payloads = [self.client_version_payload, self.block_height_payload,
+                               self.syncing_payload, self.peer_count_payload,
+                               self.safe_block_height_payload,
+                               self.finalized_block_height_payload]
+        self.batch_request = PreparedRequest(self.batch_payloads)
+
+    def _result(self, payload):
+        return self.interface.cached_json_rpc_batch_result(self.batch_request, payload['id'])
+
+    def _tagged_block_height(self, payload):
+        block = self._result(payload)
+        if block is None:
+            return None
+        block_number_hex = block.get('number')
+        if block_number_hex is None:
+            return None
+        return int(block_number_hex, 16)
 
     def alive(self):
         """Returns true if endpoint is alive, false if not."""
-        # Run cached query because we can also fetch client version from this
-        # later on. This will save us an RPC call per run.
-        return self.interface.cached_json_rpc_post(
-            self.client_version_payload) is not None
+        return self.interface.cached_json_rpc_batch_results(self.batch_request) is not None
 
     def block_height(self):
-        """Cached query and returns blockheight after converting hex string value to an int"""
-        result = self.interface.cached_json_rpc_post(self.block_height_payload)
+        """Returns blockheight after converting hex string value to an int"""
+        result = self._result(self.block_height_payload)
 
         if result and isinstance(result, str) and result.startswith('0x'):
             return int(result, 16)
@@ -458,18 +846,51 @@ class EvmHttpCollector():
 
     def finalized_block_height(self):
         """Returns finalized blockheight after converting hex string value to an int"""
-        finalized_block = self.interface.json_rpc_post(self.finalized_block_height_payload)
-        if finalized_block is None:
+        return self._tagged_block_height(self.finalized_block_height_payload)
+
+    def head_lag(self):
+        """Returns how many blocks the safe and finalized blocks trail the latest block."""
+        latest = self._result(self.block_height_payload)
+        if not isinstance(latest, str):
             return None
-        block_number_hex = finalized_block.get('number')
-        if block_number_hex is None:
+        tagged = {'safe': self._tagged_block_height(self.safe_block_height_payload),
+                  'finalized': self._tagged_block_height(self.finalized_block_height_payload)}
+        return {tag: int(latest, 16) - block_height
+                for tag, block_height in tagged.items() if block_height is not None}
+
+    def syncing(self):
+        """Returns 1 while the node is syncing. eth_syncing returns false when
+        the node is in sync and a sync status object otherwise."""
+        status = self._result(self.syncing_payload)
+        if status is None:
             return None
-        return int(block_number_hex, 16)
+        return int(status is not False)
+
+    def sync_lag(self):
+        """Returns the number of blocks the node trails the highest known block."""
+        status = self._result(self.syncing_payload)
+        if status is None:
+            return None
+        if status is False:
+            return 0
+        highest = validate_dict_and_return_key_value(
+            status, 'highestBlock', self._logger_metadata)
+        current = validate_dict_and_return_key_value(
+            status, 'currentBlock', self._logger_metadata)
+        if highest is None or current is None:
+            return None
+        return max(0, int(highest, 16) - int(current, 16))
+
+    def peer_count(self):
+        """Returns the number of peers after converting hex string value to an int"""
+        peer_count = self._result(self.peer_count_payload)
+        if peer_count is None:
+            return None
+        return int(peer_count, 16)
 
     def client_version(self):
-        """Runs a cached query to return client version."""
-        version = self.interface.cached_json_rpc_post(
-            self.client_version_payload)
+        """Returns client version from the scrape batch."""
+        version = self._result(self.client_version_payload)
         if version is None:
             return None
         client_version = {"client_version": version}
@@ -480,8 +901,49 @@ class EvmHttpCollector():
         return self.interface.latest_query_latency
 
 
+class SpecCollector():
+    """A collector defined by a spec in the configuration instead of code. All
+    probes of the spec are served by one JSON-RPC batch per scrape."""
+
+    def __init__(self, url, labels, chain_id, spec, **client_parameters):
+
+        self.labels = labels
+        self.chain_id = chain_id
+        self.interface = HttpsInterface(url, client_parameters.get('open_timeout'),
+                                        client_parameters.get('ping_timeout'))
+        self._logger_metadata = {
+            'component': 'SpecCollector',
+            'url': strip_url(url)
+        }
+        self.spec = spec
+        # Only the probes the spec defines exist, others are skipped by the metrics.
+        for probe in spec.extractors:
+            setattr(self, probe, functools.partial(self._probe, probe))
+
+    def _probe(self, probe):
+        results = self.interface.cached_json_rpc_batch_post(self.spec.request)
+        if results is None:
+            return None
+        value = self.spec.extractors[probe](results)
+        if value is None:
+            logger.error("Spec probe returned no value.", probe=probe, **self._logger_metadata)
+            return None
+        if probe == 'client_version':
+            return {"client_version": str(value)}
+        return value
+
+    def alive(self):
+        """Returns true if endpoint is alive, false if not."""
+        return self.interface.cached_json_rpc_batch_post(self.spec.request) is not None
+
+    def latency(self):
+        """Returns connection latency."""
+        return self.interface.latest_query_latency
+
+
 class XRPLCollector():
-    """A collector to fetch information about XRP Ledger endpoints."""
+    """A collector to fetch information about XRP Ledger endpoints. Every
+    probe is derived from a single server_info response per scrape."""
 
     def __init__(self, url, labels, chain_id, **client_parameters):
         self.labels = labels
@@ -492,57 +954,99 @@ class XRPLCollector():
             'component': 'XRPLCollector',
             'url': strip_url(url)
         }
-        self.ledger_closed_payload = {
-            'method': 'ledger_closed',
-            'params': [{}]  # Required empty object in params array
-        }
         self.server_info_payload = {
             'method': 'server_info',
             'params': [{}]  # Required empty object in params array
         }
+        self.server_info_request = PreparedRequest(self.server_info_payload)
 
-    def alive(self):
-        """Returns true if endpoint is alive, false if not."""
-        return self.interface.cached_json_rpc_post(
-            self.ledger_closed_payload, non_rpc_response=True) is not None
-
-    def block_height(self):
-        """Returns latest block height (ledger index)."""
+    def _server_info(self):
+        """Returns the info object of the cached server_info response."""
         response = self.interface.cached_json_rpc_post(
-            self.ledger_closed_payload, non_rpc_response=True)
+            self.server_info_request, non_rpc_response=True)
         if response is None:
             return None
 
         # For XRPL, the response will be the whole JSON object
         if isinstance(response, dict) and 'result' in response:
-            result = response['result']
             return validate_dict_and_return_key_value(
-                result, 'ledger_index', self._logger_metadata)
+                response['result'], 'info', self._logger_metadata)
         return None
 
-    def client_version(self):
-        """Gets build version from server_info."""
-        response = self.interface.cached_json_rpc_post(
-            self.server_info_payload, non_rpc_response=True)
-        if response is None:
+    def _ledger(self):
+        """Returns the latest validated ledger, or the latest closed ledger
+        if the server has not validated one yet."""
+        info = self._server_info()
+        if info is None:
             return None
+        if 'validated_ledger' in info:
+            return info['validated_ledger']
+        return validate_dict_and_return_key_value(
+            info, 'closed_ledger', self._logger_metadata)
 
-        # For XRPL, the response will be the whole JSON object
-        if isinstance(response, dict) and 'result' in response:
-            result = response['result']
+    def alive(self):
+        """Returns true if endpoint is alive, false if not."""
+        return self.interface.cached_json_rpc_post(
+            self.server_info_request, non_rpc_response=True) is not None
 
-            if 'info' in result:
-                info = result['info']
-                version = validate_dict_and_return_key_value(
-                    info, 'build_version', self._logger_metadata, stringify=True)
+    def block_height(self):
+        """Returns latest block height (validated ledger index)."""
+        ledger = self._ledger()
+        if ledger is None:
+            return None
+        return validate_dict_and_return_key_value(ledger, 'seq', self._logger_metadata)
+
+    def head_age(self):
+        """Returns seconds since the latest validated ledger closed."""
+        ledger = self._ledger()
+        if ledger is None:
+            return None
+        return validate_dict_and_return_key_value(ledger, 'age', self._logger_metadata)
 
-                # If build_version is not found, try libxrpl_version
-                if version is None:
-                    version = validate_dict_and_return_key_value(
-                        info, 'libxrpl_version', self._logger_metadata, stringify=True)
+    def server_state(self):
+        """Returns the reported server state, e.g. full or proposing."""
+        info = self._server_info()
+        if info is None:
+            return None
+        state = validate_dict_and_return_key_value(
+            info, 'server_state', self._logger_metadata, stringify=True)
+        if state is None:
+            return None
+        return {state: 1}
+
+    def syncing(self):
+        """Returns 1 if the server is not fully synced with the network."""
+        info = self._server_info()
+        if info is None:
+            return None
+        state = validate_dict_and_return_key_value(
+            info, 'server_state', self._logger_metadata)
+        if state is None:
+            return None
+        return int(state not in XRPL_SYNCED_SERVER_STATES)
+
+    def peer_count(self):
+        """Returns the number of peers the server is connected to."""
+        info = self._server_info()
+        if info is None:
+            return None
+        return validate_dict_and_return_key_value(info, 'peers', self._logger_metadata)
+
+    def client_version(self):
+        """Gets build version from server_info."""
+        info = self._server_info()
+        if info is None:
+            return None
+        version = validate_dict_and_return_key_value(
+            info, 'build_version', self._logger_metadata, stringify=True)
+
+        # If build_version is not found, try libxrpl_version
+        if version is None:
+            version = validate_dict_and_return_key_value(
+                info, 'libxrpl_version', self._logger_metadata, stringify=True)
 
-                if version is not None:
-                    return {"client_version": version}
+        if version is not None:
+            return {"client_version": version}
         return None
 
     def latency(self):
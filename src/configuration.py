@@ -3,9 +3,25 @@
 import os
 import sys
 import yaml
-from schema import Schema, And, Optional, SchemaError, Regex
+from schema import Schema, And, Or, Optional, SchemaError, Regex
+from specs import SPEC_PROBES, TRANSFORMS
 from log import logger
 
+# Collectors which take a subscribe_url next to the url of an endpoint, and
+# the schemes of the subscriptions they open.
+SUBSCRIBE_URL_SCHEMES = {
+    'solana': ('wss://', 'ws://'),
+    'bitcoin': ('tcp://',)
+}
+
+
+def subscribe_url_supported(configuration) -> bool:
+    """Returns false if an endpoint has a subscribe_url its collector does not
+    take, or one with a scheme the collector cannot subscribe to."""
+    schemes = SUBSCRIBE_URL_SCHEMES.get(configuration['collector'], ())
+    return all(endpoint['subscribe_url'].startswith(schemes)
+               for endpoint in configuration['endpoints'] if 'subscribe_url' in endpoint)
+
 
 class Config():
     """Loads configuration yaml and validates it"""
@@ -45,9 +61,9 @@ class Config():
     def _load_configuration(self):
         supported_collectors = ('evm', 'evmhttp', 'cardano', 'conflux', 'solana',
                                 'bitcoin', 'doge', 'filecoin', 'starknet', 'aptos',
-                                'tron', 'xrpl')
+                                'tron', 'xrpl', 'spec')
 
-        configuration_schema = Schema({
+        configuration_schema = Schema(And({
             'blockchain':
             And(str),
             Optional('chain_id'):
@@ -64,19 +80,36 @@ class Config():
             And(int),
             'collector':
             And(str, lambda s: s in supported_collectors),
+            Optional('collector_spec'): {
+                'probes': {
+                    And(str, lambda s: s in SPEC_PROBES): {
+                        'method': And(str),
+                        Optional('params'): list,
+                        Optional('path'): [Or(str, int)],
+                        Optional('transform'): And(str, lambda s: s in TRANSFORMS)
+                    }
+                }
+            },
             Optional('connection_parameters'): {
                 'open_timeout': And(int),
                 'close_timeout': And(int),
                 'ping_interval': And(int),
                 'ping_timeout': And(int),
+                Optional('stall_timeout_multiple'): And(Or(int, float), lambda n: n > 1),
+                Optional('reconnect_backoff_base'): And(Or(int, float), lambda n: n > 0),
+                Optional('reconnect_backoff_max'): And(Or(int, float), lambda n: n > 0),
+                Optional('reconnect_rate_limit'): And(Or(int, float), lambda n: n > 0),
+                Optional('blockchain_info_max_age'): And(Or(int, float), lambda n: n > 0),
             },
             'endpoints': [{
                 'url':
                 And(str, Regex('https://.*|wss://.*|ws://.*')),
+                Optional('subscribe_url'):
+                And(str, Regex('wss://.*|ws://.*|tcp://.*')),
                 'provider':
                 And(str)
             }]
-        })
+        }, subscribe_url_supported))
         return self._load_and_validate(self.configuration_file_path,
                                        configuration_schema)
 
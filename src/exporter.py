@@ -1,8 +1,9 @@
 """Main module that loads Prometheus registry and starts a web-server."""
 import threading
 from wsgiref.simple_server import make_server
-from prometheus_client import REGISTRY, make_wsgi_app
+from prometheus_client import REGISTRY
 from metrics import PrometheusCustomCollector
+from exposition import make_streaming_wsgi_app
 
 def return200(_, start_fn):
     """Wsgi http response function."""
@@ -39,7 +40,7 @@ def start_liveness():
 
 if __name__ == '__main__':
     REGISTRY.register(PrometheusCustomCollector())
-    metrics_app = make_wsgi_app()
+    metrics_app = make_streaming_wsgi_app()
     liveness_thread = threading.Thread(target=start_liveness)
     liveness_thread.start()
     httpd = make_server('', 8000, exporter)
@@ -0,0 +1,119 @@
+"""Module for providing a streaming Prometheus text exposition writer."""
+from urllib.parse import parse_qs
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST
+from prometheus_client.exposition import choose_encoder
+from prometheus_client.utils import floatToGoString
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _escape_documentation(documentation: str) -> str:
+    return documentation.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _sample_line(sample) -> str:
+    """Formats a single sample as a line in the text exposition format."""
+    if sample.labels:
+        labelstr = '{' + ','.join(
+            f'{key}="{_escape_label_value(value)}"'
+            for key, value in sorted(sample.labels.items())) + '}'
+    else:
+        labelstr = ''
+    timestamp = ''
+    if sample.timestamp is not None:
+        # Convert to milliseconds.
+        timestamp = f' {int(float(sample.timestamp) * 1000):d}'
+    return f'{sample.name}{labelstr} {floatToGoString(sample.value)}{timestamp}\n'
+
+
+def _family_lines(metric):
+    """Yields the text exposition lines of a single metric family. Output is
+    identical to prometheus_client.generate_latest for the same family."""
+    mname = metric.name
+    mtype = metric.type
+    # Munging from OpenMetrics into Prometheus format.
+    if mtype == 'counter':
+        mname = mname + '_total'
+    elif mtype == 'info':
+        mname = mname + '_info'
+        mtype = 'gauge'
+    elif mtype == 'stateset':
+        mtype = 'gauge'
+    elif mtype == 'gaugehistogram':
+        mtype = 'histogram'
+    elif mtype == 'unknown':
+        mtype = 'untyped'
+
+    yield f'# HELP {mname} {_escape_documentation(metric.documentation)}\n'
+    yield f'# TYPE {mname} {mtype}\n'
+
+    om_samples = {}
+    for sample in metric.samples:
+        for suffix in ('_created', '_gsum', '_gcount'):
+            if sample.name == metric.name + suffix:
+                # OpenMetrics specific sample, put in a gauge at the end.
+                om_samples.setdefault(suffix, []).append(_sample_line(sample))
+                break
+        else:
+            yield _sample_line(sample)
+
+    for suffix, lines in sorted(om_samples.items()):
+        yield (f'# HELP {metric.name}{suffix} '
+               f'{_escape_documentation(metric.documentation)}\n')
+        yield f'# TYPE {metric.name}{suffix} gauge\n'
+        yield from lines
+
+
+def generate_latest_stream(registry=REGISTRY, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields the metrics from the registry in the latest text format as utf-8
+    encoded chunks of roughly chunk_size bytes. Only one chunk of the encoded
+    response is held at a time. Metric families are held for as long as the
+    collectors keep them, PrometheusCustomCollector builds all of them first."""
+    buffer = []
+    buffered = 0
+    for metric in registry.collect():
+        try:
+            for line in _family_lines(metric):
+                buffer.append(line)
+                buffered += len(line)
+                if buffered >= chunk_size:
+                    yield ''.join(buffer).encode('utf-8')
+                    buffer = []
+                    buffered = 0
+        except Exception as exception:
+            exception.args = (exception.args or ('',)) + (metric,)
+            raise
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def make_streaming_wsgi_app(registry=REGISTRY, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Creates a WSGI app which streams the metrics from a registry. Works as a
+    drop-in replacement for prometheus_client.make_wsgi_app. OpenMetrics requests
+    are served by the prometheus_client encoder, since they are not streamed."""
+
+    def prometheus_app(environ, start_response):
+        if environ['PATH_INFO'] == '/favicon.ico':
+            # Serve empty response for browsers
+            start_response('200 OK', [('', '')])
+            return [b'']
+
+        params = parse_qs(environ.get('QUERY_STRING', ''))
+        target_registry = registry
+        if 'name[]' in params:
+            target_registry = registry.restricted_registry(params['name[]'])
+
+        encoder, content_type = choose_encoder(environ.get('HTTP_ACCEPT'))
+        if content_type != CONTENT_TYPE_LATEST:
+            output = encoder(target_registry)
+            start_response('200 OK', [('Content-Type', content_type)])
+            return [output]
+
+        start_response('200 OK', [('Content-Type', CONTENT_TYPE_LATEST)])
+        return generate_latest_stream(target_registry, chunk_size)
+
+    return prometheus_app
@@ -0,0 +1,72 @@
+"""Module for tracking heads received from newHeads subscriptions."""
+import threading
+from collections import OrderedDict
+
+
+class HeadArrivalIndex():  # pylint: disable=too-few-public-methods
+    """A bounded index of the first time each head number was seen by any
+    subscription sharing it. Used to measure how far behind the fastest
+    provider each endpoint delivers heads."""
+
+    def __init__(self, size=1024):
+        self._size = size
+        self._first_seen = OrderedDict()
+        self._evicted_up_to = -1
+        self._lock = threading.Lock()
+
+    def observe(self, number: int, arrival: float):
+        """Records the arrival of a head and returns its delay in seconds relative
+        to the first arrival of the same number. Returns None if the number is
+        older than anything the index still holds."""
+        with self._lock:
+            first_seen = self._first_seen.get(number)
+            if first_seen is not None:
+                return max(0.0, arrival - first_seen)
+            if number <= self._evicted_up_to:
+                return None
+            self._first_seen[number] = arrival
+            if len(self._first_seen) > self._size:
+                evicted, _ = self._first_seen.popitem(last=False)
+                self._evicted_up_to = max(self._evicted_up_to, evicted)
+            return 0.0
+
+
+class HeadHistory():  # pylint: disable=too-few-public-methods
+    """A bounded ring buffer of (number, hash, parentHash) of the most recent
+    heads of a single subscription, used to detect reorgs in constant time
+    per head."""
+
+    def __init__(self, size=128):
+        self._size = size
+        self._heads = OrderedDict()
+        self._tip = None
+
+    def observe(self, number: int, block_hash: str, parent_hash: str) -> int:
+        """Records a head and returns the depth of the reorg it reveals, or 0.
+        A reorg is revealed by a parent hash that does not match the stored
+        head below it, or by a different hash at an already seen height. The
+        depth counts the stored heads that were replaced, which is a lower
+        bound when the common ancestor is older than the buffer."""
+        if block_hash is None:
+            return 0
+        depth = 0
+        parent = self._heads.get(number - 1)
+        previous = self._heads.get(number)
+        if parent is not None and parent_hash is not None and parent[0] != parent_hash:
+            depth = self._tip - number + 2
+            self._heads[number - 1] = (parent_hash, None)
+        elif previous is not None and previous[0] != block_hash:
+            depth = self._tip - number + 1
+        if depth:
+            # Heads above the new one belong to the abandoned branch.
+            for stale in [stored for stored in self._heads if stored > number]:
+                del self._heads[stale]
+            self._tip = number
+        elif self._tip is None or number > self._tip:
+            self._tip = number
+
+        self._heads[number] = (block_hash, parent_hash)
+        self._heads.move_to_end(number)
+        if len(self._heads) > self._size:
+            self._heads.popitem(last=False)
+        return depth
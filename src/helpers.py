@@ -1,11 +1,24 @@
 """Module for providing useful functions accessible globally."""
 
-import urllib.parse
+import codecs
 import json
+import re
+import urllib.parse
 from json.decoder import JSONDecodeError
-from jsonrpcclient import Ok, parse_json
+from jsonrpcclient import Ok, parse
+from codec import codec
 from log import logger
 
+# A string, with the colon that makes it an object key, or a bracket. A lone
+# quote is a string cut off at the end of the text fed so far.
+_JSON_STRING = r'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+_JSON_TOKEN = re.compile(_JSON_STRING + r'(\s*:)?|[{}\[\]]|"')
+
+# Separators and the key before the next value of a container.
+_JSON_SEPARATOR = re.compile(r'[\s,]*+(?:' + _JSON_STRING + r'\s*+:\s*+)?')
+_JSON_WHITESPACE = re.compile(r'\s*')
+_json_decoder = json.JSONDecoder()
+
 
 def strip_url(url) -> str:
     """Returns a stripped url from all parameters, usernames or passwords if present.
@@ -17,19 +30,20 @@ def return_and_validate_json_result(message: str, json_type: str,logger_metadata
     """Loads json rpc response text and validates the response
     as per JSON-RPC 2.0 Specification or JSON parsable if type is REST. In case the message is
     not valid it returns None. This method is used by both HTTPS and
-    Websocket Interface."""
+    Websocket Interface. The JSON-RPC envelope is validated on the object
+    decoded by the codec."""
     try:
         if json_type=='RPC':
-            parsed = parse_json(message)
+            parsed = parse(codec.decode(message))
             if isinstance(parsed, Ok):  # pylint: disable=no-else-return
                 return parsed.result
             else:
                 logger.error('Error in RPC message.',
                             message=message, **logger_metadata)
         else:
-            parsed = json.loads(message)
+            parsed = codec.decode(message)
             return parsed
-    except (JSONDecodeError, KeyError) as error:
+    except (JSONDecodeError, KeyError, TypeError) as error:
         logger.error('Invalid JSON RPC object in RPC message.',
                      message=message,
                      error=error,
@@ -44,6 +58,35 @@ def return_and_validate_rest_api_json_result(message: str, logger_metadata) -> d
     """Validate that message is JSON parsable"""
     return return_and_validate_json_result(message,json_type='REST',logger_metadata=logger_metadata)
 
+def return_and_validate_rpc_batch_result(message: str, logger_metadata, errors=None) -> dict:
+    """Validates that message is a JSON-RPC batch response and returns the
+    results keyed by request id. Failed requests of the batch are logged and
+    left out. If errors is a dict, their error codes are stored in it by id."""
+    try:
+        parsed = codec.decode(message)
+        if not isinstance(parsed, list):
+            logger.error('RPC message is not a batch response.',
+                         message=message, **logger_metadata)
+            return None
+        results = {}
+        for response in parse(parsed):
+            if isinstance(response, Ok):
+                results[response.id] = response.result
+            else:
+                if errors is not None:
+                    errors[response.id] = response.code
+                logger.error('Error in RPC batch message.',
+                             id=response.id,
+                             error=response.message,
+                             **logger_metadata)
+        return results
+    except (JSONDecodeError, KeyError, TypeError) as error:
+        logger.error('Invalid JSON RPC object in RPC message.',
+                     message=message,
+                     error=error,
+                     **logger_metadata)
+    return None
+
 def validate_dict_and_return_key_value(data, key, logger_metadata, stringify=False, to_number=False): # pylint: disable=line-too-long
     """Validates that a dict is provided and returns the key value either in
     original form or as a string"""
@@ -62,3 +105,132 @@ def validate_dict_and_return_key_value(data, key, logger_metadata, stringify=Fal
                  key=key,
                  **logger_metadata)
     return None
+
+
+class JsonFieldExtractor():
+    """Incrementally extracts the values at paths, sequences of object keys,
+    from a JSON text fed in byte chunks. Only strings and brackets are
+    tokenized and only the requested values are decoded, so the text never
+    has to be held or parsed as a whole. Feeding can stop once a value is found."""
+
+    def __init__(self, paths: dict):
+        self._paths = {tuple(path): name for name, path in paths.items()}
+        self._prefixes = {path[:length] for path in self._paths
+                          for length in range(len(path))}
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        # Paths of the enclosing containers, None for those off every path.
+        self._stack = []
+        self._pending = ()
+        self.values = {}
+
+    @property
+    def found(self) -> bool:
+        """Returns true once the value at one of the paths was extracted."""
+        return bool(self.values)
+
+    def feed(self, chunk: bytes, final=False) -> bool:
+        """Scans the next chunk of the text and returns true once a value was
+        found. A token cut off by the end of the chunk is kept for the next
+        one. Raises ValueError if the text is malformed or ends before the value."""
+        carried = len(self._buffer)
+        text = self._buffer + self._decoder.decode(chunk, final)
+        self._buffer = ''
+        position = 0
+        while True:
+            if self._stack and self._stack[-1] is None:
+                position = self._skip(text, position, carried, final)
+            token = _JSON_TOKEN.search(text, position)
+            if token is None:
+                break
+            position = token.end()
+            value = token.group()
+            if value in ('{', '['):
+                self._stack.append(self._pending if value == '{' else None)
+                self._pending = None
+            elif value in ('}', ']'):
+                if not self._stack:
+                    raise ValueError("Unbalanced brackets in JSON text")
+                self._stack.pop()
+                self._pending = None
+            elif value == '"' or (token.group(1) is None and not final and
+                                  _JSON_WHITESPACE.match(text, position).end() == len(text)):
+                # Incomplete, a string may still turn out to be a key.
+                self._buffer = text[token.start():]
+                break
+            elif token.group(1) is None or not self._stack or self._stack[-1] is None:
+                self._pending = None
+            elif self._on_key(text, token, final):
+                return True
+            elif self._buffer:
+                break
+        if final and not self.found:
+            raise ValueError("JSON text ended before a value was found")
+        return self.found
+
+    def _skip(self, text, position, carried, final) -> int:
+        """Skips the complete values of containers which are off every path.
+        Each is decoded by the C decoder and discarded, so they are not
+        tokenized. A value cut off by the end of the text is kept for the next
+        chunk once, if it is still incomplete it is tokenized instead. Returns
+        the position tokenizing resumes at."""
+        while self._stack and self._stack[-1] is None:
+            position = _JSON_SEPARATOR.match(text, position).end()
+            if text.startswith(('}', ']'), position):
+                self._stack.pop()
+                self._pending = None
+                position += 1
+                continue
+            try:
+                position = _json_decoder.raw_decode(text, position)[1]
+            except JSONDecodeError:
+                if position >= carried and not final:
+                    self._buffer = text[position:]
+                    return len(text)
+                break
+        return position
+
+    def _on_key(self, text, token, final) -> bool:
+        string = token.group()[:token.start(1) - token.start()]
+        key = string[1:-1] if '\\' not in string else json.loads(string)
+        path = self._stack[-1] + (key,)
+        self._pending = path if path in self._prefixes else None
+        if path not in self._paths:
+            return False
+        position = _JSON_WHITESPACE.match(text, token.end()).end()
+        try:
+            value, end = _json_decoder.raw_decode(text, position)
+        except JSONDecodeError:
+            if final:
+                raise
+            end = len(text)
+        # A number at the end of the text may continue in the next chunk.
+        if end == len(text) and not final:
+            self._buffer = text[token.start():]
+            return False
+        self.values[self._paths[path]] = value
+        return True
+
+
+def return_and_validate_rpc_field(chunks, path, logger_metadata):
+    """Returns the value at path of the result of a JSON-RPC response read
+    from an iterable of byte chunks. Reading stops once the value or an error
+    is found. In case the response has neither, it returns None."""
+    extractor = JsonFieldExtractor({'result': ('result', *path), 'error': ('error',)})
+    try:
+        for chunk in chunks:
+            if extractor.feed(chunk):
+                break
+        else:
+            extractor.feed(b'', final=True)
+        if 'result' in extractor.values:
+            return extractor.values['result']
+        logger.error('Error in RPC message.',
+                     error=extractor.values['error'],
+                     **logger_metadata)
+    except ValueError as error:
+        logger.error('Invalid JSON RPC object in RPC message.',
+                     path=path,
+                     error=error,
+                     **logger_metadata)
+    return None
@@ -1,18 +1,59 @@
 """Module for providing interface classes for different communication protocols."""
 import asyncio
+import concurrent.futures
+import itertools
 import json
 import threading
-from time import perf_counter
+from time import perf_counter, monotonic, time
 from datetime import datetime
 from websockets.client import connect
 from websockets.exceptions import ConnectionClosed, WebSocketException
 import requests
 from urllib3 import Timeout
+import zmq
 
-from helpers import strip_url, return_and_validate_rpc_json_result, return_and_validate_rest_api_json_result # pylint: disable=line-too-long
+from helpers import strip_url, return_and_validate_rpc_json_result, return_and_validate_rest_api_json_result, return_and_validate_rpc_batch_result, return_and_validate_rpc_field # pylint: disable=line-too-long
 from cache import Cache
+from codec import codec
+from prepared import prepare
+from heads import HeadHistory
+from backoff import full_jitter, TokenBucket
+from adapters import TimedHTTPAdapter, start_phase_timings
+from stats import Histogram, LabeledCounter, RollingWindow
 from log import logger
 
+REQUEST_PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download')
+RPC_PROBE_INTERVAL = 10
+PROPAGATION_DELAY_BUCKETS = (.01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0)
+REORG_DEPTH_BUCKETS = (1, 2, 3, 4, 6, 8, 16, 32, 64)
+HEAD_ARRIVAL_DELAY_BUCKETS = (.25, .5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+REQUEST_ID_PREFIX = 'brpc-'
+IDLE_TIMEOUT = 60
+STALL_TIMEOUT_MULTIPLE = 5
+STALL_TIMEOUT_MIN = 1.0
+STALL_WARMUP_HEADS = 8
+BLOCK_INTERVAL_EWMA_ALPHA = 0.1
+RECONNECT_BACKOFF_BASE = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+RECONNECT_RATE_LIMIT = 5.0
+RECONNECT_DURATION_BUCKETS = (.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+ZMQ_POLL_TIMEOUT = 1000
+FIELD_CHUNK_SIZE = 16384
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def request_name(payload, default):
+    """Returns the RPC method of a payload, used to label request counts."""
+    if isinstance(payload, dict) and 'method' in payload:
+        return payload['method']
+    if isinstance(payload, list):
+        return 'batch'
+    return default
+
+
+def _read_text(response):
+    """Returns the text of a streamed response and its body size."""
+    return response.text, len(response.content)
+
 
 class HttpsInterface():  # pylint: disable=too-many-instance-attributes
     """A https interface, to interact with https RPC endpoints."""
@@ -22,6 +63,8 @@ class HttpsInterface():  # pylint: disable=too-many-instance-attributes
         self.connect_timeout = connect_timeout
         self.response_timeout = response_timeout
         self.session = requests.Session()
+        self.session.mount('https://', TimedHTTPAdapter())
+        self.session.mount('http://', TimedHTTPAdapter())
         self._logger = logger
         self._logger_metadata = {
             'component': 'HttpsCollector',
@@ -29,6 +72,13 @@ class HttpsInterface():  # pylint: disable=too-many-instance-attributes
         }
         self.cache = Cache()
         self._latest_query_latency = None
+        self.request_counter = LabeledCounter()
+        self.error_counter = LabeledCounter()
+        self.latency_histogram = Histogram()
+        self.latency_window = RollingWindow()
+        self.phase_histograms = {phase: Histogram() for phase in REQUEST_PHASES}
+        self.response_size_histogram = Histogram(RESPONSE_SIZE_BUCKETS)
+        self._batch_lock = threading.Lock()
 
     @property
     def latest_query_latency(self):
@@ -37,32 +87,65 @@ class HttpsInterface():  # pylint: disable=too-many-instance-attributes
         self._latest_query_latency = None
         return latency
 
-    def _return_and_validate_request(self, method='GET', payload=None, params=None):
-        """Sends a GET or POST request and validates the http response code."""
+    def _observe_latency(self, latency):
+        """Records a measured round trip in the latency distributions."""
+        self.latency_histogram.observe(latency)
+        self.latency_window.observe(latency)
+
+    def _observe_phases(self, timings, response_time, download_time, body_size):
+        """Records connection phases, time to first byte, body download time and
+        body size. Phases of a reused connection are not recorded."""
+        timings['ttfb'] = max(0, response_time - sum(timings.values()))
+        timings['download'] = download_time
+        for phase, duration in timings.items():
+            self.phase_histograms[phase].observe(duration)
+        self.response_size_histogram.observe(body_size)
+
+    def _return_and_validate_request(self, method='GET', payload=None, params=None, read=None):  # pylint: disable=too-many-locals
+        """Sends a GET or POST request and validates the http response code.
+        The body of a POST is the encoded payload of a prepared request. If
+        read is given, it consumes the streamed response and returns the
+        result and body size, otherwise the response text is returned."""
+        request = prepare(payload) if method.upper() == 'POST' else None
+        payload = request.payload if request is not None else payload
         with self.session as ses:
             try:
                 self._logger.debug(f"Querying endpoint with {method}.",
                                 payload=payload,
                                 params=params,
                                 **self._logger_metadata)
+                self.request_counter.inc(request_name(payload, method.upper()))
+                timings = start_phase_timings()
                 start_time = perf_counter()
+                # Body is streamed so time to first byte and download can be told apart.
                 if method.upper() == 'GET':
                     req = ses.get(self.url,
                                   params=params,
+                                  stream=True,
                                   timeout=Timeout(connect=self.connect_timeout,
                                                   read=self.response_timeout))
                 elif method.upper() == 'POST':
                     req = ses.post(self.url,
-                                   json=payload,
+                                   data=request.body,
+                                   headers=request.headers,
+                                   stream=True,
                                    timeout=Timeout(connect=self.connect_timeout,
                                                    read=self.response_timeout))
                 else:
                     raise ValueError(f"Unsupported HTTP method: {method}")
 
                 if req.status_code == requests.codes.ok: # pylint: disable=no-member
+                    response_time = perf_counter()
+                    result, body_size = (read or _read_text)(req)
+                    download_time = perf_counter() - response_time
                     self._latest_query_latency = perf_counter() - start_time
-                    return req.text
+                    self._observe_latency(self._latest_query_latency)
+                    self._observe_phases(timings, response_time - start_time,
+                                         download_time, body_size)
+                    return result
+                self.error_counter.inc(f"http_{req.status_code}")
             except (IOError, requests.HTTPError, json.decoder.JSONDecodeError, ValueError) as error:
+                self.error_counter.inc(type(error).__name__)
                 self._logger.error(f"Problem while sending a {method} request.",
                                 payload=payload,
                                 params=params,
@@ -88,19 +171,119 @@ class HttpsInterface():  # pylint: disable=too-many-instance-attributes
                 return result
         return None
 
-    def cached_json_rpc_post(self, payload: dict, non_rpc_response=None):
-        """Calls json_rpc_post and stores the result in in-memory cache."""
-        cache_key = f"rpc:{str(payload)}"
+    def json_rpc_post_field(self, payload, path):
+        """Returns the value at path, a sequence of keys, of the json-rpc
+        result. The body is streamed through an incremental extractor, so the
+        rest of the result is neither decoded nor held in memory."""
+        return self._return_and_validate_request(
+            method='POST', payload=payload,
+            read=lambda response: self._read_field(response, path))
+
+    def _read_field(self, response, path):
+        """Extracts the value at path of a streamed json-rpc response, then
+        drains the rest of the body so the connection can be reused. Returns
+        the value and the body size."""
+        body_size = 0
+
+        def chunks():
+            nonlocal body_size
+            for chunk in response.iter_content(FIELD_CHUNK_SIZE):
+                body_size += len(chunk)
+                yield chunk
+
+        stream = chunks()
+        value = return_and_validate_rpc_field(stream, path, self._logger_metadata)
+        for _ in stream:
+            pass
+        return value, body_size
+
+    def cached_json_rpc_post(self, payload, non_rpc_response=None):
+        """Calls json_rpc_post and stores the result in in-memory cache, keyed
+        by the hash of the prepared request."""
+        request = prepare(payload)
+        cache_key = request.cache_key
 
         if self.cache.is_cached(cache_key):
             return_value = self.cache.retrieve_key_value(cache_key)
             return return_value
 
-        value = self.json_rpc_post(payload=payload, non_rpc_response=non_rpc_response)
+        value = self.json_rpc_post(payload=request, non_rpc_response=non_rpc_response)
         if value is not None:
             self.cache.store_key_value(cache_key, value)
         return value
 
+    def json_rpc_batch_results(self, payloads, errors=None):
+        """Sends payloads, a list or a prepared request of a list, as a single
+        JSON-RPC batch and returns the results keyed by request id. Failed
+        requests are left out, their error codes are stored by id in errors if
+        it is a dict. Returns None if the batch as a whole failed."""
+        response = self._return_and_validate_request(method='POST', payload=payloads)
+        if response is not None:
+            return return_and_validate_rpc_batch_result(
+                response, self._logger_metadata, errors)
+        return None
+
+    def json_rpc_batch_post(self, payloads):
+        """Calls json_rpc_batch_results and returns the results in the order of
+        payloads. Results of failed requests are None."""
+        request = prepare(payloads)
+        results = self.json_rpc_batch_results(request)
+        if results is None:
+            return None
+        return [results.get(payload['id']) for payload in request.payload]
+
+    def _cached_json_rpc_batch(self, payloads):
+        """Calls json_rpc_batch_results and stores the results and error codes
+        in in-memory cache. Probes running concurrently wait for the batch in
+        flight instead of sending their own."""
+        request = prepare(payloads)
+        cache_key = request.cache_key
+
+        with self._batch_lock:
+            if self.cache.is_cached(cache_key):
+                return self.cache.retrieve_key_value(cache_key)
+
+            errors = {}
+            results = self.json_rpc_batch_results(request, errors)
+            if results is None:
+                return None
+            value = (results, errors)
+            self.cache.store_key_value(cache_key, value)
+            return value
+
+    def cached_json_rpc_batch_results(self, payloads):
+        """Returns the results of the cached batch keyed by request id, or None
+        if the batch as a whole failed."""
+        batch = self._cached_json_rpc_batch(payloads)
+        if batch is None:
+            return None
+        return batch[0]
+
+    def cached_json_rpc_batch_result(self, payloads, request_id):
+        """Returns the result of the request with request_id from the cached
+        batch. Returns None if the batch or that request failed."""
+        results = self.cached_json_rpc_batch_results(payloads)
+        if results is None:
+            return None
+        return results.get(request_id)
+
+    def cached_json_rpc_batch_error(self, payloads, request_id):
+        """Returns the error code of the request with request_id from the
+        cached batch, or None if the batch failed or the request succeeded."""
+        batch = self._cached_json_rpc_batch(payloads)
+        if batch is None:
+            return None
+        return batch[1].get(request_id)
+
+    def cached_json_rpc_batch_post(self, payloads):
+        """Calls cached_json_rpc_batch_results and returns the results in the
+        order of payloads. Results of failed requests are None."""
+        request = prepare(payloads)
+        results = self.cached_json_rpc_batch_results(request)
+        if results is None:
+            return None
+        return [results.get(payload['id']) for payload in request.payload]
+
     def json_rest_api_get(self, params: dict = None):
         """Checks the validity of a successful json-rpc response. If any of the
         validations fail, the method returns type None. """
@@ -128,11 +311,29 @@ class HttpsInterface():  # pylint: disable=too-many-instance-attributes
 class WebsocketSubscription(threading.Thread):  # pylint: disable=too-many-instance-attributes
     """A thread class used to subscribe and track
     websocket parameters."""
+    # Shared by all subscriptions to limit the rate of reconnects process wide.
+    _reconnect_limiters = {}
 
-    def __init__(self, url, sub_payload=None, **client_parameters):
+    def __init__(self, url, sub_payload=None, rpc_probe_payload=None,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 head_number_key=None, head_arrivals=None, **client_parameters):
         threading.Thread.__init__(self)
         self._url = url
         self._sub_payload = sub_payload
+        self._stall_timeout_multiple = client_parameters.pop(
+            'stall_timeout_multiple', STALL_TIMEOUT_MULTIPLE)
+        self._reconnect_backoff_base = client_parameters.pop(
+            'reconnect_backoff_base', RECONNECT_BACKOFF_BASE)
+        self._reconnect_backoff_max = client_parameters.pop(
+            'reconnect_backoff_max', RECONNECT_BACKOFF_MAX)
+        reconnect_rate_limit = client_parameters.pop(
+            'reconnect_rate_limit', RECONNECT_RATE_LIMIT)
+        # Only read by the https collectors, it must not reach connect.
+        client_parameters.pop('blockchain_info_max_age', None)
+        self._reconnect_limiter = self._reconnect_limiters.setdefault(
+            reconnect_rate_limit, TokenBucket(reconnect_rate_limit, reconnect_rate_limit))
+        self._rpc_probe_payload = rpc_probe_payload
+        self._head_number_key = head_number_key
+        self._head_arrivals = head_arrivals
         self._client_parameters = client_parameters
 
         self._logger = logger
@@ -145,7 +346,35 @@ class WebsocketSubscription(threading.Thread):  # pylint: disable=too-many-insta
         self.subscription_ping_latency = None
         self.heads_received = 0
         self._latest_message = None
+        self.latest_notifications = {}
         self.timestamp = datetime.now()
+        self.request_counter = LabeledCounter()
+        self.error_counter = LabeledCounter()
+        self.latency_histogram = Histogram()
+        self.latency_window = RollingWindow()
+        self.rpc_latency_histogram = Histogram() if rpc_probe_payload else None
+        self.latest_probe_result = None
+        self.latest_probe_latency = None
+        self._request_ids = itertools.count(1)
+        self._pending_requests = {}
+        self._loop = None
+        self._websocket = None
+        self.heads_first_seen = 0
+        self.propagation_delay_histogram = Histogram(
+            PROPAGATION_DELAY_BUCKETS) if head_arrivals is not None else None
+        self.reorgs = 0
+        self._head_history = HeadHistory() if head_number_key is not None else None
+        self.reorg_depth_histogram = Histogram(
+            REORG_DEPTH_BUCKETS) if head_number_key is not None else None
+        self.head_timestamp = None
+        self.block_interval = None
+        self.stalls = 0
+        self._head_gaps = 0
+        self._last_head_arrival = None
+        self.reconnect_attempts = 0
+        self.reconnect_duration_histogram = Histogram(RECONNECT_DURATION_BUCKETS)
+        self.head_arrival_delay_histogram = Histogram(
+            HEAD_ARRIVAL_DELAY_BUCKETS) if head_number_key is not None else None
 
     def run(self):
         asyncio.run(self._subscribe(self._sub_payload))
@@ -187,57 +416,269 @@ class WebsocketSubscription(threading.Thread):  # pylint: disable=too-many-insta
         else:
             return None
 
+    def _observe_latency(self, latency):
+        """Records a measured round trip in the latency distributions."""
+        self.latency_histogram.observe(latency)
+        self.latency_window.observe(latency)
+
     async def _record_latency(self, websocket):
         if (datetime.now() - self.timestamp).total_seconds() > 10:
             self.timestamp = datetime.now()
             self.subscription_ping_latency = websocket.latency
+            # Latency stays 0 until the first pong is received.
+            if websocket.latency:
+                self._observe_latency(websocket.latency)
+
+    @property
+    def stall_timeout(self):
+        """Returns seconds without a new head after which the subscription is
+        considered stalled. Once enough heads were received it is a multiple of
+        the learned block interval, before that IDLE_TIMEOUT. A new connection
+        also waits IDLE_TIMEOUT for its first head, which may take as long as
+        the subscription handshake."""
+        if self._head_gaps < STALL_WARMUP_HEADS or self._last_head_arrival is None:
+            return IDLE_TIMEOUT
+        return max(STALL_TIMEOUT_MIN, self._stall_timeout_multiple * self.block_interval)
+
+    def _observe_head_gap(self, arrival):
+        """Updates the exponentially weighted moving average of the time
+        between heads of the current connection."""
+        if self._last_head_arrival is not None:
+            gap = arrival - self._last_head_arrival
+            if self.block_interval is None:
+                self.block_interval = gap
+            else:
+                self.block_interval += BLOCK_INTERVAL_EWMA_ALPHA * (gap - self.block_interval)
+            self._head_gaps += 1
+        self._last_head_arrival = arrival
 
     async def monitor_heads_received(self, websocket):
-        """Monitors the heads received (messages) from the websocket.
-        If no heads have been received in while the websocket closed
-        so a new connection can be created"""
+        """Monitors the heads received from the websocket. If no head has been
+        received within the stall timeout the websocket is closed so a new
+        connection can be created."""
+        started = monotonic()
         while True:
-            idle_timeout = 60
-            prev_heads_received_count = self.heads_received
-            await asyncio.sleep(idle_timeout)
-            if websocket.closed:
-                break
-            if prev_heads_received_count == self.heads_received:
-                self._logger.error(
-                    "Websocket has not received new message within timeout, closing connection...",
-                    timeout=idle_timeout,
-                    ** self._logger_metadata)
-                await websocket.close(code=4000,
-                                      reason=f'No new messages within {idle_timeout} seconds')
-                break
+            timeout = self.stall_timeout
+            last_arrival = max(started, self._last_head_arrival or started)
+            remaining = last_arrival + timeout - monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                if websocket.closed:
+                    break
+                continue
+            self.stalls += 1
+            self._logger.error(
+                "Websocket has not received new message within timeout, closing connection...",
+                timeout=timeout,
+                block_interval=self.block_interval,
+                **self._logger_metadata)
+            await websocket.close(code=4000,
+                                  reason=f'No new messages within {timeout:.2f} seconds')
+            break
+
+    def _head_number(self, head):
+        """Returns the head number of a subscription message as an int."""
+        if not isinstance(head, dict):
+            return None
+        try:
+            return int(head.get(self._head_number_key), 16)
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def head_age(self):
+        """Returns seconds elapsed since the timestamp of the newest head,
+        or None if no head with a timestamp was received."""
+        if self.head_timestamp is None:
+            return None
+        return time() - self.head_timestamp
+
+    def _on_head(self, head, arrival):
+        """Tracks a head received on the subscription. Runs for every message
+        so it only does constant time work."""
+        if self._head_number_key is None:
+            return
+        number = self._head_number(head)
+        if number is None:
+            return
+        if self._head_arrivals is not None:
+            delay = self._head_arrivals.observe(number, arrival)
+            if delay is not None:
+                self.propagation_delay_histogram.observe(delay)
+                if delay == 0.0:
+                    self.heads_first_seen += 1
+        try:
+            timestamp = int(head.get('timestamp'), 16)
+        except (TypeError, ValueError):
+            timestamp = None
+        if timestamp is not None:
+            self.head_arrival_delay_histogram.observe(max(0.0, time() - timestamp))
+            if self.head_timestamp is None or timestamp > self.head_timestamp:
+                self.head_timestamp = timestamp
+        depth = self._head_history.observe(number, head.get('hash'), head.get('parentHash'))
+        if depth:
+            self.reorgs += 1
+            self.reorg_depth_histogram.observe(depth)
+            self._logger.info("Reorg detected.",
+                              number=number,
+                              depth=depth,
+                              **self._logger_metadata)
+
+    async def _request(self, websocket, payload):
+        """Sends a JSON-RPC request over the subscription socket and waits for the
+        response with a matching id, which is routed by _process_message.
+        Returns the result or None if the request failed."""
+        request_id = f"{REQUEST_ID_PREFIX}{next(self._request_ids)}"
+        response = asyncio.get_running_loop().create_future()
+        self._pending_requests[request_id] = response
+        self.request_counter.inc(request_name(payload, 'request'))
+        try:
+            await websocket.send(codec.encode_text({**payload, 'id': request_id}))
+            message = await asyncio.wait_for(
+                response, timeout=self._client_parameters.get('ping_timeout'))
+        except (asyncio.exceptions.TimeoutError, WebSocketException) as exc:
+            self.error_counter.inc(type(exc).__name__)
+            self._logger.error("JSON RPC request over subscription failed.",
+                               payload=payload,
+                               error=exc,
+                               **self._logger_metadata)
+            return None
+        finally:
+            self._pending_requests.pop(request_id, None)
+
+        if 'result' not in message:
+            self.error_counter.inc('rpc_error')
+            self._logger.error('Error in RPC message.',
+                               message=message,
+                               **self._logger_metadata)
+            return None
+        return message['result']
+
+    def request(self, payloads):
+        """Sends JSON-RPC requests over the open subscription socket from
+        another thread, without opening a new connection. Returns the results
+        in the order of payloads, None for failed requests, or None if the
+        socket is not connected."""
+        loop, websocket = self._loop, self._websocket
+        if loop is None or websocket is None:
+            return None
+
+        async def request_all():
+            return await asyncio.gather(
+                *(self._request(websocket, payload) for payload in payloads))
+
+        # Each request times out on its own, this only guards against a stuck loop.
+        timeout = self._client_parameters.get('ping_timeout')
+        try:
+            future = asyncio.run_coroutine_threadsafe(request_all(), loop)
+            return future.result(timeout=None if timeout is None else 2 * timeout)
+        except concurrent.futures.TimeoutError as exc:
+            future.cancel()
+            error = exc
+        except (RuntimeError, concurrent.futures.CancelledError) as exc:
+            # The loop stopped while the requests were pending.
+            error = exc
+        self._logger.error("JSON RPC request over subscription failed.",
+                           payload=payloads,
+                           error=error,
+                           **self._logger_metadata)
+        return None
+
+    async def _probe_rpc_latency(self, websocket):
+        """Periodically sends a lightweight JSON-RPC call over the subscription
+        socket and records its round trip time. Unlike the protocol ping, which
+        load balancers may answer, the call has to be served by the node.
+        Endpoints without a subscription use the probe to poll their head."""
+        while not websocket.closed:
+            start_time = perf_counter()
+            result = await self._request(websocket, self._rpc_probe_payload)
+            if result is not None:
+                latency = perf_counter() - start_time
+                self.rpc_latency_histogram.observe(latency)
+                self._observe_latency(latency)
+                self.latest_probe_result = result
+                self.latest_probe_latency = latency
+                if self._sub_payload is None:
+                    # Without a subscription the probe responses are the heads.
+                    self._observe_head_gap(monotonic())
+            await asyncio.sleep(RPC_PROBE_INTERVAL)
+
+    def _resolve_request(self, message) -> bool:
+        """Completes the pending request matching the message id. Returns True
+        if the message is a response to a request sent by _request."""
+        if not isinstance(message, dict):
+            return False
+        request_id = message.get('id')
+        if not (isinstance(request_id, str) and request_id.startswith(REQUEST_ID_PREFIX)):
+            return False
+        response = self._pending_requests.get(request_id)
+        # Responses arriving after the request timed out are dropped.
+        if response is not None and not response.done():
+            response.set_result(message)
+        return True
 
     async def _process_message(self, websocket):
+        # Gaps spanning a reconnect say nothing about the block interval.
+        self._last_head_arrival = None
         asyncio.create_task(
             self.monitor_heads_received(websocket))
+        if self._rpc_probe_payload is not None:
+            asyncio.create_task(
+                self._probe_rpc_latency(websocket))
         async for msg in websocket:
             await self._record_latency(websocket)
             if msg is not None:
                 try:
-                    if 'params' in json.loads(msg):
-                        msg = json.loads(msg)['params']['result']
-                        self._latest_message = msg
+                    message = codec.decode(msg)
                 except json.decoder.JSONDecodeError as error:
+                    self.error_counter.inc(type(error).__name__)
                     self._logger.error("Failed to decode JSON.",
                                        message=msg,
                                        error=error,
                                        **self._logger_metadata)
                     continue
+                if self._resolve_request(message):
+                    # Responses to our own requests are not heads.
+                    continue
+                if 'params' in message:
+                    self._latest_message = message['params']['result']
+                    self.latest_notifications[message.get('method')] = self._latest_message
+                    arrival = monotonic()
+                    self._observe_head_gap(arrival)
+                    self._on_head(self._latest_message, arrival)
             self.heads_received += 1
 
     async def _subscribe(self, payload):
         self._logger.info("Subscribing to endpoint.",
                           payload=payload,
                           **self._logger_metadata)
-        async for websocket in connect(self._url, **self._client_parameters):
+        failed_attempts = 0
+        disconnected_at = None
+        while True:
+            if disconnected_at is not None or failed_attempts:
+                await self._wait_before_reconnect(failed_attempts)
+            try:
+                websocket = await connect(self._url, **self._client_parameters)
+            except (OSError, asyncio.exceptions.TimeoutError, WebSocketException) as exc:
+                failed_attempts += 1
+                self.error_counter.inc(type(exc).__name__)
+                self._logger.error("Failed to connect to websocket, retrying...",
+                                   error=exc,
+                                   attempt=failed_attempts,
+                                   **self._logger_metadata)
+                continue
+            if disconnected_at is not None:
+                self.reconnect_duration_histogram.observe(monotonic() - disconnected_at)
+            failed_attempts = 0
+            self._loop = asyncio.get_running_loop()
+            self._websocket = websocket
             try:
                 # When we establish connection, we mark the endpoint alive.
                 self.healthy = True
-                await websocket.send(json.dumps(payload))
+                # Several subscriptions can share the connection.
+                for sub_payload in (payload if isinstance(payload, list) else [payload]):
+                    if sub_payload is not None:
+                        await websocket.send(codec.encode_text(sub_payload))
                 await self._process_message(websocket)
 
             except ConnectionClosed:
@@ -248,16 +689,33 @@ class WebsocketSubscription(threading.Thread):  # pylint: disable=too-many-insta
                 if self.healthy:
                     self.disconnects += 1
                 self.healthy = False
-                continue
+            finally:
+                self._websocket = None
+                # A dead connection must not keep serving its last result.
+                self.latest_probe_result = None
+                self.latest_probe_latency = None
+                await websocket.close()
+            disconnected_at = monotonic()
+
+    async def _wait_before_reconnect(self, failed_attempts):
+        """Sleeps for a backoff with full jitter, so subscriptions dropped at
+        the same time do not reconnect in lockstep, and at least as long as
+        the process wide reconnect rate limit requires."""
+        self.reconnect_attempts += 1
+        delay = max(full_jitter(failed_attempts, self._reconnect_backoff_base,
+                                self._reconnect_backoff_max),
+                    self._reconnect_limiter.reserve())
+        await asyncio.sleep(delay)
 
 
 class WebsocketInterface(WebsocketSubscription):  # pylint: disable=too-many-instance-attributes
     """A websocket interface, to interact with websocket RPC endpoints."""
 
-    def __init__(self, url, sub_payload=None, **client_parameters):
-        super().__init__(url, sub_payload, **client_parameters)
+    def __init__(self, url, sub_payload=None, rpc_probe_payload=None,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 head_number_key=None, head_arrivals=None, **client_parameters):
+        super().__init__(url, sub_payload, rpc_probe_payload,
+                         head_number_key, head_arrivals, **client_parameters)
         self._url = url
-        self._client_parameters = client_parameters
         self._logger = logger
         self._logger_metadata = {
             'component': 'WebsocketInterface',
@@ -265,6 +723,7 @@ class WebsocketInterface(WebsocketSubscription):  # pylint: disable=too-many-ins
         }
         self.cache = Cache()
         self._latest_query_latency = None
+        self._request_lock = threading.Lock()
 
     @property
     def latest_query_latency(self):
@@ -279,25 +738,44 @@ class WebsocketInterface(WebsocketSubscription):  # pylint: disable=too-many-ins
         result = asyncio.run(self._query(payload, skip_checks))
         if result is not None:
             self._latest_query_latency = perf_counter() - start_time
+            self._observe_latency(self._latest_query_latency)
         return result
 
     def cached_query(self, payload, skip_checks=False):
         """Calls json_rpc_post and stores the result in in-memory
-        cache, by using payload as key.Method will always return
-        cached value after the first call. Cache never expires."""
-        cache_key = str(payload)
+        cache, by using the hash of the prepared payload as key. Method will
+        always return cached value after the first call. Cache never expires."""
+        request = prepare(payload)
+        cache_key = request.cache_key
         if self.cache.is_cached(cache_key):
             value = self.cache.retrieve_key_value(cache_key)
             return value
 
-        value = self.query(payload, skip_checks)
+        value = self.query(request, skip_checks)
         if value is not None:
             self.cache.store_key_value(cache_key, value)
         return value
 
+    def cached_request(self, payloads):
+        """Calls request and stores the result in in-memory cache. Probes
+        running concurrently wait for the requests in flight instead of
+        sending their own. Payloads are sent with ids of their own, so only
+        the cache key of a prepared request is reused."""
+        request = prepare(payloads)
+        cache_key = request.cache_key
+
+        with self._request_lock:
+            if self.cache.is_cached(cache_key):
+                return self.cache.retrieve_key_value(cache_key)
+
+            value = self.request(request.payload)
+            if value is not None:
+                self.cache.store_key_value(cache_key, value)
+            return value
+
     def _load_and_validate_json_key(self, message, key):
         try:
-            return json.loads(message)[key]
+            return codec.decode(message)[key]
         except (KeyError, json.decoder.JSONDecodeError) as exc:
             self._logger.error("Failed to load key from json.",
                                error=exc,
@@ -307,19 +785,23 @@ class WebsocketInterface(WebsocketSubscription):  # pylint: disable=too-many-ins
             return None
 
     async def _query(self, payload, skip_checks):
+        request = prepare(payload)
+        payload = request.payload
+        self.request_counter.inc(request_name(payload, 'query'))
         async with connect(self._url, **self._client_parameters) as websocket:
             try:
                 self._logger.debug("Querying endpoint.",
                                    payload=payload,
                                    **self._logger_metadata)
                 await asyncio.wait_for(
-                    websocket.send(json.dumps(payload)),
+                    websocket.send(request.text),
                     timeout=self._client_parameters['ping_timeout'])
                 result = await asyncio.wait_for(
                     websocket.recv(),
                     timeout=self._client_parameters['ping_timeout'])
             except (asyncio.exceptions.TimeoutError,
                     WebSocketException) as exc:
+                self.error_counter.inc(type(exc).__name__)
                 self._logger.error("JSON RPC Query failed.",
                                    payload=payload,
                                    error=exc,
@@ -331,3 +813,55 @@ class WebsocketInterface(WebsocketSubscription):  # pylint: disable=too-many-ins
 
         return return_and_validate_rpc_json_result(result,
                                                    self._logger_metadata)
+
+
+class ZmqSubscription(threading.Thread):
+    """A thread class subscribing to ZMQ notifications published by a node,
+    such as the hashblock topic of Bitcoin Core and Dogecoin. The callback
+    is called with the topic and body of every notification."""
+
+    def __init__(self, url, topics, callback):
+        threading.Thread.__init__(self)
+        self._url = url
+        self._topics = topics
+        self._callback = callback
+        self._stopped = threading.Event()
+        self._logger = logger
+        self._logger_metadata = {
+            'component': 'ZmqSubscription',
+            'url': strip_url(url)
+        }
+        self.notifications_received = 0
+
+    def stop(self):
+        """Stops the subscription loop within ZMQ_POLL_TIMEOUT milliseconds."""
+        self._stopped.set()
+
+    def run(self):
+        socket = zmq.Context.instance().socket(zmq.SUB)
+        try:
+            # ZMQ reconnects on its own, the socket only has to be connected once.
+            socket.connect(self._url)
+            for topic in self._topics:
+                socket.setsockopt(zmq.SUBSCRIBE, topic)
+            self._logger.info("Subscribed to ZMQ notifications.",
+                              topics=self._topics,
+                              **self._logger_metadata)
+            while not self._stopped.is_set():
+                if not socket.poll(ZMQ_POLL_TIMEOUT):
+                    continue
+                topic, body, *_ = socket.recv_multipart()
+                self.notifications_received += 1
+                try:
+                    self._callback(topic, body)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    self._logger.error("ZMQ notification callback failed.",
+                                       topic=topic,
+                                       error=error,
+                                       **self._logger_metadata)
+        except zmq.ZMQError as error:
+            self._logger.error("ZMQ subscription failed.",
+                               error=error,
+                               **self._logger_metadata)
+        finally:
+            socket.close(linger=0)
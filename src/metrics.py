@@ -1,11 +1,30 @@
 """A module that does does everything Prometheus related."""
+import threading
+from time import perf_counter
 from concurrent.futures import ThreadPoolExecutor
-from prometheus_client.metrics_core import GaugeMetricFamily, CounterMetricFamily, InfoMetricFamily
+from prometheus_client.metrics_core import GaugeMetricFamily, CounterMetricFamily, InfoMetricFamily, HistogramMetricFamily # pylint: disable=line-too-long
 
 from registries import CollectorRegistry
+from stats import Histogram, LabeledCounter, RollingWindow
+from log import logger
 
+SCRAPE_DURATION_BUCKETS = (.1, .25, .5, 1.0, 2.5, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
 
-class MetricsLoader():
+# Collector probes which do I/O and are submitted to the executor.
+REMOTE_PROBES = ('alive', 'client_version', 'block_height', 'finalized_block_height',
+                 'total_difficulty', 'slots', 'slot_lag', 'head_lag', 'syncing', 'sync_lag',
+                 'server_state', 'peer_count', 'head_age', 'chain_tips', 'mempool_size',
+                 'mempool_bytes', 'ledger_version', 'pruning_window')
+# Collector probes which read state the collector already holds. They are
+# called on the scrape thread after the remote probes, so latency is the one
+# measured during this scrape. Collectors add the remote probes they serve
+# from a subscription with an INLINE_PROBES attribute of their own.
+INLINE_PROBES = ('heads_received', 'disconnects', 'latency')
+# Probes returning a dict of label value to metric value.
+LABELED_PROBES = frozenset(('slots', 'slot_lag', 'head_lag', 'server_state', 'chain_tips'))
+
+
+class MetricsLoader():  # pylint: disable=too-many-public-methods
     """Central place to instantiate and manage all of the metric processed by the exporter.
     This is created so standardization is enforced in terms of metrics names, labels etc."""
 
@@ -77,6 +96,222 @@ class MetricsLoader():
             'Latency of the rpc connection.',
             labels=self._labels)
 
+    @property
+    def latency_histogram_metric(self):
+        """Returns instantiated latency histogram metric."""
+        return HistogramMetricFamily(
+            'brpc_latency_seconds',
+            'Distribution of all round trips measured on the rpc connection.',
+            labels=self._labels)
+
+    @property
+    def latency_quantile_metric(self):
+        """Returns instantiated latency quantile metric."""
+        return GaugeMetricFamily(
+            'brpc_latency_quantile_seconds',
+            'Latency quantiles over a rolling window of the most recent round trips.',
+            labels=self._labels + ['quantile'])
+
+    @property
+    def rpc_latency_metric(self):
+        """Returns instantiated rpc latency metric."""
+        return HistogramMetricFamily(
+            'brpc_rpc_latency_seconds',
+            'Round trip time of JSON-RPC calls sent over the subscription socket.',
+            labels=self._labels)
+
+    @property
+    def head_propagation_delay_metric(self):
+        """Returns instantiated head propagation delay metric."""
+        return HistogramMetricFamily(
+            'brpc_head_propagation_delay_seconds',
+            'Delay between the first provider delivering a head and this endpoint.',
+            labels=self._labels)
+
+    @property
+    def heads_first_seen_metric(self):
+        """Returns instantiated heads first seen metric."""
+        return CounterMetricFamily(
+            'brpc_head_first_seen',
+            'Heads this endpoint delivered before any other endpoint.',
+            labels=self._labels)
+
+    @property
+    def reorgs_metric(self):
+        """Returns instantiated reorgs metric."""
+        return CounterMetricFamily(
+            'brpc_reorgs',
+            'Chain reorganizations observed in the head subscription.',
+            labels=self._labels)
+
+    @property
+    def reorg_depth_metric(self):
+        """Returns instantiated reorg depth metric."""
+        return HistogramMetricFamily(
+            'brpc_reorg_depth',
+            'Number of replaced heads per observed chain reorganization.',
+            labels=self._labels)
+
+    @property
+    def head_age_metric(self):
+        """Returns instantiated head age metric."""
+        return GaugeMetricFamily(
+            'brpc_head_age_seconds',
+            'Seconds since the timestamp of the newest head.',
+            labels=self._labels)
+
+    @property
+    def head_arrival_delay_metric(self):
+        """Returns instantiated head arrival delay metric."""
+        return HistogramMetricFamily(
+            'brpc_head_arrival_delay_seconds',
+            'Delay between the block timestamp and the arrival of the head.',
+            labels=self._labels)
+
+    @property
+    def block_interval_metric(self):
+        """Returns instantiated block interval metric."""
+        return GaugeMetricFamily(
+            'brpc_block_interval_seconds',
+            'Moving average of the time between subscribed heads.',
+            labels=self._labels)
+
+    @property
+    def stalls_metric(self):
+        """Returns instantiated stalls metric."""
+        return CounterMetricFamily(
+            'brpc_stalls',
+            'Subscriptions closed for not receiving a head within the stall timeout.',
+            labels=self._labels)
+
+    @property
+    def reconnect_attempts_metric(self):
+        """Returns instantiated reconnect attempts metric."""
+        return CounterMetricFamily(
+            'brpc_reconnect_attempts',
+            'Attempts to reconnect the websocket subscription.',
+            labels=self._labels)
+
+    @property
+    def reconnect_duration_metric(self):
+        """Returns instantiated reconnect duration metric."""
+        return HistogramMetricFamily(
+            'brpc_reconnect_duration_seconds',
+            'Time from losing the websocket subscription until it was reconnected.',
+            labels=self._labels)
+
+    @property
+    def slot_metric(self):
+        """Returns instantiated slot metric."""
+        return GaugeMetricFamily(
+            'brpc_slot',
+            'Latest slot per commitment level.',
+            labels=self._labels + ['commitment'])
+
+    @property
+    def slot_lag_metric(self):
+        """Returns instantiated slot lag metric."""
+        return GaugeMetricFamily(
+            'brpc_slot_lag',
+            'Slots a commitment level trails the processed slot.',
+            labels=self._labels + ['commitment'])
+
+    @property
+    def head_lag_metric(self):
+        """Returns instantiated head lag metric."""
+        return GaugeMetricFamily(
+            'brpc_head_lag',
+            'Blocks a tagged block such as safe or finalized trails the latest block.',
+            labels=self._labels + ['tag'])
+
+    @property
+    def syncing_metric(self):
+        """Returns instantiated syncing metric."""
+        return GaugeMetricFamily(
+            'brpc_syncing',
+            'Returns 1 if the endpoint reports that it is not in sync with the network.',
+            labels=self._labels)
+
+    @property
+    def sync_lag_metric(self):
+        """Returns instantiated sync lag metric."""
+        return GaugeMetricFamily(
+            'brpc_sync_lag',
+            'Blocks the endpoint trails the highest block it knows of while syncing.',
+            labels=self._labels)
+
+    @property
+    def server_state_metric(self):
+        """Returns instantiated server state metric."""
+        return GaugeMetricFamily(
+            'brpc_server_state',
+            'Set to 1 for the state the endpoint server reports itself to be in.',
+            labels=self._labels + ['state'])
+
+    @property
+    def peers_metric(self):
+        """Returns instantiated peers metric."""
+        return GaugeMetricFamily(
+            'brpc_peers',
+            'Number of peers the endpoint is connected to.',
+            labels=self._labels)
+
+    @property
+    def chain_tips_metric(self):
+        """Returns instantiated chain tips metric."""
+        return GaugeMetricFamily(
+            'brpc_chain_tips',
+            'Number of chain tips known to the endpoint by status.',
+            labels=self._labels + ['status'])
+
+    @property
+    def mempool_transactions_metric(self):
+        """Returns instantiated mempool transactions metric."""
+        return GaugeMetricFamily(
+            'brpc_mempool_transactions',
+            'Number of transactions in the endpoint mempool.',
+            labels=self._labels)
+
+    @property
+    def mempool_bytes_metric(self):
+        """Returns instantiated mempool bytes metric."""
+        return GaugeMetricFamily(
+            'brpc_mempool_bytes',
+            'Size of the transactions in the endpoint mempool in bytes.',
+            labels=self._labels)
+
+    @property
+    def ledger_version_metric(self):
+        """Returns instantiated ledger version metric."""
+        return GaugeMetricFamily(
+            'brpc_ledger_version',
+            'Latest ledger version of the endpoint.',
+            labels=self._labels)
+
+    @property
+    def pruning_window_metric(self):
+        """Returns instantiated pruning window metric."""
+        return GaugeMetricFamily(
+            'brpc_pruning_window',
+            'Number of versions between the oldest retained and the latest one.',
+            labels=self._labels)
+
+    @property
+    def request_phase_duration_metric(self):
+        """Returns instantiated request phase duration metric."""
+        return HistogramMetricFamily(
+            'brpc_request_phase_duration_seconds',
+            'Duration of https request phases: dns, connect, tls, ttfb and download.',
+            labels=self._labels + ['phase'])
+
+    @property
+    def response_size_metric(self):
+        """Returns instantiated response size metric."""
+        return HistogramMetricFamily(
+            'brpc_response_size_bytes',
+            'Size of https response bodies.',
+            labels=self._labels)
+
     @property
     def block_height_delta_metric(self):
         """Returns instantiated block height delta metric.
@@ -95,27 +330,246 @@ class MetricsLoader():
             'Delta compared between highest total difficulty of the latest block in the pool.',
             labels=self._labels)
 
+    @property
+    def ledger_version_delta_metric(self):
+        """Returns instantiated ledger version delta metric.
+        This metric measures the delta between ledger versions relative to the max
+        ledger version"""
+        return GaugeMetricFamily(
+            'brpc_ledger_version_behind_highest',
+            'Difference between ledger versions relative to the max ledger version',
+            labels=self._labels)
 
-class PrometheusCustomCollector():  # pylint: disable=too-few-public-methods
+    @property
+    def exporter_scrape_duration_metric(self):
+        """Returns instantiated exporter scrape duration metric."""
+        return HistogramMetricFamily(
+            'brpc_exporter_scrape_duration_seconds',
+            'Time spent collecting metrics from all endpoints per scrape.')
+
+    @property
+    def exporter_probe_duration_metric(self):
+        """Returns instantiated exporter probe duration metric."""
+        return HistogramMetricFamily(
+            'brpc_exporter_probe_duration_seconds',
+            'Time spent in a single collector probe such as alive or block_height.',
+            labels=self._labels + ['probe'])
+
+    @property
+    def exporter_probe_errors_metric(self):
+        """Returns instantiated exporter probe errors metric."""
+        return CounterMetricFamily(
+            'brpc_exporter_probe_errors',
+            'Exceptions raised by collector probes, by exception type.',
+            labels=self._labels + ['probe', 'error'])
+
+    @property
+    def exporter_probes_in_flight_metric(self):
+        """Returns instantiated exporter probes in flight metric."""
+        return GaugeMetricFamily(
+            'brpc_exporter_probes_in_flight_peak',
+            'Highest number of probes executing concurrently during the last scrape.')
+
+    @property
+    def exporter_requests_metric(self):
+        """Returns instantiated exporter requests metric."""
+        return CounterMetricFamily(
+            'brpc_exporter_requests',
+            'Requests sent by the endpoint interface, by RPC method.',
+            labels=self._labels + ['method'])
+
+    @property
+    def exporter_request_errors_metric(self):
+        """Returns instantiated exporter request errors metric."""
+        return CounterMetricFamily(
+            'brpc_exporter_request_errors',
+            'Failed requests of the endpoint interface, by error type including timeouts.',
+            labels=self._labels + ['error'])
+
+    @property
+    def exporter_threads_metric(self):
+        """Returns instantiated exporter threads metric."""
+        return GaugeMetricFamily(
+            'brpc_exporter_threads',
+            'Number of live threads in the exporter process.')
+
+
+class ScrapePlan():  # pylint: disable=too-few-public-methods
+    """The probes a collector supports, split into remote and inline probes,
+    each as a tuple of probe name and whether it returns labeled values.
+    Probes in the INLINE_PROBES attribute of the collector are inline."""
+
+    def __init__(self, collector):
+        inline_probes = INLINE_PROBES + tuple(
+            probe for probe in scrape_plan_key(collector)[1] if probe not in INLINE_PROBES)
+        self.remote = tuple((probe, probe in LABELED_PROBES) for probe in REMOTE_PROBES
+                            if probe not in inline_probes and hasattr(collector, probe))
+        self.inline = tuple((probe, probe in LABELED_PROBES)
+                            for probe in inline_probes if hasattr(collector, probe))
+
+
+def scrape_plan_key(collector) -> tuple:
+    """Returns the class of a collector and the probes it declares inline,
+    collectors with equal keys share a scrape plan."""
+    return type(collector), tuple(getattr(collector, 'INLINE_PROBES', ()))
+
+
+class PrometheusCustomCollector():  # pylint: disable=too-few-public-methods,too-many-instance-attributes
     """https://github.com/prometheus/client_python#custom-collectors"""
 
     def __init__(self):
         self._collector_registry = CollectorRegistry().get_collector_registry
         self._metrics_loader = MetricsLoader()
+        self._logger_metadata = {'component': 'PrometheusCustomCollector'}
+        self._scrape_duration = Histogram(SCRAPE_DURATION_BUCKETS)
+        self._probe_durations = {}
+        self._probe_errors = LabeledCounter()
+        self._in_flight_lock = threading.Lock()
+        self._in_flight = 0
+        self._in_flight_peak = 0
+        self._scrape_plans = self._build_scrape_plans()
+
+    def _build_scrape_plans(self) -> list:
+        """Returns a list of collector and its scrape plan. Plans are built once
+        per collector class and inline probes, spec collectors of a registry
+        share one spec."""
+        plans = {}
+        scrape_plans = []
+        for collector in self._collector_registry:
+            key = scrape_plan_key(collector)
+            plan = plans.get(key)
+            if plan is None:
+                plan = plans.setdefault(key, ScrapePlan(collector))
+            scrape_plans.append((collector, plan))
+        return scrape_plans
+
+    def _enter_probe(self):
+        with self._in_flight_lock:
+            self._in_flight += 1
+            self._in_flight_peak = max(self._in_flight_peak, self._in_flight)
+
+    def _exit_probe(self, collector, attribute, start_time):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        histogram = self._probe_durations.get((collector, attribute))
+        if histogram is None:
+            histogram = self._probe_durations.setdefault((collector, attribute), Histogram())
+        histogram.observe(perf_counter() - start_time)
+
+    def _probe(self, collector, attribute):
+        """Calls the collector attribute and returns its value, or None if it raised."""
+        self._enter_probe()
+        start_time = perf_counter()
+        try:
+            return getattr(collector, attribute)()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._probe_errors.inc((collector, attribute, type(error).__name__))
+            logger.error("Collector probe raised an exception.",
+                         probe=attribute,
+                         error=error,
+                         **self._logger_metadata)
+            return None
+        finally:
+            self._exit_probe(collector, attribute, start_time)
 
     def _write_metric(self, collector, metric, attribute):
         """Gets metric from collector and writes it"""
-        if hasattr(collector, attribute):
-            metric_value = getattr(collector, attribute)()
-            if metric_value is not None:
-                metric.add_metric(collector.labels, metric_value)
+        metric_value = self._probe(collector, attribute)
+        if metric_value is not None:
+            metric.add_metric(collector.labels, metric_value)
+
+    def _write_labeled_metric(self, collector, metric, attribute):
+        """Gets a dict of label value to metric value from collector and
+        writes a sample for each entry."""
+        metric_values = self._probe(collector, attribute)
+        if isinstance(metric_values, dict):
+            for label, metric_value in metric_values.items():
+                metric.add_metric(collector.labels + [label], metric_value)
+
+    def _write_latency_distributions(self, histogram_metric, quantile_metric, rpc_metric):
+        """Writes latency histograms and rolling window quantiles of each interface."""
+        for collector in self._collector_registry:
+            rpc_histogram = getattr(collector.interface, 'rpc_latency_histogram', None)
+            if isinstance(rpc_histogram, Histogram):
+                rpc_metric.add_metric(collector.labels, *rpc_histogram.snapshot())
+            histogram = getattr(collector.interface, 'latency_histogram', None)
+            if isinstance(histogram, Histogram):
+                histogram_metric.add_metric(collector.labels, *histogram.snapshot())
+            window = getattr(collector.interface, 'latency_window', None)
+            if isinstance(window, RollingWindow):
+                for quantile, value in window.quantiles().items():
+                    quantile_metric.add_metric(collector.labels + [str(quantile)], value)
+
+    def _write_head_metrics(self, propagation_delay_metric, heads_first_seen_metric,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                            reorgs_metric, reorg_depth_metric, head_age_metric,
+                            head_arrival_delay_metric):
+        """Writes metrics tracked by the head subscription of each interface."""
+        for collector in self._collector_registry:
+            arrival_delay = getattr(collector.interface, 'head_arrival_delay_histogram', None)
+            if isinstance(arrival_delay, Histogram):
+                head_arrival_delay_metric.add_metric(collector.labels, *arrival_delay.snapshot())
+                head_age = collector.interface.head_age
+                if head_age is not None:
+                    head_age_metric.add_metric(collector.labels, head_age)
+            reorg_depth = getattr(collector.interface, 'reorg_depth_histogram', None)
+            if isinstance(reorg_depth, Histogram):
+                reorgs_metric.add_metric(collector.labels, collector.interface.reorgs)
+                reorg_depth_metric.add_metric(collector.labels, *reorg_depth.snapshot())
+            propagation_delay = getattr(collector.interface, 'propagation_delay_histogram', None)
+            if isinstance(propagation_delay, Histogram):
+                propagation_delay_metric.add_metric(
+                    collector.labels, *propagation_delay.snapshot())
+                heads_first_seen_metric.add_metric(
+                    collector.labels, collector.interface.heads_first_seen)
+
+    def _write_connection_metrics(self, block_interval_metric, stalls_metric,
+                                  reconnect_attempts_metric, reconnect_duration_metric):
+        """Writes stall detection and reconnect metrics of websocket subscriptions."""
+        for collector in self._collector_registry:
+            stalls = getattr(collector.interface, 'stalls', None)
+            if not isinstance(stalls, int):
+                continue
+            stalls_metric.add_metric(collector.labels, stalls)
+            reconnect_attempts_metric.add_metric(
+                collector.labels, collector.interface.reconnect_attempts)
+            reconnect_duration_metric.add_metric(
+                collector.labels, *collector.interface.reconnect_duration_histogram.snapshot())
+            block_interval = collector.interface.block_interval
+            if block_interval is not None:
+                block_interval_metric.add_metric(collector.labels, block_interval)
+
+    def _write_request_phases(self, phase_metric, response_size_metric):
+        """Writes request phase durations and response sizes of https interfaces."""
+        for collector in self._collector_registry:
+            phase_histograms = getattr(collector.interface, 'phase_histograms', None)
+            if not isinstance(phase_histograms, dict):
+                continue
+            for phase, histogram in phase_histograms.items():
+                phase_metric.add_metric(collector.labels + [phase], *histogram.snapshot())
+            response_size_metric.add_metric(
+                collector.labels, *collector.interface.response_size_histogram.snapshot())
+
+    def _write_exporter_metrics(self, probe_duration_metric, probe_errors_metric,
+                                requests_metric, request_errors_metric):
+        """Writes the self-instrumentation metrics accumulated across scrapes."""
+        for (collector, attribute), histogram in list(self._probe_durations.items()):
+            buckets, total = histogram.snapshot()
+            probe_duration_metric.add_metric(collector.labels + [attribute], buckets, total)
+        for (collector, attribute, error), count in self._probe_errors.items():
+            probe_errors_metric.add_metric(collector.labels + [attribute, error], count)
+        for collector in self._collector_registry:
+            request_counter = getattr(collector.interface, 'request_counter', None)
+            if isinstance(request_counter, LabeledCounter):
+                for method, count in request_counter.items():
+                    requests_metric.add_metric(collector.labels + [method], count)
+            error_counter = getattr(collector.interface, 'error_counter', None)
+            if isinstance(error_counter, LabeledCounter):
+                for error, count in error_counter.items():
+                    request_errors_metric.add_metric(collector.labels + [error], count)
 
     def get_thread_count(self) -> int:
-        """Returns the required number of threads based on number of metrics and collectors"""
-        size_of_pool = len(self._collector_registry)
-        number_of_metrics = len(
-            [attr for attr in MetricsLoader.__dict__.values() if isinstance(attr, property)])
-        return size_of_pool * number_of_metrics
+        """Returns the required number of threads, one for each remote probe of every collector"""
+        return max(1, sum(len(plan.remote) for _, plan in self._scrape_plans))
 
     def delta_compared_to_max(self, source_metric, target_metric):
         """Returns metric measuring the difference between samples in the source metric."""
@@ -128,8 +582,10 @@ class PrometheusCustomCollector():  # pylint: disable=too-few-public-methods
             delta = highest - sample[2]
             target_metric.add_metric(list(sample[1].values()), delta)
 
-    def collect(self):
+    def collect(self):  # pylint: disable=too-many-locals,too-many-statements
         """This method is called each time /metric is called."""
+        start_time = perf_counter()
+        self._in_flight_peak = 0
         health_metric = self._metrics_loader.health_metric
         heads_received_metric = self._metrics_loader.heads_received_metric
         disconnects_metric = self._metrics_loader.disconnects_metric
@@ -137,34 +593,100 @@ class PrometheusCustomCollector():  # pylint: disable=too-few-public-methods
         finalized_block_height_metric = self._metrics_loader.finalized_block_height_metric
         client_version_metric = self._metrics_loader.client_version_metric
         total_difficulty_metric = self._metrics_loader.total_difficulty_metric
+        slot_metric = self._metrics_loader.slot_metric
+        slot_lag_metric = self._metrics_loader.slot_lag_metric
+        head_lag_metric = self._metrics_loader.head_lag_metric
+        syncing_metric = self._metrics_loader.syncing_metric
+        sync_lag_metric = self._metrics_loader.sync_lag_metric
+        server_state_metric = self._metrics_loader.server_state_metric
+        peers_metric = self._metrics_loader.peers_metric
+        chain_tips_metric = self._metrics_loader.chain_tips_metric
+        mempool_transactions_metric = self._metrics_loader.mempool_transactions_metric
+        mempool_bytes_metric = self._metrics_loader.mempool_bytes_metric
+        ledger_version_metric = self._metrics_loader.ledger_version_metric
+        pruning_window_metric = self._metrics_loader.pruning_window_metric
         latency_metric = self._metrics_loader.latency_metric
+        latency_histogram_metric = self._metrics_loader.latency_histogram_metric
+        latency_quantile_metric = self._metrics_loader.latency_quantile_metric
+        rpc_latency_metric = self._metrics_loader.rpc_latency_metric
+        head_propagation_delay_metric = self._metrics_loader.head_propagation_delay_metric
+        heads_first_seen_metric = self._metrics_loader.heads_first_seen_metric
+        reorgs_metric = self._metrics_loader.reorgs_metric
+        reorg_depth_metric = self._metrics_loader.reorg_depth_metric
+        head_age_metric = self._metrics_loader.head_age_metric
+        head_arrival_delay_metric = self._metrics_loader.head_arrival_delay_metric
+        block_interval_metric = self._metrics_loader.block_interval_metric
+        stalls_metric = self._metrics_loader.stalls_metric
+        reconnect_attempts_metric = self._metrics_loader.reconnect_attempts_metric
+        reconnect_duration_metric = self._metrics_loader.reconnect_duration_metric
+        request_phase_duration_metric = self._metrics_loader.request_phase_duration_metric
+        response_size_metric = self._metrics_loader.response_size_metric
         block_height_delta_metric = self._metrics_loader.block_height_delta_metric
         difficulty_delta_metric = self._metrics_loader.difficulty_delta_metric
+        ledger_version_delta_metric = self._metrics_loader.ledger_version_delta_metric
+        scrape_duration_metric = self._metrics_loader.exporter_scrape_duration_metric
+        probe_duration_metric = self._metrics_loader.exporter_probe_duration_metric
+        probe_errors_metric = self._metrics_loader.exporter_probe_errors_metric
+        probes_in_flight_metric = self._metrics_loader.exporter_probes_in_flight_metric
+        requests_metric = self._metrics_loader.exporter_requests_metric
+        request_errors_metric = self._metrics_loader.exporter_request_errors_metric
+        threads_metric = self._metrics_loader.exporter_threads_metric
+
+        probe_metrics = {
+            'alive': health_metric,
+            'heads_received': heads_received_metric,
+            'disconnects': disconnects_metric,
+            'client_version': client_version_metric,
+            'block_height': block_height_metric,
+            'finalized_block_height': finalized_block_height_metric,
+            'total_difficulty': total_difficulty_metric,
+            'slots': slot_metric,
+            'slot_lag': slot_lag_metric,
+            'head_lag': head_lag_metric,
+            'syncing': syncing_metric,
+            'sync_lag': sync_lag_metric,
+            'server_state': server_state_metric,
+            'peer_count': peers_metric,
+            'head_age': head_age_metric,
+            'chain_tips': chain_tips_metric,
+            'mempool_size': mempool_transactions_metric,
+            'mempool_bytes': mempool_bytes_metric,
+            'ledger_version': ledger_version_metric,
+            'pruning_window': pruning_window_metric,
+            'latency': latency_metric
+        }
+        writers = {False: self._write_metric, True: self._write_labeled_metric}
 
         with ThreadPoolExecutor(
                 max_workers=self.get_thread_count()) as executor:
-            for collector in self._collector_registry:
+            for collector, plan in self._scrape_plans:
                 collector.interface.cache.clear_cache()
-                executor.submit(self._write_metric, collector,
-                                health_metric, 'alive')
-                executor.submit(self._write_metric, collector,
-                                client_version_metric, 'client_version')
-                executor.submit(self._write_metric, collector,
-                                block_height_metric, 'block_height')
-                executor.submit(self._write_metric, collector,
-                                finalized_block_height_metric, 'finalized_block_height')
-                executor.submit(self._write_metric, collector,
-                                heads_received_metric, 'heads_received')
-                executor.submit(self._write_metric, collector,
-                                disconnects_metric, 'disconnects')
-                executor.submit(self._write_metric, collector,
-                                total_difficulty_metric, 'total_difficulty')
-        for collector in self._collector_registry:
-            self._write_metric(collector, latency_metric, 'latency')
+                for attribute, labeled in plan.remote:
+                    executor.submit(writers[labeled], collector,
+                                    probe_metrics[attribute], attribute)
+        for collector, plan in self._scrape_plans:
+            for attribute, labeled in plan.inline:
+                writers[labeled](collector, probe_metrics[attribute], attribute)
+        self._write_latency_distributions(latency_histogram_metric, latency_quantile_metric,
+                                          rpc_latency_metric)
+        self._write_request_phases(request_phase_duration_metric, response_size_metric)
+        self._write_head_metrics(head_propagation_delay_metric, heads_first_seen_metric,
+                                 reorgs_metric, reorg_depth_metric, head_age_metric,
+                                 head_arrival_delay_metric)
+        self._write_connection_metrics(block_interval_metric, stalls_metric,
+                                       reconnect_attempts_metric, reconnect_duration_metric)
         self.delta_compared_to_max(
             block_height_metric, block_height_delta_metric)
         self.delta_compared_to_max(
             total_difficulty_metric, difficulty_delta_metric)
+        self.delta_compared_to_max(
+            ledger_version_metric, ledger_version_delta_metric)
+        self._scrape_duration.observe(perf_counter() - start_time)
+        self._write_exporter_metrics(probe_duration_metric, probe_errors_metric,
+                                     requests_metric, request_errors_metric)
+        scrape_duration_metric.add_metric([], *self._scrape_duration.snapshot())
+        probes_in_flight_metric.add_metric([], self._in_flight_peak)
+        threads_metric.add_metric([], threading.active_count())
 
         yield health_metric
         yield heads_received_metric
@@ -173,6 +695,41 @@ class PrometheusCustomCollector():  # pylint: disable=too-few-public-methods
         yield finalized_block_height_metric
         yield client_version_metric
         yield total_difficulty_metric
+        yield slot_metric
+        yield slot_lag_metric
+        yield head_lag_metric
+        yield syncing_metric
+        yield sync_lag_metric
+        yield server_state_metric
+        yield peers_metric
+        yield chain_tips_metric
+        yield mempool_transactions_metric
+        yield mempool_bytes_metric
+        yield ledger_version_metric
+        yield pruning_window_metric
         yield latency_metric
+        yield latency_histogram_metric
+        yield latency_quantile_metric
+        yield rpc_latency_metric
+        yield head_propagation_delay_metric
+        yield heads_first_seen_metric
+        yield reorgs_metric
+        yield reorg_depth_metric
+        yield head_age_metric
+        yield head_arrival_delay_metric
+        yield block_interval_metric
+        yield stalls_metric
+        yield reconnect_attempts_metric
+        yield reconnect_duration_metric
+        yield request_phase_duration_metric
+        yield response_size_metric
         yield block_height_delta_metric
         yield difficulty_delta_metric
+        yield ledger_version_delta_metric
+        yield scrape_duration_metric
+        yield probe_duration_metric
+        yield probe_errors_metric
+        yield probes_in_flight_metric
+        yield requests_metric
+        yield request_errors_metric
+        yield threads_metric
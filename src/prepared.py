@@ -0,0 +1,26 @@
+"""Module for JSON-RPC requests encoded once and reused for every call."""
+import hashlib
+
+from codec import codec
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+class PreparedRequest():  # pylint: disable=too-few-public-methods
+    """A JSON-RPC payload, or a batch of payloads, with its encoded body and a
+    cache key hashed from the body. Collectors prepare their fixed payloads
+    once at construction so they are not serialized again on every scrape."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.body = codec.encode(payload)
+        self.text = self.body.decode('utf-8')
+        self.headers = JSON_HEADERS
+        self.cache_key = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+
+
+def prepare(payload) -> PreparedRequest:
+    """Returns payload as a prepared request, unless it already is one."""
+    if isinstance(payload, PreparedRequest):
+        return payload
+    return PreparedRequest(payload)
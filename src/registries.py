@@ -1,8 +1,9 @@
 """A module that providers registries of objects."""
 import sys
 
-from configuration import Config
+from configuration import Config, SUBSCRIBE_URL_SCHEMES
 import collectors
+from specs import CompiledSpec
 from log import logger
 
 
@@ -12,8 +13,9 @@ class Endpoint():  # pylint: disable=too-few-public-methods
     def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
             self, url, provider, blockchain, network_name, network_type, integration_maturity,
             canonical_name, chain_selector,
-            chain_id, **client_parameters):
+            chain_id, subscribe_url=None, **client_parameters):
         self.url = url
+        self.subscribe_url = subscribe_url
         self.chain_id = chain_id
         self.labels = [
             url, provider, blockchain, network_name, network_type, integration_maturity,
@@ -56,6 +58,7 @@ class EndpointRegistry(Config):
                          self.get_property('canonical_name'),
                          self.get_property('chain_selector'),
                          self.get_property('chain_id'),
+                         subscribe_url=item.get('subscribe_url'),
                          **self.client_parameters))
         return endpoints_list
 
@@ -68,6 +71,15 @@ class CollectorRegistry(EndpointRegistry):
         """Iterates trough all of the instantiated endpoints and loads
         proper collector type based on the collector and chain name."""
         collectors_list = []
+        spec_parameters = {}
+        if self.collector == "spec":
+            spec = self.get_property('collector_spec')
+            if spec is None:
+                self._logger.error("Spec collector requires a collector_spec",
+                                   **self._logger_metadata)
+                sys.exit(1)
+            # Compiled once and shared by the collectors of every endpoint.
+            spec_parameters['spec'] = CompiledSpec(spec)
 
         for item in self.get_endpoint_registry:
             collector = None
@@ -94,6 +106,8 @@ class CollectorRegistry(EndpointRegistry):
                     collector = collectors.EvmHttpCollector
                 case "evm", other:  # pylint: disable=unused-variable
                     collector = collectors.EvmCollector
+                case "spec", other:  # pylint: disable=unused-variable
+                    collector = collectors.SpecCollector
             if collector is None:
                 self._logger.error("Endpoint has no supported collector",
                                    collector=self.collector,
@@ -101,7 +115,10 @@ class CollectorRegistry(EndpointRegistry):
                                    **self._logger_metadata)
                 sys.exit(1)
             else:
+                parameters = dict(self.client_parameters, **spec_parameters)
+                if self.collector in SUBSCRIBE_URL_SCHEMES and item.subscribe_url is not None:
+                    parameters['subscribe_url'] = item.subscribe_url
                 collectors_list.append(collector(item.url,
                                                  item.labels, item.chain_id,
-                                                 **self.client_parameters))
+                                                 **parameters))
         return collectors_list
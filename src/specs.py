@@ -0,0 +1,65 @@
+"""Module for compiling declarative collector specs into requests and extractors."""
+import json
+from operator import itemgetter
+
+from prepared import PreparedRequest
+
+# Probes a spec may define, named like the collector methods the metrics call.
+SPEC_PROBES = ('block_height', 'finalized_block_height', 'total_difficulty',
+               'client_version', 'peer_count', 'syncing')
+
+TRANSFORMS = {
+    'raw': lambda value: value,
+    'hex': lambda value: int(value, 16),
+    'number': float,
+    'string': str,
+    # For results such as eth_syncing which are false or a status object.
+    'bool': lambda value: int(bool(value))
+}
+
+
+def compile_extractor(index: int, path, transform: str):
+    """Returns a function taking the results of a batch and returning the
+    value at path of the result at index, converted by transform, or None if
+    the value is missing or cannot be converted."""
+    getters = [itemgetter(index)] + [itemgetter(key) for key in path]
+    convert = TRANSFORMS[transform]
+
+    def extract(results):
+        value = results
+        try:
+            for getter in getters:
+                value = getter(value)
+            if value is None:
+                return None
+            return convert(value)
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    return extract
+
+
+class CompiledSpec():  # pylint: disable=too-few-public-methods
+    """A collector spec from the configuration, compiled once at startup into
+    the payloads of a JSON-RPC batch and an extractor per probe. Probes asking
+    for the same method and params share one request of the batch."""
+
+    def __init__(self, spec: dict):
+        self.payloads = []
+        self.extractors = {}
+        requests = {}
+        for probe, probe_spec in spec['probes'].items():
+            params = probe_spec.get('params', [])
+            request = (probe_spec['method'], json.dumps(params))
+            if request not in requests:
+                requests[request] = len(self.payloads)
+                self.payloads.append({
+                    'jsonrpc': '2.0',
+                    'method': probe_spec['method'],
+                    'params': params,
+                    'id': len(self.payloads) + 1
+                })
+            self.extractors[probe] = compile_extractor(
+                requests[request], probe_spec.get('path', []),
+                probe_spec.get('transform', 'raw'))
+        self.request = PreparedRequest(self.payloads)
@@ -0,0 +1,83 @@
+"""Module for providing thread-safe in-memory metric accumulators."""
+import math
+import threading
+from bisect import bisect_left
+from collections import deque
+from prometheus_client.utils import floatToGoString
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class Histogram():
+    """A rudimentary cumulative histogram, observed from any thread and
+    exported through HistogramMetricFamily on scrape."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._upper_bounds = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts = [0] * len(self._upper_bounds)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Records a single observation."""
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> tuple:
+        """Returns cumulative (le, count) buckets and sum of observations, in the
+        form expected by HistogramMetricFamily.add_metric."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        buckets = []
+        cumulative = 0
+        for upper_bound, count in zip(self._upper_bounds, counts):
+            cumulative += count
+            buckets.append((floatToGoString(upper_bound), cumulative))
+        return buckets, total
+
+
+class LabeledCounter():
+    """A rudimentary counter keyed by arbitrary hashable labels."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount=1):
+        """Increments the counter for key."""
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + amount
+
+    def items(self) -> list:
+        """Returns a list of (key, count) pairs."""
+        with self._lock:
+            return list(self._counts.items())
+
+
+class RollingWindow():
+    """A fixed size ring buffer of the most recent observations, used to
+    compute quantiles in-process between scrapes."""
+
+    def __init__(self, size=1024):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Records a single observation, evicting the oldest one when full."""
+        with self._lock:
+            self._values.append(value)
+
+    def quantiles(self, quantiles=(0.5, 0.9, 0.99)) -> dict:
+        """Returns nearest-rank quantiles of the observations in the window.
+        Returns an empty dict if nothing has been observed yet."""
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return {}
+        return {
+            quantile: values[max(0, math.ceil(quantile * len(values)) - 1)]
+            for quantile in quantiles
+        }
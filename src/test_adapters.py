@@ -0,0 +1,66 @@
+"""Test module for adapters"""
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest import TestCase
+import requests
+
+from adapters import (TimedHTTPAdapter, TimedHTTPConnection, TimedHTTPSConnection,
+                      start_phase_timings)
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Responds Ok to every GET request."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Writes a small successful response."""
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'Ok')
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silences request logging."""
+
+
+class TestTimedHTTPAdapter(TestCase):
+    """Tests the timed transport adapter against a local server"""
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), OkHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_port}/"
+        self.session = requests.Session()
+        self.session.mount('http://', TimedHTTPAdapter())
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_dns_and_connect_phases_recorded(self):
+        """Tests that a new connection records dns and connect phases"""
+        timings = start_phase_timings()
+        response = self.session.get(self.url, timeout=5)
+        self.assertEqual(b'Ok', response.content)
+        self.assertEqual({'dns', 'connect'}, set(timings))
+        self.assertTrue(all(duration >= 0 for duration in timings.values()))
+
+    def test_reused_connection_records_no_phases(self):
+        """Tests that no connection phases are recorded on a kept-alive connection"""
+        self.session.get(self.url, timeout=5)
+        timings = start_phase_timings()
+        self.session.get(self.url, timeout=5)
+        self.assertEqual({}, timings)
+
+    def test_unresolvable_host_raises_connection_error(self):
+        """Tests that a resolution failure surfaces as a requests ConnectionError"""
+        with self.assertRaises(requests.ConnectionError):
+            self.session.get('http://nonexistent.invalid/', timeout=5)
+
+    def test_pool_connection_classes(self):
+        """Tests that the pool manager creates timed connections for both schemes"""
+        pool_classes = self.session.get_adapter(self.url).poolmanager.pool_classes_by_scheme
+        self.assertEqual(TimedHTTPConnection, pool_classes['http'].ConnectionCls)
+        self.assertEqual(TimedHTTPSConnection, pool_classes['https'].ConnectionCls)
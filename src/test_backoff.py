@@ -0,0 +1,38 @@
+"""Test module for backoff"""
+from unittest import TestCase, mock
+
+from backoff import full_jitter, TokenBucket
+
+
+class TestFullJitter(TestCase):
+    """Tests the full jitter backoff"""
+
+    def test_delay_within_exponential_bound(self):
+        """Tests that the delay is drawn between zero and the exponential backoff"""
+        with mock.patch('backoff.random.uniform') as uniform:
+            full_jitter(3, 0.5, 60)
+            uniform.assert_called_once_with(0, 4.0)
+
+    def test_delay_capped(self):
+        """Tests that the upper bound of the delay never exceeds the cap"""
+        for _ in range(100):
+            self.assertLessEqual(full_jitter(20, 1, 30), 30)
+
+
+class TestTokenBucket(TestCase):
+    """Tests the reconnect rate limiter"""
+
+    @mock.patch('backoff.monotonic', return_value=100.0)
+    def test_burst_then_queue(self, _):
+        """Tests that callers beyond the burst wait in line at the refill rate"""
+        bucket = TokenBucket(rate=2, burst=2)
+        self.assertEqual([0.0, 0.0, 0.5, 1.0], [bucket.reserve() for _ in range(4)])
+
+    def test_refill(self):
+        """Tests that tokens refill over time up to the burst"""
+        with mock.patch('backoff.monotonic', return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=1)
+            bucket.reserve()
+        with mock.patch('backoff.monotonic', return_value=200.0):
+            self.assertEqual(0.0, bucket.reserve())
+            self.assertEqual(0.5, bucket.reserve())
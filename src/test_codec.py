@@ -0,0 +1,66 @@
+"""Test module for codec"""
+import json
+import timeit
+from json.decoder import JSONDecodeError
+from unittest import TestCase, mock
+
+import codec
+from codec import available_codecs, get_codec
+from tests.payloads import PAYLOADS
+
+
+class TestCodec(TestCase):
+    """Tests every installed codec"""
+
+    def test_stdlib_always_available(self):
+        """Tests that the standard library codec is the last fallback"""
+        self.assertEqual('json', available_codecs()[-1])
+
+    def test_fastest_codec_selected(self):
+        """Tests that the fastest installed codec is the default"""
+        self.assertEqual(available_codecs()[0], get_codec().name)
+
+    def test_fallback_when_not_installed(self):
+        """Tests that the standard library is used when no faster library is installed"""
+        with mock.patch.dict(codec.CODEC_LIBRARIES, {'orjson': None, 'msgspec': None}):
+            self.assertEqual('json', get_codec().name)
+            with self.assertRaises(ValueError):
+                get_codec('orjson')
+
+    def test_decode_matches_stdlib(self):
+        """Tests that every codec decodes the payloads of each chain like the standard library"""
+        for name in available_codecs():
+            json_codec = get_codec(name)
+            for chain, payload in PAYLOADS.items():
+                message = payload()
+                with self.subTest(codec=name, chain=chain):
+                    self.assertEqual(json.loads(message), json_codec.decode(message))
+                    self.assertEqual(json.loads(message),
+                                     json_codec.decode(message.encode('utf-8')))
+
+    def test_encode_compact(self):
+        """Tests that every codec encodes compact JSON as text and bytes"""
+        for name in available_codecs():
+            json_codec = get_codec(name)
+            with self.subTest(codec=name):
+                self.assertEqual('{"a":[1,"b"]}', json_codec.encode_text({"a": [1, "b"]}))
+                self.assertEqual(b'{"a":[1,"b"]}', json_codec.encode({"a": [1, "b"]}))
+
+    def test_decode_error(self):
+        """Tests that every codec raises JSONDecodeError for malformed input"""
+        for name in available_codecs():
+            with self.subTest(codec=name):
+                with self.assertRaises(JSONDecodeError):
+                    get_codec(name).decode('{"key": invalid}')
+
+    def test_default_codec_not_slower_than_stdlib(self):
+        """Benchmarks decoding the payloads of every chain. The default codec
+        has to decode them at least about as fast as the standard library."""
+        messages = [payload() for payload in PAYLOADS.values()]
+
+        def best_time(json_codec):
+            return min(timeit.repeat(
+                lambda: [json_codec.decode(message) for message in messages],
+                number=20, repeat=5))
+
+        self.assertLessEqual(best_time(get_codec()), best_time(get_codec('json')) * 1.5)
@@ -1,8 +1,90 @@
-# pylint: disable=protected-access, too-many-instance-attributes, duplicate-code
+# pylint: disable=protected-access, too-many-instance-attributes, duplicate-code, too-many-lines
 """Module for testing collectors"""
 from unittest import TestCase, mock
+from structlog.testing import capture_logs
 
 import collectors
+from specs import CompiledSpec
+
+
+def _serve_batch_results(interface):
+    """Answers cached_json_rpc_batch_result of a mocked interface from the
+    return value of its cached_json_rpc_batch_results."""
+    def result(payloads, request_id):
+        results = interface.cached_json_rpc_batch_results(payloads)
+        return None if results is None else results.get(request_id)
+    interface.cached_json_rpc_batch_result.side_effect = result
+
+
+class BatchCollectorTestMixin():
+    """Tests shared by collectors which serve every probe from one JSON-RPC
+    batch. Subclasses set collector_class and the probes read from the batch,
+    and build the batch results keyed by request id in _batch_results."""
+    collector_class = None
+    probes = ()
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Creates the collector with a mocked https interface."""
+        self.url = "https://test.com"
+        self.labels = ["dummy", "labels"]
+        self.chain_id = 123
+        self.open_timeout = 8
+        self.ping_timeout = 9
+        self.client_params = {
+            "open_timeout": self.open_timeout, "ping_timeout": self.ping_timeout}
+        with mock.patch('collectors.HttpsInterface') as mocked_connection:
+            self.collector = self.collector_class(  # pylint: disable=not-callable
+                self.url, self.labels, self.chain_id, **self.client_params)
+            self.mocked_connection = mocked_connection
+        _serve_batch_results(self.mocked_connection.return_value)
+        self.batch_post = self.mocked_connection.return_value.cached_json_rpc_batch_results
+        self._batch_returns()
+
+    def _batch_results(self, *args, **kwargs) -> dict:
+        raise NotImplementedError
+
+    def _batch_returns(self, *args, **kwargs):
+        self.batch_post.return_value = self._batch_results(*args, **kwargs)
+
+    @property
+    def batch_request(self):
+        """Returns the prepared batch request every probe is served by."""
+        return self.collector.batch_request
+
+    def test_logger_metadata(self):
+        """Validate logger metadata. Makes sure url is stripped by helpers.strip_url
+        function."""
+        expected_metadata = {
+            'component': self.collector_class.__name__, 'url': 'test.com'}
+        self.assertEqual(expected_metadata, self.collector._logger_metadata)
+
+    def test_https_interface_created(self):
+        """Tests that the collector calls the https interface with the correct args"""
+        self.mocked_connection.assert_called_once_with(
+            self.url, self.open_timeout, self.ping_timeout)
+
+    def test_interface_attribute_exists(self):
+        """Tests that the interface attribute exists.
+        May be used by external calls to access objects such as the interface cache"""
+        self.assertTrue(hasattr(self.collector, 'interface'))
+
+    def test_batch_payloads_have_unique_ids(self):
+        """Tests that every request of the batch can be matched to its response"""
+        ids = [payload['id'] for payload in self.batch_request.payload]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_probes_share_one_batch(self):
+        """Tests that every probe is served by the same batch"""
+        for probe in self.probes:
+            getattr(self.collector, probe)()
+            self.batch_post.assert_called_with(self.batch_request)
+        self.mocked_connection.return_value.cached_json_rpc_post.assert_not_called()
+        self.mocked_connection.return_value.json_rpc_post.assert_not_called()
+
+    def test_alive_false(self):
+        """Tests the alive function returns false when the batch returns None"""
+        self.batch_post.return_value = None
+        self.assertFalse(self.collector.alive())
 
 
 class TestEvmCollector(TestCase):
@@ -19,6 +101,11 @@ class TestEvmCollector(TestCase):
             "id": self.chain_id,
             "params": ["newHeads"]
         }
+        self.rpc_probe_payload = {
+            "method": 'eth_blockNumber',
+            "jsonrpc": "2.0",
+            "params": []
+        }
         with mock.patch('collectors.WebsocketInterface') as mocked_websocket:
             self.evm_collector = collectors.EvmCollector(
                 self.url, self.labels, self.chain_id, **self.client_params)
@@ -27,7 +114,22 @@ class TestEvmCollector(TestCase):
     def test_websocket_interface_created(self):
         """Tests that the evm collector calls the websocket interface with the correct args"""
         self.mocked_websocket.assert_called_once_with(
-            self.url, self.sub_payload, **self.client_params)
+            self.url, self.sub_payload, rpc_probe_payload=self.rpc_probe_payload,
+            head_number_key='number',
+            head_arrivals=collectors.EvmCollector._head_arrivals[self.chain_id],
+            **self.client_params)
+
+    def test_head_arrivals_shared_per_chain(self):
+        """Tests that collectors of the same chain share a head arrival index
+        and collectors of other chains do not"""
+        with mock.patch('collectors.WebsocketInterface') as mocked_websocket:
+            collectors.EvmCollector(self.url, self.labels, self.chain_id, **self.client_params)
+            collectors.EvmCollector(self.url, self.labels, 456, **self.client_params)
+            same_chain, other_chain = mocked_websocket.call_args_list
+        self.assertIs(self.mocked_websocket.call_args.kwargs['head_arrivals'],
+                      same_chain.kwargs['head_arrivals'])
+        self.assertIsNot(same_chain.kwargs['head_arrivals'],
+                         other_chain.kwargs['head_arrivals'])
 
     def test_interface_attribute_exists(self):
         """Tests that the interface attribute exists.
@@ -75,7 +177,9 @@ class TestEvmCollector(TestCase):
             "id": self.chain_id
         }
         self.evm_collector.finalized_block_height()
-        self.mocked_websocket.return_value.query.assert_called_once_with(payload)
+        request = self.mocked_websocket.return_value.query.call_args.args[0]
+        self.assertIs(self.evm_collector.finalized_block_height_request, request)
+        self.assertEqual(payload, request.payload)
 
     def test_finalized_block_height_return_none_when_query_none(self):
         """Tests that finalized_block_height returns None if the query returns None"""
@@ -110,7 +214,8 @@ class TestEvmCollector(TestCase):
         }
         self.evm_collector.client_version()
         self.mocked_websocket.return_value.cached_query.assert_called_once_with(
-            payload)
+            self.evm_collector.client_version_request)
+        self.assertEqual(payload, self.evm_collector.client_version_request.payload)
 
     def test_client_version_return_none(self):
         """Tests that the client_version returns None if the query returns no version"""
@@ -144,6 +249,11 @@ class TestConfluxCollector(TestCase):
             "id": self.chain_id,
             "params": ["newHeads"]
         }
+        self.rpc_probe_payload = {
+            "method": 'cfx_epochNumber',
+            "jsonrpc": "2.0",
+            "params": ["latest_mined"]
+        }
         with mock.patch('collectors.WebsocketInterface') as mocked_websocket:
             self.conflux_collector = collectors.ConfluxCollector(
                 self.url, self.labels, self.chain_id, **self.client_params)
@@ -152,7 +262,8 @@ class TestConfluxCollector(TestCase):
     def test_websocket_interface_created(self):
         """Tests that the conflux collector calls the websocket interface with the correct args"""
         self.mocked_websocket.assert_called_once_with(
-            self.url, self.sub_payload, **self.client_params)
+            self.url, self.sub_payload, rpc_probe_payload=self.rpc_probe_payload,
+            **self.client_params)
 
     def test_interface_attribute_exists(self):
         """Tests that the interface attribute exists.
@@ -197,7 +308,8 @@ class TestConfluxCollector(TestCase):
         }
         self.conflux_collector.client_version()
         self.mocked_websocket.return_value.cached_query.assert_called_once_with(
-            payload)
+            self.conflux_collector.client_version_request)
+        self.assertEqual(payload, self.conflux_collector.client_version_request.payload)
 
     def test_client_version_return_none(self):
         """Tests that the client_version returns None if the query returns no version"""
@@ -211,6 +323,36 @@ class TestConfluxCollector(TestCase):
         result = self.conflux_collector.client_version()
         self.assertEqual({"client_version": "test/v1.23"}, result)
 
+    def test_epoch_numbers_requested_over_subscription(self):
+        """Tests that every epoch tag is requested in one go over the open socket"""
+        self.conflux_collector.finalized_block_height()
+        self.mocked_websocket.return_value.cached_request.assert_called_once_with(
+            self.conflux_collector.epoch_number_request)
+        self.assertEqual([{"method": 'cfx_epochNumber', "jsonrpc": "2.0", "params": [tag]}
+                          for tag in ("latest_confirmed", "latest_finalized", "latest_state")],
+                         self.conflux_collector.epoch_number_request.payload)
+        self.mocked_websocket.return_value.cached_query.assert_not_called()
+
+    def test_finalized_block_height(self):
+        """Tests that the finalized block height is the latest finalized epoch"""
+        self.mocked_websocket.return_value.cached_request.return_value = ["0x64", "0x32", "0x60"]
+        self.assertEqual(50, self.conflux_collector.finalized_block_height())
+
+    def test_head_lag(self):
+        """Tests how many epochs each tag trails the head, skipping failed tags"""
+        self.mocked_websocket.return_value.get_message_property_to_hex.return_value = 104
+        self.mocked_websocket.return_value.cached_request.return_value = ["0x64", None, "0x60"]
+        self.assertEqual({'confirmed': 4, 'state': 8}, self.conflux_collector.head_lag())
+        self.mocked_websocket.return_value.get_message_property_to_hex.assert_called_once_with(
+            'epochNumber')
+
+    def test_head_lag_returns_none(self):
+        """Tests that the head lag is None while not connected"""
+        self.mocked_websocket.return_value.get_message_property_to_hex.return_value = 104
+        self.mocked_websocket.return_value.cached_request.return_value = None
+        self.assertEqual(None, self.conflux_collector.head_lag())
+        self.assertEqual(None, self.conflux_collector.finalized_block_height())  # pylint: disable=no-member
+
     def test_latency(self):
         """Tests that the latency is obtained from the interface based on subscription ping"""
         self.mocked_websocket.return_value.subscription_ping_latency = 0.123
@@ -238,181 +380,246 @@ class TestCardanoCollector(TestCase):
     def test_websocket_interface_created(self):
         """Tests that the cardano collector calls the websocket interface with the correct args"""
         self.mocked_websocket.assert_called_once_with(
-            self.url, **self.client_params)
+            self.url, rpc_probe_payload=self.block_height_payload, **self.client_params)
 
     def test_interface_attribute_exists(self):
         """Tests that the interface attribute exists.
         May be used by external calls to access objects such as the interface cache"""
         self.assertTrue(hasattr(self.cardano_collector, 'interface'))
 
-    def test_websocket_attr_daemon_is_none(self):
-        """Tests that the daemon attribute is None"""
-        self.assertEqual(None, self.mocked_websocket.return_value.daemon)
+    def test_websocket_attr_daemon_is_bool(self):
+        """Tests that the daemon attribute is of type bool"""
+        self.assertEqual(bool, type(self.mocked_websocket.return_value.daemon))
 
-    def test_alive_call(self):
-        """Tests the alive function uses the correct call and args"""
-        self.cardano_collector.alive()
-        self.mocked_websocket.return_value.cached_query.assert_called_once_with(
-            self.block_height_payload, skip_checks=True)
+    def test_websocket_interface_started(self):
+        """Tests that the websocket polling thread is started"""
+        self.mocked_websocket.return_value.start.assert_called_once_with()
 
-    def test_alive_false(self):
-        """Tests the alive function returns false when query returns None"""
-        self.mocked_websocket.return_value.cached_query.return_value = None
-        result = self.cardano_collector.alive()
-        self.assertFalse(result)
+    def test_alive_is_true(self):
+        """Tests the alive function returns true when websocket.healthy is true"""
+        self.mocked_websocket.return_value.healthy = True
+        self.assertTrue(self.cardano_collector.alive())
+
+    def test_alive_is_false(self):
+        """Tests the alive function returns false when websocket.healthy is false"""
+        self.mocked_websocket.return_value.healthy = False
+        self.assertFalse(self.cardano_collector.alive())
 
     def test_block_height(self):
-        """Tests the block_height function uses the correct call and args to get block height"""
-        self.cardano_collector.block_height()
-        self.mocked_websocket.return_value.cached_query.assert_called_once_with(
-            self.block_height_payload, skip_checks=True)
+        """Tests the block_height function returns the latest polled block height"""
+        self.mocked_websocket.return_value.latest_probe_result = 10642520
+        self.assertEqual(10642520, self.cardano_collector.block_height())
+        self.mocked_websocket.return_value.query.assert_not_called()
 
     def test_latency(self):
-        """Tests that the latency is obtained from the interface based on latest_query_latency"""
-        self.mocked_websocket.return_value.latest_query_latency = 0.123
+        """Tests that the latency is the round trip of the block height query"""
+        self.mocked_websocket.return_value.latest_probe_latency = 0.123
         self.assertEqual(0.123, self.cardano_collector.latency())
 
 
-class TestBitcoinCollector(TestCase):
+class TestBitcoinCollector(BatchCollectorTestMixin, TestCase):  # pylint: disable=too-many-public-methods
     """Tests the bitcoin collector class"""
-
-    def setUp(self):
-        self.url = "wss://test.com"
-        self.labels = ["dummy", "labels"]
-        self.chain_id = 123
-        self.open_timeout = 8
-        self.ping_timeout = 9
-        self.client_params = {
-            "open_timeout": self.open_timeout, "ping_timeout": self.ping_timeout}
-        self.network_info_payload = {
-            "jsonrpc": "1.0",
-            "id": "exporter",
-            "method": "getnetworkinfo"
-        }
-        self.blockchain_info_payload = {
-            "jsonrpc": "1.0",
-            "id": "exporter",
-            "method": "getblockchaininfo",
-            "params": []
-        }
-        with mock.patch('collectors.HttpsInterface') as mocked_connection:
-            self.bitcoin_collector = collectors.BitcoinCollector(
-                self.url, self.labels, self.chain_id, **self.client_params)
-            self.mocked_connection = mocked_connection
-
-    def test_logger_metadata(self):
-        """Validate logger metadata. Makes sure url is stripped by helpers.strip_url
-        function."""
-        expected_metadata = {
-            'component': 'BitcoinCollector', 'url': 'test.com'}
-        self.assertEqual(expected_metadata,
-                         self.bitcoin_collector._logger_metadata)
-
-    def test_https_interface_created(self):
-        """Tests that the bitcoin collector calls the https interface with the correct args"""
-        self.mocked_connection.assert_called_once_with(
-            self.url, self.open_timeout, self.ping_timeout)
-
-    def test_interface_attribute_exists(self):
-        """Tests that the interface attribute exists.
-        May be used by external calls to access objects such as the interface cache"""
-        self.assertTrue(hasattr(self.bitcoin_collector, 'interface'))
-
-    def test_alive_call(self):
-        """Tests the alive function uses the correct call and args"""
-        self.bitcoin_collector.alive()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.network_info_payload)
-
-    def test_alive_false(self):
-        """Tests the alive function returns false when post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.bitcoin_collector.alive()
-        self.assertFalse(result)
-
-    def test_block_height(self):
-        """Tests the block_height function uses the correct call and args to get block height"""
-        self.bitcoin_collector.block_height()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.blockchain_info_payload)
+    collector_class = collectors.BitcoinCollector
+    probes = ('mempool_size', 'client_version', 'block_height', 'alive',
+              'chain_tips', 'total_difficulty', 'peer_count', 'syncing')
+
+    def _batch_results(self, network_info=None, chain_tips=None,  # pylint: disable=arguments-differ
+                       mempool_info=None, blockchain_info=None):
+        return {"getnetworkinfo": network_info, "getchaintips": chain_tips,
+                "getmempoolinfo": mempool_info, "getblockchaininfo": blockchain_info}
+
+    @property
+    def batch_request(self):
+        """Returns the batch of a collector without ZMQ notifications."""
+        return self.collector.batch_requests[False]
+
+    def test_batch_payloads(self):
+        """Tests that the batch asks for network, chain tips, mempool and blockchain info"""
+        self.assertEqual([self.collector.network_info_payload,
+                          self.collector.chain_tips_payload,
+                          self.collector.mempool_info_payload,
+                          self.collector.blockchain_info_payload],
+                         self.batch_request.payload)
+
+    def test_alive_true(self):
+        """Tests the alive function returns true when the batch succeeds"""
+        self._batch_returns(network_info={"version": 5})
+        self.assertTrue(self.collector.alive())
 
     def test_block_height_get_blocks_key(self):
         """Tests that the block height is returned with the blocks key"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "blocks": 5}
-        result = self.bitcoin_collector.block_height()
+        self._batch_returns(blockchain_info={"blocks": 5})
+        result = self.collector.block_height()
         self.assertEqual(5, result)
 
     def test_block_height_key_error_returns_none(self):
         """Tests that the block height returns None on KeyError"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "dummy_key": 5}
-        result = self.bitcoin_collector.block_height()
+        self._batch_returns(blockchain_info={"dummy_key": 5})
+        result = self.collector.block_height()
         self.assertEqual(None, result)
 
     def test_block_height_returns_none(self):
-        """Tests that the block height returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.bitcoin_collector.block_height()
+        """Tests that the block height returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.block_height()
         self.assertEqual(None, result)
 
-    def test_total_difficulty(self):
-        """Tests the total_difficulty function uses the correct call and args to get difficulty"""
-        self.bitcoin_collector.total_difficulty()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.blockchain_info_payload)
-
-    def test_total_difficulty_get_blocks_key(self):
+    def test_total_difficulty_get_difficulty_key(self):
         """Tests that the difficulty is returned with the difficulty key"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "difficulty": 5}
-        result = self.bitcoin_collector.total_difficulty()
+        self._batch_returns(blockchain_info={"difficulty": 5})
+        result = self.collector.total_difficulty()
         self.assertEqual(5, result)
 
-    def test_total_difficulty_key_error_returns_none(self):
-        """Tests that the total_difficulty returns None on KeyError"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "dummy_key": 5}
-        result = self.bitcoin_collector.total_difficulty()
-        self.assertEqual(None, result)
-
     def test_total_difficulty_returns_none(self):
-        """Tests that the total_difficulty returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.bitcoin_collector.total_difficulty()
+        """Tests that the total_difficulty returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.total_difficulty()
         self.assertEqual(None, result)
 
-    def test_client_version(self):
-        """Tests the client_version function uses the correct call and args to get client version"""
-        self.bitcoin_collector.client_version()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.network_info_payload)
-
-    def test_client_version_get_blocks_key(self):
+    def test_syncing(self):
+        """Tests that syncing reflects initial block download"""
+        self._batch_returns(blockchain_info={"initialblockdownload": True})
+        self.assertEqual(1, self.collector.syncing())
+        self._batch_returns(blockchain_info={"initialblockdownload": False})
+        self.assertEqual(0, self.collector.syncing())
+
+    def test_peer_count(self):
+        """Tests that the peer count is the number of connections"""
+        self._batch_returns(network_info={"connections": 10})
+        self.assertEqual(10, self.collector.peer_count())
+
+    def test_chain_tips(self):
+        """Tests that chain tips are counted by status"""
+        self._batch_returns(chain_tips=[
+            {"height": 10, "status": "active"},
+            {"height": 9, "status": "valid-fork"},
+            {"height": 8, "status": "valid-fork"},
+            {"height": 11, "status": "headers-only"}])
+        self.assertEqual({"active": 1, "valid-fork": 2, "headers-only": 1},
+                         self.collector.chain_tips())
+
+    def test_chain_tips_returns_none(self):
+        """Tests that chain tips returns None if getchaintips failed"""
+        self._batch_returns(network_info={"version": 5})
+        self.assertEqual(None, self.collector.chain_tips())
+
+    def test_mempool(self):
+        """Tests that mempool size and bytes are taken from getmempoolinfo"""
+        self._batch_returns(mempool_info={"size": 3000, "bytes": 1500000})
+        self.assertEqual(3000, self.collector.mempool_size())
+        self.assertEqual(1500000, self.collector.mempool_bytes())
+
+    def test_client_version_get_version_keys(self):
         """Tests that the client version is returned as a string with the version key"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "version": 5, "subversion": 6, "protocolversion": 7}
-        result = self.bitcoin_collector.client_version()
+        self._batch_returns(network_info={"version": 5, "subversion": 6, "protocolversion": 7})
+        result = self.collector.client_version()
         self.assertEqual(
             {"client_version": "version:5 subversion:6 protocolversion:7"}, result)
 
     def test_client_version_key_error_returns_none(self):
         """Tests that the client_version returns None on KeyError"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "dummy_key": 5}
-        result = self.bitcoin_collector.client_version()
+        self._batch_returns(network_info={"dummy_key": 5})
+        result = self.collector.client_version()
         self.assertEqual(None, result)
 
     def test_client_version_returns_none(self):
-        """Tests that the client_version returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.bitcoin_collector.client_version()
+        """Tests that the client_version returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.client_version()
         self.assertEqual(None, result)
 
     def test_latency(self):
         """Tests that the latency is obtained from the interface based on latest_query_latency"""
         self.mocked_connection.return_value.latest_query_latency = 0.123
-        self.assertEqual(0.123, self.bitcoin_collector.latency())
+        self.assertEqual(0.123, self.collector.latency())
+
+
+class TestBitcoinZmqCollector(TestCase):
+    """Tests the bitcoin collector with ZMQ block notifications"""
+
+    def setUp(self):
+        self.url = "https://test.com"
+        self.subscribe_url = "tcp://test.com:28332"
+        self.labels = ["dummy", "labels"]
+        self.chain_id = 123
+        self.client_params = {"open_timeout": 8, "ping_timeout": 9}
+        with mock.patch('collectors.HttpsInterface') as mocked_connection, \
+                mock.patch('collectors.ZmqSubscription') as mocked_subscription:
+            self.bitcoin_collector = collectors.BitcoinCollector(
+                self.url, self.labels, self.chain_id, subscribe_url=self.subscribe_url,
+                **self.client_params)
+            self.mocked_connection = mocked_connection
+            self.mocked_subscription = mocked_subscription
+        self.mocked_connection.return_value.json_rpc_post.return_value = {
+            "blocks": 5, "difficulty": 10}
+        _serve_batch_results(self.mocked_connection.return_value)
+        self.batch_post = self.mocked_connection.return_value.cached_json_rpc_batch_results
+        self.batch_post.return_value = {"getblockchaininfo": {"blocks": 4, "difficulty": 9}}
+
+    def test_subscription_created(self):
+        """Tests that the hashblock topic is subscribed and the thread started"""
+        self.mocked_subscription.assert_called_once_with(
+            self.subscribe_url, [b'hashblock'], self.bitcoin_collector._on_notification)
+        self.mocked_subscription.return_value.start.assert_called_once_with()
+
+    def test_polls_before_first_notification(self):
+        """Tests that blockchain info is part of the batch until a notification arrived"""
+        self.assertEqual(4, self.bitcoin_collector.block_height())
+        self.assertIn(self.bitcoin_collector.blockchain_info_payload,
+                      self.batch_post.call_args.args[0].payload)
+        self.mocked_connection.return_value.json_rpc_post.assert_not_called()
+
+    def test_notification_refreshes_blockchain_info(self):
+        """Tests that scrapes after a notification use the pushed blockchain info"""
+        self.bitcoin_collector._on_notification(b'hashblock', b'\x00' * 32)
+        self.assertEqual(5, self.bitcoin_collector.block_height())
+        self.assertEqual(10, self.bitcoin_collector.total_difficulty())
+        self.mocked_connection.return_value.json_rpc_post.assert_called_once_with(
+            self.bitcoin_collector.blockchain_info_request)
+        self.batch_post.assert_not_called()
+
+    def test_batch_excludes_pushed_blockchain_info(self):
+        """Tests that blockchain info is left out of the batch while notifications arrive"""
+        self.bitcoin_collector._on_notification(b'hashblock', b'\x00' * 32)
+        self.bitcoin_collector.peer_count()
+        self.assertNotIn(self.bitcoin_collector.blockchain_info_payload,
+                         self.batch_post.call_args.args[0].payload)
+
+    def test_polls_when_notifications_stop(self):
+        """Tests that polling resumes when no notification arrived for too long"""
+        self.bitcoin_collector._on_notification(b'hashblock', b'\x00' * 32)
+        with mock.patch('collectors.monotonic',
+                        return_value=self.bitcoin_collector._blockchain_info_updated
+                        + collectors.BLOCKCHAIN_INFO_MAX_AGE + 1):
+            self.assertEqual(4, self.bitcoin_collector.block_height())
+
+    def test_blockchain_info_max_age_parameter(self):
+        """Tests that blockchain_info_max_age overrides how long pushed blockchain info is used"""
+        with mock.patch('collectors.HttpsInterface'), mock.patch('collectors.ZmqSubscription'):
+            collector = collectors.BitcoinCollector(
+                self.url, self.labels, self.chain_id, subscribe_url=self.subscribe_url,
+                blockchain_info_max_age=60, **self.client_params)
+        collector.interface.json_rpc_post.return_value = {"blocks": 5}
+        collector._on_notification(b'hashblock', b'\x00' * 32)
+        with mock.patch('collectors.monotonic',
+                        return_value=collector._blockchain_info_updated + 30):
+            self.assertTrue(collector._has_recent_notification())
+        with mock.patch('collectors.monotonic',
+                        return_value=collector._blockchain_info_updated + 61):
+            self.assertFalse(collector._has_recent_notification())
+
+    def test_blockchain_info_max_age_learned(self):
+        """Tests that pushed blockchain info expires after a few learned notification intervals"""
+        self.assertEqual(collectors.BLOCKCHAIN_INFO_MAX_AGE,
+                         self.bitcoin_collector.blockchain_info_max_age)
+        for arrival in (100.0, 160.0, 220.0):
+            with mock.patch('collectors.monotonic', return_value=arrival):
+                self.bitcoin_collector._on_notification(b'hashblock', b'\x00' * 32)
+        self.assertEqual(60, self.bitcoin_collector.notification_interval)
+        self.assertEqual(collectors.BLOCKCHAIN_INFO_MAX_AGE_MULTIPLE * 60,
+                         self.bitcoin_collector.blockchain_info_max_age)
+        with mock.patch('collectors.monotonic', return_value=220.0 + 181):
+            self.assertFalse(self.bitcoin_collector._has_recent_notification())
 
 
 class TestFilecoinCollector(TestCase):
@@ -463,7 +670,9 @@ class TestFilecoinCollector(TestCase):
         """Tests the alive function uses the correct call and args"""
         self.filecoin_collector.alive()
         self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.client_version_payload)
+            self.filecoin_collector.client_version_request)
+        self.assertEqual(self.client_version_payload,
+                         self.filecoin_collector.client_version_request.payload)
 
     def test_alive_false(self):
         """Tests the alive function returns false when post returns None"""
@@ -472,28 +681,22 @@ class TestFilecoinCollector(TestCase):
         self.assertFalse(result)
 
     def test_block_height(self):
-        """Tests the block_height function uses the correct call and args to get block height"""
+        """Tests the block_height function extracts the Height field of the chain head"""
         self.filecoin_collector.block_height()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.block_height_payload)
-
-    def test_block_height_get_blocks_key(self):
-        """Tests that the block height is returned with the Height key"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "Height": 5}
+        self.mocked_connection.return_value.json_rpc_post_field.assert_called_once_with(
+            self.filecoin_collector.block_height_request, ('Height',))
+        self.assertEqual(self.block_height_payload,
+                         self.filecoin_collector.block_height_request.payload)
+
+    def test_block_height_get_height_field(self):
+        """Tests that the block height is the extracted Height field"""
+        self.mocked_connection.return_value.json_rpc_post_field.return_value = 5
         result = self.filecoin_collector.block_height()
         self.assertEqual(5, result)
 
-    def test_block_height_key_error_returns_none(self):
-        """Tests that the block height returns None on KeyError"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "dummy_key": 5}
-        result = self.filecoin_collector.block_height()
-        self.assertEqual(None, result)
-
     def test_block_height_returns_none(self):
-        """Tests that the block height returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
+        """Tests that the block height returns None if json_rpc_post_field returns None"""
+        self.mocked_connection.return_value.json_rpc_post_field.return_value = None
         result = self.filecoin_collector.block_height()
         self.assertEqual(None, result)
 
@@ -501,7 +704,9 @@ class TestFilecoinCollector(TestCase):
         """Tests the client_version function uses the correct call and args to get client version"""
         self.filecoin_collector.client_version()
         self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.client_version_payload)
+            self.filecoin_collector.client_version_request)
+        self.assertEqual(self.client_version_payload,
+                         self.filecoin_collector.client_version_request.payload)
 
     def test_client_version_get_blocks_key(self):
         """Tests that the client version is returned as a string with the version key"""
@@ -529,165 +734,227 @@ class TestFilecoinCollector(TestCase):
         self.assertEqual(0.123, self.filecoin_collector.latency())
 
 
-class TestSolanaCollector(TestCase):
+class TestSolanaCollector(BatchCollectorTestMixin, TestCase):
     """Tests the solana collector class"""
+    collector_class = collectors.SolanaCollector
+    probes = ('alive', 'block_height', 'slots', 'slot_lag', 'syncing', 'client_version')
 
-    def setUp(self):
-        self.url = "wss://test.com"
-        self.labels = ["dummy", "labels"]
-        self.chain_id = 123
-        self.open_timeout = 8
-        self.ping_timeout = 9
-        self.client_params = {
-            "open_timeout": self.open_timeout, "ping_timeout": self.ping_timeout}
-        self.client_version_payload = {
-            'jsonrpc': '2.0',
-            'method': "getVersion",
-            'id': 1
-        }
-        self.block_height_payload = {
-            'jsonrpc': '2.0',
-            'method': "getBlockHeight",
-            'id': 1
-        }
-        with mock.patch('collectors.HttpsInterface') as mocked_connection:
-            self.solana_collector = collectors.SolanaCollector(
-                self.url, self.labels, self.chain_id, **self.client_params)
-            self.mocked_connection = mocked_connection
-
-    def test_logger_metadata(self):
-        """Validate logger metadata. Makes sure url is stripped by helpers.strip_url
-        function."""
-        expected_metadata = {
-            'component': 'SolanaCollector', 'url': 'test.com'}
-        self.assertEqual(expected_metadata,
-                         self.solana_collector._logger_metadata)
-
-    def test_https_interface_created(self):
-        """Tests that the solana collector calls the https interface with the correct args"""
-        self.mocked_connection.assert_called_once_with(
-            self.url, self.open_timeout, self.ping_timeout)
-
-    def test_interface_attribute_exists(self):
-        """Tests that the interface attribute exists.
-        May be used by external calls to access objects such as the interface cache"""
-        self.assertTrue(hasattr(self.solana_collector, 'interface'))
-
-    def test_alive_call(self):
-        """Tests the alive function uses the correct call and args"""
-        self.solana_collector.alive()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.client_version_payload)
+    def _batch_results(self, version=None, health="ok"):  # pylint: disable=arguments-differ
+        return {"getVersion": version or {"solana-core": "1.18.0"}, "getBlockHeight": 250,
+                "getHealth": health, "getSlot:processed": 300, "getSlot:confirmed": 298,
+                "getSlot:finalized": 268}
 
-    def test_alive_false(self):
-        """Tests the alive function returns false when post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.solana_collector.alive()
-        self.assertFalse(result)
+    def test_batch_payloads(self):
+        """Tests that the batch asks for every commitment level"""
+        self.assertEqual(
+            ['getVersion', 'getBlockHeight', 'getHealth', 'getSlot', 'getSlot', 'getSlot'],
+            [payload['method'] for payload in self.collector.batch_payloads])
+        self.assertEqual(
+            [[{'commitment': 'processed'}], [{'commitment': 'confirmed'}],
+             [{'commitment': 'finalized'}]],
+            [payload['params'] for payload in self.collector.slot_payloads])
 
     def test_block_height(self):
-        """Tests the block_height function uses the correct call and args to get block height"""
-        self.solana_collector.block_height()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.block_height_payload)
+        """Tests that the block height is the getBlockHeight result"""
+        self.assertEqual(250, self.collector.block_height())
 
     def test_block_height_returns_none(self):
-        """Tests that the block height returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.solana_collector.block_height()
+        """Tests that the block height returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.block_height()
         self.assertEqual(None, result)
 
-    def test_client_version(self):
-        """Tests the client_version function uses the correct call and args to get client version"""
-        self.solana_collector.client_version()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.client_version_payload)
+    def test_slots_and_lag(self):
+        """Tests the slots per commitment and how far they trail the processed slot"""
+        self.assertEqual({'processed': 300, 'confirmed': 298, 'finalized': 268},
+                         self.collector.slots())
+        self.assertEqual({'confirmed': 2, 'finalized': 32}, self.collector.slot_lag())
+
+    def test_slots_returns_none(self):
+        """Tests that no slots are reported if the batch returns None"""
+        self.batch_post.return_value = None
+        self.assertEqual(None, self.collector.slots())
+        self.assertEqual(None, self.collector.slot_lag())
+        self.assertFalse(hasattr(self.collector, 'finalized_block_height'))
+
+    def test_syncing(self):
+        """Tests that a node behind the cluster counts as syncing"""
+        self.assertEqual(0, self.collector.syncing())
+        self._batch_returns(health=None)
+        self.mocked_connection.return_value.cached_json_rpc_batch_error.return_value = -32005
+        self.assertEqual(1, self.collector.syncing())
+        self.mocked_connection.return_value.cached_json_rpc_batch_error.assert_called_with(
+            self.collector.batch_request, 'getHealth')
+
+    def test_syncing_unknown_health(self):
+        """Tests that syncing is None if getHealth fails for another reason"""
+        self._batch_returns(health=None)
+        self.mocked_connection.return_value.cached_json_rpc_batch_error.return_value = -32601
+        self.assertEqual(None, self.collector.syncing())
+        self.batch_post.return_value = None
+        self.mocked_connection.return_value.cached_json_rpc_batch_error.return_value = None
+        self.assertEqual(None, self.collector.syncing())
 
-    def test_client_version_get_blocks_key(self):
+    def test_client_version(self):
         """Tests that the client version is returned as a string with the solana-core key"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "solana-core": 5}
-        result = self.solana_collector.client_version()
-        self.assertEqual({"client_version": "5"}, result)
+        self.assertEqual({"client_version": "1.18.0"}, self.collector.client_version())
 
     def test_client_version_key_error_returns_none(self):
         """Tests that the client_version returns None on KeyError"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "dummy_key": 5}
-        result = self.solana_collector.client_version()
+        self._batch_returns(version={"dummy_key": 5})
+        result = self.collector.client_version()
         self.assertEqual(None, result)
 
     def test_client_version_returns_none(self):
-        """Tests that the client_version returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.solana_collector.client_version()
+        """Tests that the client_version returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.client_version()
         self.assertEqual(None, result)
 
     def test_latency(self):
         """Tests that the latency is obtained from the interface based on latest_query_latency"""
         self.mocked_connection.return_value.latest_query_latency = 0.123
-        self.assertEqual(0.123, self.solana_collector.latency())
+        self.assertEqual(0.123, self.collector.latency())
 
 
-class TestStarknetCollector(TestCase):
-    """Tests the starknet collector class"""
+class TestSolanaSubscriptionCollector(TestCase):
+    """Tests the solana collector with a websocket subscription"""
 
     def setUp(self):
-        self.url = "wss://test.com"
+        self.url = "https://test.com"
+        self.subscribe_url = "wss://test.com/ws"
         self.labels = ["dummy", "labels"]
         self.chain_id = 123
-        self.open_timeout = 8
-        self.ping_timeout = 9
-        self.client_params = {
-            "open_timeout": self.open_timeout, "ping_timeout": self.ping_timeout}
-        self.block_height_payload = {
-            "method": "starknet_blockNumber",
-            "jsonrpc": "2.0",
-            "id": 1
-        }
-        with mock.patch('collectors.HttpsInterface') as mocked_connection:
-            self.starknet_collector = collectors.StarknetCollector(
-                self.url, self.labels, self.chain_id, **self.client_params)
+        self.client_params = {"open_timeout": 8, "ping_timeout": 9}
+        with mock.patch('collectors.HttpsInterface') as mocked_connection, \
+                mock.patch('collectors.WebsocketSubscription') as mocked_subscription:
+            self.solana_collector = collectors.SolanaCollector(
+                self.url, self.labels, self.chain_id, subscribe_url=self.subscribe_url,
+                **self.client_params)
             self.mocked_connection = mocked_connection
+            self.mocked_subscription = mocked_subscription
+        self.mocked_subscription.return_value.latest_notifications = {
+            'slotNotification': {'parent': 99, 'root': 68, 'slot': 100},
+            'rootNotification': 68
+        }
 
-    def test_https_interface_created(self):
-        """Tests that the starknet collector calls the https interface with the correct args"""
-        self.mocked_connection.assert_called_once_with(
-            self.url, self.open_timeout, self.ping_timeout)
+    def test_subscription_created(self):
+        """Tests that slot and root subscriptions share one started websocket"""
+        self.mocked_subscription.assert_called_once_with(self.subscribe_url, [
+            {'jsonrpc': '2.0', 'method': "slotSubscribe", 'id': 1},
+            {'jsonrpc': '2.0', 'method': "rootSubscribe", 'id': 2}
+        ], **self.client_params)
+        self.mocked_subscription.return_value.start.assert_called_once_with()
+
+    def test_alive(self):
+        """Tests that alive follows the health of the subscription"""
+        self.mocked_subscription.return_value.healthy = False
+        self.assertFalse(self.solana_collector.alive())
+        self.mocked_connection.return_value.cached_json_rpc_post.assert_not_called()
+
+    def test_block_height_over_https(self):
+        """Tests that the block height is getBlockHeight over https, not a slot"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = 250
+        self.assertEqual(250, self.solana_collector.block_height())
+        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
+            self.solana_collector.block_height_request)
+        self.assertEqual('getBlockHeight',
+                         self.solana_collector.block_height_request.payload['method'])
+
+    def test_no_finalized_block_height(self):
+        """Tests that the root slot is not reported as the finalized block height"""
+        self.assertFalse(hasattr(self.solana_collector, 'finalized_block_height'))
+
+    def test_slots_and_lag(self):
+        """Tests the slots per commitment and how far they trail the processed slot"""
+        self.assertEqual({'processed': 100, 'finalized': 68}, self.solana_collector.slots())
+        self.assertEqual({'finalized': 32}, self.solana_collector.slot_lag())
+
+    def test_slots_before_notifications(self):
+        """Tests that no slots are reported before the first notification"""
+        self.mocked_subscription.return_value.latest_notifications = {}
+        self.assertEqual({}, self.solana_collector.slots())
+        self.assertEqual(None, self.solana_collector.slot_lag())
+
+    def test_client_version_refreshed_occasionally(self):
+        """Tests that the client version is not queried on every scrape"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+            "solana-core": "1.18.0"}
+        self.assertEqual({"client_version": "1.18.0"}, self.solana_collector.client_version())
+        self.assertEqual({"client_version": "1.18.0"}, self.solana_collector.client_version())
+        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once()
 
-    def test_interface_attribute_exists(self):
-        """Tests that the interface attribute exists.
-        May be used by external calls to access objects such as the interface cache"""
-        self.assertTrue(hasattr(self.starknet_collector, 'interface'))
+    def test_latency(self):
+        """Tests that the latency is the subscription ping latency"""
+        self.mocked_subscription.return_value.subscription_ping_latency = 0.05
+        self.assertEqual(0.05, self.solana_collector.latency())
 
-    def test_alive_call(self):
-        """Tests the alive function uses the correct call and args"""
-        self.starknet_collector.alive()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.block_height_payload)
+    def test_no_https_batch(self):
+        """Tests that the https batch is not used with a subscription"""
+        self.solana_collector.slots()
+        self.assertEqual(None, self.solana_collector.syncing())
+        self.mocked_connection.return_value.cached_json_rpc_batch_results.assert_not_called()
 
-    def test_alive_false(self):
-        """Tests the alive function returns false when post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.starknet_collector.alive()
-        self.assertFalse(result)
+
+class TestStarknetCollector(BatchCollectorTestMixin, TestCase):
+    """Tests the starknet collector class"""
+    collector_class = collectors.StarknetCollector
+    probes = ('alive', 'block_height', 'client_version', 'syncing', 'sync_lag', 'head_age')
+
+    def _batch_results(self, syncing=False):  # pylint: disable=arguments-differ
+        return {"starknet_blockNumber": 1000, "starknet_specVersion": "0.7.1",
+                "starknet_syncing": syncing,
+                "starknet_getBlockWithTxHashes": {"block_number": 1000, "timestamp": 1700000000}}
+
+    def test_latest_block_payload(self):
+        """Tests that the header of the latest block is requested"""
+        self.assertEqual("starknet_getBlockWithTxHashes",
+                         self.collector.latest_block_payload['method'])
+        self.assertEqual(["latest"], self.collector.latest_block_payload['params'])
 
     def test_block_height(self):
-        """Tests the block_height function uses the correct call and args to get block height"""
-        self.starknet_collector.block_height()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.block_height_payload)
+        """Tests that the block height is the starknet_blockNumber result"""
+        self.assertEqual(1000, self.collector.block_height())
 
     def test_block_height_returns_none(self):
-        """Tests that the block height returns None if json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.starknet_collector.block_height()
+        """Tests that the block height returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.block_height()
         self.assertEqual(None, result)
 
+    def test_client_version(self):
+        """Tests that the client version is the spec version"""
+        self.assertEqual({"client_version": "0.7.1"}, self.collector.client_version())
+
+    def test_head_age(self):
+        """Tests that the head age is measured from the latest block timestamp"""
+        with mock.patch('collectors.time', return_value=1700000012.5):
+            self.assertEqual(12.5, self.collector.head_age())
+
+    def test_in_sync(self):
+        """Tests that a node in sync is not syncing and has no lag"""
+        self.assertEqual(0, self.collector.syncing())
+        self.assertEqual(0, self.collector.sync_lag())
+
+    def test_syncing(self):
+        """Tests that a sync status object is syncing with its block lag"""
+        self._batch_returns({"starting_block_num": 10, "current_block_num": 900,
+                             "highest_block_num": 1000})
+        self.assertEqual(1, self.collector.syncing())
+        self.assertEqual(100, self.collector.sync_lag())
+
+    def test_syncing_returns_none(self):
+        """Tests that sync status is None without an error log if the batch returns None"""
+        self.batch_post.return_value = None
+        with capture_logs() as captured:
+            self.assertEqual(None, self.collector.syncing())
+            self.assertEqual(None, self.collector.sync_lag())
+        self.assertFalse(any(log['log_level'] == "error" for log in captured))
+
     def test_latency(self):
         """Tests that the latency is obtained from the interface based on latest_query_latency"""
         self.mocked_connection.return_value.latest_query_latency = 0.123
-        self.assertEqual(0.123, self.starknet_collector.latency())
+        self.assertEqual(0.123, self.collector.latency())
 
 class TestAptosCollector(TestCase):
     """Tests the Aptos collector class"""
@@ -768,92 +1035,198 @@ class TestAptosCollector(TestCase):
         result = self.aptos_collector.client_version()
         self.assertIsNone(result)
 
-    def test_latency(self):
-        """Tests that the latency is obtained from the interface based on latest_query_latency"""
-        self.mocked_connection.return_value.latest_query_latency = 0.123
-        self.assertEqual(0.123, self.aptos_collector.latency())
+    def test_head_age(self):
+        """Tests that the head age is measured from the ledger timestamp in microseconds"""
+        self.mocked_connection.return_value.cached_json_rest_api_get.return_value = {
+            "ledger_timestamp": "1700000000000000"}
+        with mock.patch('collectors.time', return_value=1700000001.5):
+            self.assertEqual(1.5, self.aptos_collector.head_age())
 
-class TestEvmHttpCollector(TestCase):
-    """Tests the EvmHttp collector class"""
+    def test_head_age_returns_none(self):
+        """Tests that the head age returns None without a ledger timestamp"""
+        self.mocked_connection.return_value.cached_json_rest_api_get.return_value = {}
+        self.assertIsNone(self.aptos_collector.head_age())
 
-    def setUp(self):
-        self.url = "https://test.com"
-        self.labels = ["dummy", "labels"]
-        self.chain_id = 123
-        self.open_timeout = 8
-        self.ping_timeout = 9
-        self.client_params = {
-            "open_timeout": self.open_timeout, "ping_timeout": self.ping_timeout}
-        with mock.patch('collectors.HttpsInterface') as mocked_connection:
-            self.evmhttp_collector = collectors.EvmHttpCollector(
-                self.url, self.labels, self.chain_id, **self.client_params)
-            self.mocked_connection = mocked_connection
+    def test_ledger_version(self):
+        """Tests that the ledger version is returned as a number"""
+        self.mocked_connection.return_value.cached_json_rest_api_get.return_value = {
+            "ledger_version": "2000"}
+        self.assertEqual(2000, self.aptos_collector.ledger_version())
 
-    def test_logger_metadata(self):
-        """Validate logger metadata. Makes sure url is stripped by helpers.strip_url function."""
-        expected_metadata = {
-            'component': 'EvmHttpCollector', 'url': 'test.com'}
-        self.assertEqual(expected_metadata,
-                         self.evmhttp_collector._logger_metadata)
+    def test_pruning_window(self):
+        """Tests that the pruning window is the range of retained ledger versions"""
+        self.mocked_connection.return_value.cached_json_rest_api_get.return_value = {
+            "ledger_version": "2000", "oldest_ledger_version": "500"}
+        self.assertEqual(1500, self.aptos_collector.pruning_window())
 
-    def test_https_interface_created(self):
-        """Tests that the EvmHttp collector calls the https interface with the correct args"""
-        self.mocked_connection.assert_called_once_with(
-            self.url, self.open_timeout, self.ping_timeout)
+    def test_pruning_window_returns_none(self):
+        """Tests that the pruning window returns None without the oldest ledger version"""
+        self.mocked_connection.return_value.cached_json_rest_api_get.return_value = {
+            "ledger_version": "2000"}
+        self.assertIsNone(self.aptos_collector.pruning_window())
 
-    def test_interface_attribute_exists(self):
-        """Tests that the interface attribute exists."""
-        self.assertTrue(hasattr(self.evmhttp_collector, 'interface'))
+    def test_single_request(self):
+        """Tests that every probe is served by the cached index request"""
+        for probe in ('alive', 'block_height', 'client_version', 'head_age',
+                      'ledger_version', 'pruning_window'):
+            getattr(self.aptos_collector, probe)()
+        for call in self.mocked_connection.return_value.cached_json_rest_api_get.call_args_list:
+            self.assertEqual(mock.call(), call)
 
-    def test_alive_call(self):
-        """Tests the alive function uses the correct call"""
-        self.evmhttp_collector.alive()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.evmhttp_collector.client_version_payload)
+    def test_latency(self):
+        """Tests that the latency is obtained from the interface based on latest_query_latency"""
+        self.mocked_connection.return_value.latest_query_latency = 0.123
+        self.assertEqual(0.123, self.aptos_collector.latency())
 
-    def test_alive_false(self):
-        """Tests the alive function returns false when post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.evmhttp_collector.alive()
-        self.assertFalse(result)
+class TestEvmHttpCollector(BatchCollectorTestMixin, TestCase):  # pylint: disable=too-many-public-methods
+    """Tests the EvmHttp collector class"""
+    collector_class = collectors.EvmHttpCollector
+    probes = ('alive', 'block_height', 'finalized_block_height', 'head_lag',
+              'syncing', 'sync_lag', 'peer_count', 'client_version')
+
+    def _batch_results(self, block_number="0x1a2b3c", syncing=False,  # pylint: disable=arguments-differ
+                       safe="0x1a2b20", finalized="0x1a2b00"):
+        # Keyed by the ids of web3_clientVersion, eth_blockNumber, eth_syncing,
+        # net_peerCount and the safe and finalized blocks.
+        return {1: "Geth/v1.14.0", 2: block_number, 3: syncing, 4: "0x19",
+                5: {"number": safe} if safe else None,
+                6: {"number": finalized} if finalized else None}
+
+    def test_batch_payloads(self):
+        """Tests that the batch covers every probe"""
+        self.assertEqual(
+            [("web3_clientVersion", None), ("eth_blockNumber", None), ("eth_syncing", None),
+             ("net_peerCount", None), ("eth_getBlockByNumber", ["safe", False]),
+             ("eth_getBlockByNumber", ["finalized", False])],
+            [(payload['method'], payload.get('params'))
+             for payload in self.collector.batch_payloads])
 
     def test_block_height(self):
-        """Tests the block_height function uses the correct call to get block height"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = "0x1a2b3c"
-        result = self.evmhttp_collector.block_height()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.evmhttp_collector.block_height_payload)
-        self.assertEqual(result, 1715004)
+        """Tests that the block height is converted from hex"""
+        self.assertEqual(1715004, self.collector.block_height())
 
     def test_block_height_raises_value_error(self):
         """Tests that the block height raises ValueError if result is invalid"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = "invalid"
+        self._batch_returns(block_number="invalid")
         with self.assertRaises(ValueError):
-            self.evmhttp_collector.block_height()
+            self.collector.block_height()
+
+    def test_finalized_block_height(self):
+        """Tests that the finalized block height is converted from hex"""
+        self.assertEqual(1714944, self.collector.finalized_block_height())
+
+    def test_finalized_block_height_not_supported(self):
+        """Tests that the finalized block height is None if the tag is not supported"""
+        self._batch_returns(finalized=None)
+        self.assertIsNone(self.collector.finalized_block_height())
+
+    def test_head_lag(self):
+        """Tests how many blocks the safe and finalized blocks trail the head"""
+        self.assertEqual({'safe': 28, 'finalized': 60}, self.collector.head_lag())
+        self._batch_returns(safe=None, finalized=None)
+        self.assertEqual({}, self.collector.head_lag())
+
+    def test_head_lag_returns_none(self):
+        """Tests that head lag is None if the batch returns None"""
+        self.batch_post.return_value = None
+        self.assertIsNone(self.collector.head_lag())
+
+    def test_in_sync(self):
+        """Tests that a node in sync is not syncing and has no lag"""
+        self.assertEqual(0, self.collector.syncing())
+        self.assertEqual(0, self.collector.sync_lag())
+
+    def test_syncing_returns_none(self):
+        """Tests that sync status is None without an error log if the batch returns None"""
+        self.batch_post.return_value = None
+        with capture_logs() as captured:
+            self.assertIsNone(self.collector.syncing())
+            self.assertIsNone(self.collector.sync_lag())
+        self.assertFalse(any(log['log_level'] == "error" for log in captured))
+
+    def test_syncing(self):
+        """Tests that a sync status object is syncing with its block lag"""
+        self._batch_returns(syncing={"startingBlock": "0x0", "currentBlock": "0x1a2b00",
+                                     "highestBlock": "0x1a2b3c"})
+        self.assertEqual(1, self.collector.syncing())
+        self.assertEqual(60, self.collector.sync_lag())
+
+    def test_peer_count(self):
+        """Tests that the peer count is converted from hex"""
+        self.assertEqual(25, self.collector.peer_count())
 
     def test_client_version(self):
-        """Tests the client_version function uses the correct call and args to get client version"""
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "web3_clientVersion",
-            "id": 1
-        }
-        self.evmhttp_collector.client_version()
-        self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            payload)
+        """Tests that the client version is taken from the batch"""
+        self.assertEqual({"client_version": "Geth/v1.14.0"},
+                         self.collector.client_version())
 
     def test_client_version_returns_none(self):
-        """Tests that the client_version returns None if cached_json_rpc_post returns None"""
-        self.mocked_connection.return_value.cached_json_rpc_post.return_value = None
-        result = self.evmhttp_collector.client_version()
+        """Tests that the client_version returns None if the batch returns None"""
+        self.batch_post.return_value = None
+        result = self.collector.client_version()
         self.assertIsNone(result)
 
     def test_latency(self):
         """Tests that the latency is obtained from the interface based on latest_query_latency"""
         self.mocked_connection.return_value.latest_query_latency = 0.123
-        self.assertEqual(0.123, self.evmhttp_collector.latency())
+        self.assertEqual(0.123, self.collector.latency())
+
+class TestSpecCollector(TestCase):
+    """Tests the collector defined by a spec"""
+
+    def setUp(self):
+        self.url = "https://test.com"
+        self.labels = ["dummy", "labels"]
+        self.chain_id = 123
+        self.client_params = {"open_timeout": 8, "ping_timeout": 9}
+        self.spec = CompiledSpec({'probes': {
+            'block_height': {'method': 'eth_blockNumber', 'transform': 'hex'},
+            'client_version': {'method': 'web3_clientVersion'}
+        }})
+        with mock.patch('collectors.HttpsInterface') as mocked_connection:
+            self.spec_collector = collectors.SpecCollector(
+                self.url, self.labels, self.chain_id, self.spec, **self.client_params)
+            self.mocked_connection = mocked_connection
+        self.batch_post = self.mocked_connection.return_value.cached_json_rpc_batch_post
+        self.batch_post.return_value = ["0x10", "geth/v1.14"]
+
+    def test_https_interface_created(self):
+        """Tests that the spec collector calls the https interface with the correct args"""
+        self.mocked_connection.assert_called_once_with(self.url, 8, 9)
+
+    def test_only_spec_probes_exist(self):
+        """Tests that the collector has the probes of the spec and no others"""
+        self.assertTrue(hasattr(self.spec_collector, 'block_height'))
+        self.assertFalse(hasattr(self.spec_collector, 'total_difficulty'))
+
+    def test_probes(self):
+        """Tests that probes extract their values from the spec batch"""
+        self.assertTrue(self.spec_collector.alive())
+        self.assertEqual(16, self.spec_collector.block_height())  # pylint: disable=no-member
+        self.assertEqual({"client_version": "geth/v1.14"},
+                         self.spec_collector.client_version())  # pylint: disable=no-member
+        self.batch_post.assert_called_with(self.spec.request)
+
+    def test_batch_failed(self):
+        """Tests that probes return None and alive false if the batch failed"""
+        self.batch_post.return_value = None
+        self.assertFalse(self.spec_collector.alive())
+        self.assertEqual(None, self.spec_collector.block_height())  # pylint: disable=no-member
+
+    def test_missing_value_logged(self):
+        """Tests that a value missing from the result is logged and None returned"""
+        self.batch_post.return_value = [None, "geth/v1.14"]
+        with capture_logs() as captured:
+            self.assertEqual(None, self.spec_collector.block_height())  # pylint: disable=no-member
+        self.assertTrue(any(log['log_level'] == "error" for log in captured))
+
+    def test_latency(self):
+        """Tests that the latency is obtained from the interface based on latest_query_latency"""
+        self.mocked_connection.return_value.latest_query_latency = 0.123
+        self.assertEqual(0.123, self.spec_collector.latency())
 
-class TestXRPLCollector(TestCase):
+
+class TestXRPLCollector(TestCase):  # pylint: disable=too-many-public-methods
     """Tests the XRPL collector class"""
 
     def setUp(self):
@@ -889,7 +1262,7 @@ class TestXRPLCollector(TestCase):
         """Tests the alive function uses the correct call"""
         self.xrpl_collector.alive()
         self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.xrpl_collector.ledger_closed_payload, non_rpc_response=True)
+            self.xrpl_collector.server_info_request, non_rpc_response=True)
 
     def test_alive_false(self):
         """Tests the alive function returns false when post returns None"""
@@ -901,19 +1274,27 @@ class TestXRPLCollector(TestCase):
         """Tests the block_height function uses the correct call to get block height"""
         self.xrpl_collector.block_height()
         self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.xrpl_collector.ledger_closed_payload, non_rpc_response=True)
+            self.xrpl_collector.server_info_request, non_rpc_response=True)
 
-    def test_block_height_get_ledger_index(self):
-        """Tests that the block height is returned with the ledger_index key"""
+    def test_block_height_get_validated_ledger_seq(self):
+        """Tests that the block height is the sequence of the validated ledger"""
         self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "result": {"ledger_index": 96217031}}
+            "result": {"info": {"validated_ledger": {"seq": 96217031},
+                                "closed_ledger": {"seq": 96217032}}}}
         result = self.xrpl_collector.block_height()
         self.assertEqual(96217031, result)
 
+    def test_block_height_falls_back_to_closed_ledger(self):
+        """Tests that the closed ledger is used while no ledger is validated"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+            "result": {"info": {"closed_ledger": {"seq": 96217032}}}}
+        result = self.xrpl_collector.block_height()
+        self.assertEqual(96217032, result)
+
     def test_block_height_key_error_returns_none(self):
         """Tests that the block height returns None on KeyError"""
         self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
-            "result": {"dummy_key": 5}}
+            "result": {"info": {"dummy_key": 5}}}
         result = self.xrpl_collector.block_height()
         self.assertEqual(None, result)
 
@@ -923,11 +1304,53 @@ class TestXRPLCollector(TestCase):
         result = self.xrpl_collector.block_height()
         self.assertEqual(None, result)
 
+    def test_head_age(self):
+        """Tests that the head age is the age of the validated ledger"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+            "result": {"info": {"validated_ledger": {"seq": 96217031, "age": 3}}}}
+        self.assertEqual(3, self.xrpl_collector.head_age())
+
+    def test_server_state(self):
+        """Tests that the server state is returned as a single labeled sample"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+            "result": {"info": {"server_state": "proposing"}}}
+        self.assertEqual({"proposing": 1}, self.xrpl_collector.server_state())
+
+    def test_syncing(self):
+        """Tests that only full, validating and proposing count as synced"""
+        for state, expected in (("full", 0), ("proposing", 0), ("validating", 0),
+                                ("tracking", 1), ("syncing", 1), ("connected", 1)):
+            self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+                "result": {"info": {"server_state": state}}}
+            self.assertEqual(expected, self.xrpl_collector.syncing())
+
+    def test_syncing_returns_none(self):
+        """Tests that syncing returns None without a server state"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+            "result": {"info": {}}}
+        self.assertEqual(None, self.xrpl_collector.syncing())
+
+    def test_peer_count(self):
+        """Tests that the peer count is taken from server_info"""
+        self.mocked_connection.return_value.cached_json_rpc_post.return_value = {
+            "result": {"info": {"peers": 21}}}
+        self.assertEqual(21, self.xrpl_collector.peer_count())
+
+    def test_single_request_per_scrape(self):
+        """Tests that every probe is served by the same server_info request"""
+        self.xrpl_collector.alive()
+        self.xrpl_collector.block_height()
+        self.xrpl_collector.client_version()
+        self.xrpl_collector.server_state()
+        for call in self.mocked_connection.return_value.cached_json_rpc_post.call_args_list:
+            self.assertEqual(
+                mock.call(self.xrpl_collector.server_info_request, non_rpc_response=True), call)
+
     def test_client_version(self):
         """Tests the client_version function uses the correct call to get client version"""
         self.xrpl_collector.client_version()
         self.mocked_connection.return_value.cached_json_rpc_post.assert_called_once_with(
-            self.xrpl_collector.server_info_payload, non_rpc_response=True)
+            self.xrpl_collector.server_info_request, non_rpc_response=True)
 
     def test_client_version_get_build_version(self):
         """Tests that the client version is returned with the build_version key"""
@@ -9,7 +9,9 @@ from configuration import Config
 
 CONFIG_FILES = {"valid": "tests/fixtures/configuration.yaml",
                 "invalid": "tests/fixtures/configuration_invalid.yaml",
-                "client_params": "tests/fixtures/configuration_conn_params.yaml"}
+                "client_params": "tests/fixtures/configuration_conn_params.yaml",
+                "spec": "tests/fixtures/configuration_spec.yaml",
+                "solana": "tests/fixtures/configuration_solana.yaml"}
 
 def setup_config_object(config_file) -> Config:
     """Creates a Config object using the provided config files"""
@@ -86,7 +88,8 @@ class TestConfiguration(TestCase):
             'open_timeout': 1,
             'close_timeout': 2,
             'ping_interval': 3,
-            'ping_timeout': 4
+            'ping_timeout': 4,
+            'stall_timeout_multiple': 3.5
         }
         self.assertDictEqual(
             self.client_params_config.client_parameters, expected)
@@ -135,3 +138,49 @@ class TestConfiguration(TestCase):
             pass
         self.assertFalse(
             any(log['log_level'] == "error" for log in captured))
+
+    def test_collector_spec_attribute(self):
+        """Tests that a collector spec is loaded from the configuration"""
+        config = setup_config_object(CONFIG_FILES["spec"])
+        self.assertEqual({'method': 'eth_blockNumber', 'transform': 'hex'},
+                         config.get_property('collector_spec')['probes']['block_height'])
+
+    def test_collector_spec_unknown_probe_exit(self):
+        """Tests that the program exits when a collector spec defines an unknown probe"""
+        configuration = setup_config_object(CONFIG_FILES["spec"])._configuration
+        configuration['collector_spec']['probes']['unknown'] = {'method': 'eth_chainId'}
+        with mock.patch('configuration.yaml.load', return_value=configuration):
+            with self.assertRaises(SystemExit) as cm:
+                setup_config_object(CONFIG_FILES["spec"])
+        self.assertEqual(1, cm.exception.code)
+
+    def test_subscribe_url_rejected_for_websocket_collectors(self):
+        """Tests that the program exits when an endpoint of a collector which
+        does not take a subscribe_url has one"""
+        for collector in ('evm', 'conflux', 'cardano'):
+            configuration = setup_config_object(CONFIG_FILES["solana"])._configuration
+            configuration['collector'] = collector
+            with self.subTest(collector=collector), \
+                    mock.patch('configuration.yaml.load', return_value=configuration):
+                with self.assertRaises(SystemExit) as cm:
+                    setup_config_object(CONFIG_FILES["solana"])
+                self.assertEqual(1, cm.exception.code)
+
+    def test_subscribe_url_scheme_checked_per_collector(self):
+        """Tests that the program exits when a subscribe_url has a scheme its
+        collector cannot subscribe to"""
+        for collector, subscribe_url in (('solana', 'tcp://test1.com:28332'),
+                                         ('bitcoin', 'wss://test1.com/ws')):
+            configuration = setup_config_object(CONFIG_FILES["solana"])._configuration
+            configuration['collector'] = collector
+            configuration['endpoints'][0]['subscribe_url'] = subscribe_url
+            with self.subTest(collector=collector), \
+                    mock.patch('configuration.yaml.load', return_value=configuration):
+                with self.assertRaises(SystemExit) as cm:
+                    setup_config_object(CONFIG_FILES["solana"])
+                self.assertEqual(1, cm.exception.code)
+
+    def test_subscribe_url_accepted_for_solana(self):
+        """Tests that a subscribe_url is accepted for collectors which take it"""
+        config = setup_config_object(CONFIG_FILES["solana"])
+        self.assertEqual('wss://test1.com/ws', config.endpoints[0]['subscribe_url'])
@@ -0,0 +1,133 @@
+# pylint: disable=protected-access
+"""Tests the exposition module"""
+from unittest import TestCase, mock
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.metrics_core import (GaugeMetricFamily, CounterMetricFamily,
+                                            InfoMetricFamily, HistogramMetricFamily)
+
+from exposition import generate_latest_stream, make_streaming_wsgi_app
+from tests.payloads import peak_memory
+
+LABELS = ['url', 'provider', 'blockchain']
+
+
+class FleetCollector():  # pylint: disable=too-few-public-methods
+    """Custom collector emulating a large fleet of endpoints. Every family is
+    built before the first one is yielded, like PrometheusCustomCollector does."""
+
+    def __init__(self, endpoints, families):
+        self.endpoints = endpoints
+        self.families = families
+
+    def collect(self):
+        """Yields gauge families with one sample per endpoint."""
+        metrics = []
+        for family in range(self.families):
+            metric = GaugeMetricFamily(f'brpc_test_{family}', 'Fleet metric.',
+                                       labels=LABELS)
+            for endpoint in range(self.endpoints):
+                metric.add_metric(
+                    [f'wss://endpoint-{endpoint}.example.com/ws?key=abc', 'Provider',
+                     'Ethereum'], endpoint * 1.5)
+            metrics.append(metric)
+        yield from metrics
+
+
+class SampleCollector():  # pylint: disable=too-few-public-methods
+    """Custom collector yielding each metric type the exporter uses."""
+
+    def collect(self):
+        """Yields one family of each type."""
+        gauge = GaugeMetricFamily('brpc_health', 'Health\nwith "quotes" \\.', labels=LABELS)
+        gauge.add_metric(['wss://a.com', 'Prov"ider', 'Eth\nereum'], 1)
+        counter = CounterMetricFamily('brpc_head_count', 'Heads received total.',
+                                      labels=LABELS)
+        counter.add_metric(['wss://a.com', 'Provider', 'Ethereum'], 10, timestamp=123.4)
+        info = InfoMetricFamily('brpc_client_version', 'Client version.', labels=LABELS)
+        info.add_metric(['wss://a.com', 'Provider', 'Ethereum'], {'client_version': 'geth'})
+        histogram = HistogramMetricFamily('brpc_hist', 'A histogram.', labels=LABELS)
+        histogram.add_metric(['wss://a.com', 'Provider', 'Ethereum'],
+                             [('0.1', 1), ('+Inf', 3)], 0.9)
+        empty = GaugeMetricFamily('brpc_empty', 'No samples.')
+        yield from (gauge, counter, info, histogram, empty)
+
+
+class TestGenerateLatestStream(TestCase):
+    """Tests the streaming text exposition writer"""
+
+    def setUp(self):
+        self.registry = CollectorRegistry(auto_describe=False)
+        self.registry.register(SampleCollector())
+
+    def test_output_matches_generate_latest(self):
+        """Tests that the joined stream is byte identical to generate_latest"""
+        self.assertEqual(generate_latest(self.registry),
+                         b''.join(generate_latest_stream(self.registry)))
+
+    def test_output_matches_generate_latest_small_chunks(self):
+        """Tests that chunking does not alter the output"""
+        self.assertEqual(generate_latest(self.registry),
+                         b''.join(generate_latest_stream(self.registry, chunk_size=1)))
+
+    def test_chunks_are_bounded(self):
+        """Tests that large outputs are split in multiple chunks of bounded size"""
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(FleetCollector(endpoints=500, families=4))
+        chunks = list(generate_latest_stream(registry, chunk_size=4096))
+        self.assertGreater(len(chunks), 1)
+        # A chunk may only exceed the chunk size by a single line.
+        self.assertTrue(all(len(chunk) < 4096 + 512 for chunk in chunks))
+
+    def test_empty_registry_yields_nothing(self):
+        """Tests that an empty registry yields no chunks"""
+        self.assertEqual([], list(generate_latest_stream(CollectorRegistry())))
+
+    def test_peak_memory_lower_than_generate_latest(self):
+        """Benchmarks peak memory of both paths for a fleet of endpoints. Both
+        hold every family, the streaming path saves the encoded response."""
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(FleetCollector(endpoints=2000, families=10))
+
+        def consume_stream():
+            for _ in generate_latest_stream(registry):
+                pass
+
+        streaming_peak = peak_memory(consume_stream)
+        baseline_peak = peak_memory(lambda: generate_latest(registry))
+        response_size = len(generate_latest(registry))
+        self.assertGreater(baseline_peak - streaming_peak, response_size / 2)
+
+
+class TestMakeStreamingWsgiApp(TestCase):
+    """Tests the streaming WSGI app"""
+
+    def setUp(self):
+        self.registry = CollectorRegistry(auto_describe=True)
+        self.registry.register(SampleCollector())
+        self.app = make_streaming_wsgi_app(self.registry)
+        self.start_fn_mock = mock.Mock()
+
+    def test_metrics_response(self):
+        """Tests that the app streams the text exposition with the correct content type"""
+        body = self.app({'PATH_INFO': '/metrics'}, self.start_fn_mock)
+        self.assertEqual(generate_latest(self.registry), b''.join(body))
+        self.start_fn_mock.assert_called_once_with(
+            '200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
+
+    def test_name_filter(self):
+        """Tests that name[] query parameters restrict the exposed families"""
+        environ = {'PATH_INFO': '/metrics', 'QUERY_STRING': 'name[]=brpc_health'}
+        body = b''.join(self.app(environ, self.start_fn_mock))
+        self.assertIn(b'brpc_health', body)
+        self.assertNotIn(b'brpc_head_count', body)
+
+    def test_openmetrics_falls_back_to_prometheus_client(self):
+        """Tests that OpenMetrics requests are served by the prometheus_client encoder"""
+        environ = {'PATH_INFO': '/metrics',
+                   'HTTP_ACCEPT': 'application/openmetrics-text; version=0.0.1'}
+        body = b''.join(self.app(environ, self.start_fn_mock))
+        self.assertTrue(body.endswith(b'# EOF\n'))
+
+    def test_favicon(self):
+        """Tests that an empty body is returned for the favicon path"""
+        self.assertEqual([b''], self.app({'PATH_INFO': '/favicon.ico'}, self.start_fn_mock))
@@ -0,0 +1,71 @@
+"""Test module for heads"""
+from unittest import TestCase
+
+from heads import HeadArrivalIndex, HeadHistory
+
+
+class TestHeadArrivalIndex(TestCase):
+    """Tests the cross subscription head arrival index"""
+
+    def setUp(self):
+        self.index = HeadArrivalIndex(size=2)
+
+    def test_first_arrival_has_no_delay(self):
+        """Tests that the first subscription to deliver a head has zero delay"""
+        self.assertEqual(0.0, self.index.observe(10, 100.0))
+
+    def test_later_arrival_delay(self):
+        """Tests that later arrivals of the same head return the delay to the first"""
+        self.index.observe(10, 100.0)
+        self.assertAlmostEqual(0.25, self.index.observe(10, 100.25))
+
+    def test_bounded_size(self):
+        """Tests that the oldest heads are evicted and no longer produce a delay"""
+        for number in (10, 11, 12):
+            self.index.observe(number, 100.0 + number)
+        self.assertEqual(2, len(self.index._first_seen))  # pylint: disable=protected-access
+        self.assertEqual(None, self.index.observe(10, 200.0))
+        self.assertEqual(1.0, self.index.observe(11, 112.0))
+
+
+class TestHeadHistory(TestCase):
+    """Tests reorg detection of the head ring buffer"""
+
+    def setUp(self):
+        self.history = HeadHistory(size=4)
+        for number, block_hash, parent_hash in ((10, 'a10', 'a9'), (11, 'a11', 'a10'),
+                                                (12, 'a12', 'a11')):
+            self.assertEqual(0, self.history.observe(number, block_hash, parent_hash))
+
+    def test_duplicate_head_is_not_a_reorg(self):
+        """Tests that receiving the same head twice is not a reorg"""
+        self.assertEqual(0, self.history.observe(12, 'a12', 'a11'))
+
+    def test_same_height_different_hash(self):
+        """Tests that a different hash at the tip height is a reorg of depth one"""
+        self.assertEqual(1, self.history.observe(12, 'b12', 'a11'))
+
+    def test_parent_mismatch(self):
+        """Tests that a parent hash mismatch reveals a reorg including the parent"""
+        self.assertEqual(2, self.history.observe(12, 'b12', 'b11'))
+
+    def test_reorg_to_lower_height(self):
+        """Tests that a new branch below the tip replaces every head above it"""
+        self.assertEqual(2, self.history.observe(11, 'b11', 'a10'))
+        self.assertEqual(0, self.history.observe(12, 'b12', 'b11'))
+        self.assertEqual(0, self.history.observe(13, 'b13', 'b12'))
+
+    def test_parent_mismatch_updates_parent(self):
+        """Tests that the parent of a reorged head is taken from the new branch"""
+        self.history.observe(13, 'b13', 'b12')
+        self.assertEqual(0, self.history.observe(12, 'b12', 'a11'))
+
+    def test_bounded_size(self):
+        """Tests that only the most recent heads are kept"""
+        for number in range(13, 20):
+            self.history.observe(number, f'a{number}', f'a{number - 1}')
+        self.assertEqual([16, 17, 18, 19], list(self.history._heads))  # pylint: disable=protected-access
+
+    def test_missing_hash_ignored(self):
+        """Tests that heads without a hash are not recorded"""
+        self.assertEqual(0, self.history.observe(12, None, 'b11'))
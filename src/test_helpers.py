@@ -3,7 +3,13 @@
 from unittest import TestCase
 from structlog.testing import capture_logs
 
-from helpers import strip_url, return_and_validate_rpc_json_result, validate_dict_and_return_key_value  # pylint: disable=line-too-long
+from helpers import strip_url, return_and_validate_rpc_json_result, return_and_validate_rpc_batch_result, validate_dict_and_return_key_value, return_and_validate_rpc_field, JsonFieldExtractor  # pylint: disable=line-too-long
+from tests.payloads import filecoin_tipset, peak_memory
+
+
+def _chunks(message: str, size: int):
+    body = message.encode()
+    return (body[start:start + size] for start in range(0, len(body), size))
 
 
 class TestHelpers(TestCase):
@@ -72,6 +78,28 @@ class TestHelpers(TestCase):
             message, self.logger_metadata)
         self.assertEqual(-19, result)
 
+    def test_return_and_validate_rpc_batch_result_keyed_by_id(self):
+        """Tests that batch results are returned by id and failed entries logged"""
+        message = ('[{"result": {"blocks": 1}, "error": null, "id": "getblockchaininfo"},'
+                   ' {"jsonrpc": "2.0", "error": {"code": -32601, "message": "Method not found"},'
+                   ' "id": "getchaintips"}]')
+        errors = {}
+        with capture_logs() as captured:
+            result = return_and_validate_rpc_batch_result(message, self.logger_metadata, errors)
+        self.assertEqual({"getblockchaininfo": {"blocks": 1}}, result)
+        self.assertEqual({"getchaintips": -32601}, errors)
+        self.assertTrue(
+            any(log['log_level'] == "error" for log in captured))
+
+    def test_return_and_validate_rpc_batch_result_not_a_batch(self):
+        """Tests that a single response instead of a batch returns None"""
+        message = '{"jsonrpc": "2.0", "result": -19, "id": 2}'
+        self.assertEqual(None, return_and_validate_rpc_batch_result(message, self.logger_metadata))
+
+    def test_return_and_validate_rpc_batch_result_invalid_json(self):
+        """Tests that invalid JSON returns None"""
+        self.assertEqual(None, return_and_validate_rpc_batch_result('[{', self.logger_metadata))
+
     def test_validate_dict_and_return_key_value_no_dict_returns_none(self):
         """Tests that if provided with a non dict type None is returned"""
         dictionary = "This is not a dict type"
@@ -117,3 +145,66 @@ class TestHelpers(TestCase):
                 dictionary, 'key', self.collector_logger_metadata, stringify=True)
         self.assertFalse(
             any(log['log_level'] == "error" for log in captured))
+
+
+class TestJsonFieldExtractor(TestCase):
+    """Tests the incremental JSON field extractor"""
+
+    def setUp(self):
+        self.logger_metadata = {'component': 'helper'}
+        self.tipset = filecoin_tipset(50)
+
+    def test_height_of_tipset_for_any_chunk_size(self):
+        """Tests that the Height of the chain head is found however the body is split"""
+        for size in (1, 3, 64, 16384, len(self.tipset)):
+            with self.subTest(size=size):
+                self.assertEqual(3400001, return_and_validate_rpc_field(
+                    _chunks(self.tipset, size), ('Height',), self.logger_metadata))
+
+    def test_keys_inside_strings_and_nested_objects_ignored(self):
+        """Tests that only the key on the requested level matches"""
+        message = ('{"result": {"x": ["]\\"Height\\": {", {"Height": 1}],'
+                   ' "Blocks": [{"Height": 2}], "Height": "h\\u00e9"}}')
+        for size in (1, 5, len(message)):
+            with self.subTest(size=size):
+                self.assertEqual("h\u00e9", return_and_validate_rpc_field(
+                    _chunks(message, size), ('Height',), self.logger_metadata))
+
+    def test_number_split_across_chunks(self):
+        """Tests that a number at the end of a chunk waits for the next one"""
+        self.assertEqual(123, return_and_validate_rpc_field(
+            iter([b'{"result": {"Height": 12', b'3}}']), ('Height',), self.logger_metadata))
+
+    def test_stops_reading_once_found(self):
+        """Tests that no chunk after the one holding the value is read"""
+        extractor = JsonFieldExtractor({'height': ('result', 'Height')})
+        self.assertTrue(extractor.feed(b'{"result": {"Height": 5, "Blocks": ['))
+        self.assertEqual({'height': 5}, extractor.values)
+
+    def test_rpc_error_logged(self):
+        """Tests that a JSON-RPC error is logged and None returned"""
+        message = '{"jsonrpc": "2.0", "error": {"code": -32601, "message": "x"}, "id": 1}'
+        with capture_logs() as captured:
+            result = return_and_validate_rpc_field(
+                _chunks(message, 8), ('Height',), self.logger_metadata)
+        self.assertEqual(None, result)
+        self.assertEqual('Error in RPC message.', captured[0]['event'])
+
+    def test_missing_field_logged(self):
+        """Tests that a result without the field is logged and None returned"""
+        for message in ('{"result": {"Blocks": []}}', '{"result": {"Height"', '[{"result": 1}]'):
+            with self.subTest(message=message), capture_logs() as captured:
+                self.assertEqual(None, return_and_validate_rpc_field(
+                    _chunks(message, 4), ('Height',), self.logger_metadata))
+                self.assertEqual('Invalid JSON RPC object in RPC message.',
+                                 captured[0]['event'])
+
+    def test_peak_memory_lower_than_full_decode(self):
+        """Tests that extracting Height of a 50 block tipset holds far less
+        memory than decoding the whole response"""
+        chunks = list(_chunks(self.tipset, 16384))
+        extractor_peak = peak_memory(lambda: return_and_validate_rpc_field(
+            iter(chunks), ('Height',), self.logger_metadata))
+        decode_peak = peak_memory(lambda: return_and_validate_rpc_json_result(
+            self.tipset, self.logger_metadata)['Height'])
+        self.assertLess(extractor_peak, decode_peak / 2)
@@ -1,17 +1,23 @@
 # pylint: disable=protected-access,invalid-name,line-too-long
 """Module for testing interfaces"""
 
+import asyncio
+import json
+import threading
 from unittest import TestCase, IsolatedAsyncioTestCase, mock
 from structlog.testing import capture_logs
 import requests
 import requests_mock
+import zmq
 
-from interfaces import HttpsInterface, WebsocketSubscription, WebsocketInterface
+from interfaces import HttpsInterface, WebsocketSubscription, WebsocketInterface, ZmqSubscription
 from cache import Cache
+from prepared import PreparedRequest
+from heads import HeadArrivalIndex
 from log import logger
 
 
-class TestConfiguration(TestCase):
+class TestConfiguration(TestCase):  # pylint: disable=too-many-public-methods
     """Tests HttpsInterface interface."""
 
     def setUp(self):
@@ -125,6 +131,134 @@ class TestConfiguration(TestCase):
             }
             self.assertEqual(m.last_request.qs, expected_params)
 
+    def test_request_counter_by_rpc_method(self):
+        """Tests that requests are counted by their RPC method"""
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text="Ok", status_code=200)
+            m.get(self.url, text="Ok", status_code=200)
+            self.interface._return_and_validate_request(
+                method='POST', payload={"method": "getnetworkinfo"})
+            self.interface._return_and_validate_request(method='GET')
+        self.assertEqual({'getnetworkinfo': 1, 'GET': 1},
+                         dict(self.interface.request_counter.items()))
+
+    def test_request_phases_recorded(self):
+        """Tests that ttfb, download and body size are recorded for a successful request"""
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text="Ok", status_code=200)
+            self.interface._return_and_validate_request(method='POST', payload={})
+        for phase in ('ttfb', 'download'):
+            self.assertEqual(('+Inf', 1), self.interface.phase_histograms[phase].snapshot()[0][-1])
+        self.assertEqual(('+Inf', 0), self.interface.phase_histograms['dns'].snapshot()[0][-1])
+        self.assertEqual(2, self.interface.response_size_histogram.snapshot()[1])
+
+    def test_observe_phases_ttfb_excludes_connection_phases(self):
+        """Tests that time to first byte excludes connection setup phases"""
+        timings = {'dns': 0.1, 'connect': 0.2, 'tls': 0.3}
+        self.interface._observe_phases(timings, 1.0, 0.5, 10)
+        self.assertAlmostEqual(0.4, timings['ttfb'])
+        self.assertEqual(0.5, timings['download'])
+
+    def test_error_counter_non_200(self):
+        """Tests that a non 200 status code is counted as an error"""
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text="Error", status_code=503)
+            self.interface._return_and_validate_request(method='POST', payload={})
+        self.assertEqual([('http_503', 1)], self.interface.error_counter.items())
+
+    def test_error_counter_timeout(self):
+        """Tests that a timeout is counted by its exception type"""
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, exc=requests.exceptions.ReadTimeout)
+            self.interface._return_and_validate_request(method='POST', payload={})
+        self.assertEqual([('ReadTimeout', 1)], self.interface.error_counter.items())
+
+    def test_json_rpc_post_field(self):
+        """Tests that a single field of the json-rpc result is returned"""
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='{"jsonrpc": "2.0", "result": {"Blocks": [{"Height": 1}], "Height": 2}, "id": 1}',
+                   status_code=200)
+            self.assertEqual(2, self.interface.json_rpc_post_field({}, ('Height',)))
+
+    def test_json_rpc_post_field_records_body_size(self):
+        """Tests that the drained body is recorded in the response size histogram"""
+        text = '{"jsonrpc": "2.0", "result": {"Height": 2, "Blocks": []}, "id": 1}'
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text=text, status_code=200)
+            self.interface.json_rpc_post_field({}, ('Height',))
+        self.assertEqual(len(text), self.interface.response_size_histogram.snapshot()[1])
+
+    def test_json_rpc_batch_post(self):
+        """Tests that batch results are returned in request order, matched by id"""
+        payloads = [{"jsonrpc": "1.0", "id": "a", "method": "a"},
+                    {"jsonrpc": "1.0", "id": "b", "method": "b"},
+                    {"jsonrpc": "1.0", "id": "c", "method": "c"}]
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='[{"result": 2, "error": null, "id": "b"},'
+                   ' {"result": 1, "error": null, "id": "a"},'
+                   ' {"error": {"code": -32601, "message": "Method not found"}, "id": "c"}]',
+                   status_code=200)
+            self.assertEqual([1, 2, None], self.interface.json_rpc_batch_post(payloads))
+            self.assertEqual(payloads, m.last_request.json())
+
+    def test_json_rpc_batch_post_not_a_batch(self):
+        """Tests that None is returned if the response is not a batch"""
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='{"result": null, "error": {"code": -32700}, "id": null}',
+                   status_code=200)
+            self.assertEqual(None, self.interface.json_rpc_batch_post([{"id": "a"}]))
+
+    def test_cached_json_rpc_batch_post_single_request(self):
+        """Tests that concurrent callers share one batch request"""
+        payloads = [{"jsonrpc": "1.0", "id": "a", "method": "a"}]
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='[{"result": 1, "error": null, "id": "a"}]', status_code=200)
+            threads = [threading.Thread(target=self.interface.cached_json_rpc_batch_post,
+                                        args=(payloads,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(1, m.call_count)
+        self.assertEqual([1], self.interface.cached_json_rpc_batch_post(payloads))
+
+    def test_cached_json_rpc_batch_result(self):
+        """Tests that results of a cached batch are looked up by request id"""
+        payloads = [{"jsonrpc": "2.0", "id": "a", "method": "a"},
+                    {"jsonrpc": "2.0", "id": "b", "method": "b"}]
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='[{"jsonrpc": "2.0", "result": 2, "id": "b"},'
+                   ' {"jsonrpc": "2.0", "error": {"code": -32601, "message": "Not found"},'
+                   ' "id": "a"}]', status_code=200)
+            self.assertEqual(2, self.interface.cached_json_rpc_batch_result(payloads, "b"))
+            self.assertEqual(None, self.interface.cached_json_rpc_batch_result(payloads, "a"))
+            self.assertEqual(1, m.call_count)
+        self.assertEqual({"b": 2}, self.interface.cached_json_rpc_batch_results(payloads))
+        self.assertEqual(-32601, self.interface.cached_json_rpc_batch_error(payloads, "a"))
+        self.assertEqual(None, self.interface.cached_json_rpc_batch_error(payloads, "b"))
+
+    def test_prepared_request_body_sent(self):
+        """Tests that the encoded body of a prepared request is posted as JSON"""
+        request = PreparedRequest({"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber"})
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='{"jsonrpc": "2.0", "result": "0x10", "id": 1}',
+                   status_code=200)
+            self.assertEqual("0x10", self.interface.json_rpc_post(request))
+            self.assertEqual(request.body, m.last_request.body)
+            self.assertEqual('application/json', m.last_request.headers['Content-Type'])
+        self.assertEqual([('eth_blockNumber', 1)], self.interface.request_counter.items())
+
+    def test_cached_json_rpc_post_prepared_and_plain_payload_share_key(self):
+        """Tests that a prepared request and its plain payload share one cache entry"""
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber"}
+        with requests_mock.Mocker(session=self.interface.session) as m:
+            m.post(self.url, text='{"jsonrpc": "2.0", "result": "0x10", "id": 1}',
+                   status_code=200)
+            self.interface.cached_json_rpc_post(PreparedRequest(payload))
+            self.assertEqual("0x10", self.interface.cached_json_rpc_post(payload))
+            self.assertEqual(1, m.call_count)
+
+
 class TestWebSocketSubscription(TestCase):
     """Tests the web socket subscription class"""
 
@@ -146,6 +280,267 @@ class TestWebSocketSubscription(TestCase):
         self.assertEqual(self.web_sock_sub._logger_metadata, expected_metadata)
 
 
+class FakeWebsocket():  # pylint: disable=too-few-public-methods
+    """Websocket stand-in yielding the provided messages."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.closed = False
+        self.latency = 0
+        self.send = mock.AsyncMock()
+        self.close = mock.AsyncMock()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for message in self.messages:
+            yield message
+
+
+class TestWebSocketSubscriptionRequests(IsolatedAsyncioTestCase):  # pylint: disable=too-many-public-methods
+    """Tests requests sent over the subscription socket"""
+
+    def setUp(self):
+        self.web_sock_sub = WebsocketSubscription(
+            "wss://test.com", None, {"method": "eth_blockNumber", "params": []},
+            ping_timeout=1)
+
+    async def test_request_returns_matching_response(self):
+        """Tests that a request resolves with the response carrying its id"""
+        websocket = FakeWebsocket([])
+        request = asyncio.create_task(self.web_sock_sub._request(
+            websocket, {"method": "eth_blockNumber", "params": []}))
+        await asyncio.sleep(0)
+        websocket.send.assert_awaited_once_with(
+            '{"method":"eth_blockNumber","params":[],"id":"brpc-1"}')
+        self.assertTrue(self.web_sock_sub._resolve_request(
+            {"jsonrpc": "2.0", "id": "brpc-1", "result": "0x10"}))
+        self.assertEqual("0x10", await request)
+        self.assertEqual({}, self.web_sock_sub._pending_requests)
+
+    async def test_request_timeout_returns_none(self):
+        """Tests that a request without response times out and is counted as an error"""
+        self.web_sock_sub._client_parameters['ping_timeout'] = 0.01
+        result = await self.web_sock_sub._request(FakeWebsocket([]), {"method": "m"})
+        self.assertEqual(None, result)
+        self.assertEqual([('TimeoutError', 1)], self.web_sock_sub.error_counter.items())
+
+    async def test_request_rpc_error_returns_none(self):
+        """Tests that an error response returns None"""
+        request = asyncio.create_task(self.web_sock_sub._request(
+            FakeWebsocket([]), {"method": "m"}))
+        await asyncio.sleep(0)
+        self.web_sock_sub._resolve_request({"id": "brpc-1", "error": {"code": -1}})
+        self.assertEqual(None, await request)
+
+    async def test_request_from_another_thread(self):
+        """Tests that requests from other threads are sent over the open socket"""
+        websocket = FakeWebsocket([])
+
+        async def respond(message):
+            request_id = json.loads(message)['id']
+            self.web_sock_sub._resolve_request({"id": request_id, "result": request_id})
+        websocket.send.side_effect = respond
+        self.web_sock_sub._loop = asyncio.get_running_loop()
+        self.web_sock_sub._websocket = websocket
+        result = await asyncio.to_thread(
+            self.web_sock_sub.request, [{"method": "a"}, {"method": "b"}])
+        self.assertEqual(["brpc-1", "brpc-2"], result)
+
+    def test_request_not_connected(self):
+        """Tests that requests return None while the socket is not connected"""
+        self.assertEqual(None, self.web_sock_sub.request([{"method": "a"}]))
+
+    async def test_process_message_keeps_notifications_per_method(self):
+        """Tests that the latest result of each notification method is kept"""
+        websocket = FakeWebsocket([
+            '{"jsonrpc": "2.0", "method": "slotNotification", "params": {"result": {"slot": 5}}}',
+            '{"jsonrpc": "2.0", "method": "rootNotification", "params": {"result": 3}}'
+        ])
+        with mock.patch.object(self.web_sock_sub, 'monitor_heads_received'), \
+                mock.patch.object(self.web_sock_sub, '_probe_rpc_latency'):
+            await self.web_sock_sub._process_message(websocket)
+        self.assertEqual({'slotNotification': {'slot': 5}, 'rootNotification': 3},
+                         self.web_sock_sub.latest_notifications)
+
+    async def test_subscribe_sends_every_payload(self):
+        """Tests that a list of subscription payloads is sent over one connection"""
+        websocket = FakeWebsocket([])
+        with mock.patch('interfaces.connect', new_callable=mock.AsyncMock,
+                        side_effect=[websocket, asyncio.CancelledError()]), \
+                mock.patch('interfaces.full_jitter', return_value=0), \
+                mock.patch.object(self.web_sock_sub, '_process_message'):
+            with self.assertRaises(asyncio.CancelledError):
+                await self.web_sock_sub._subscribe([{"method": "a"}, {"method": "b"}])
+        websocket.send.assert_has_awaits([mock.call('{"method":"a"}'),
+                                          mock.call('{"method":"b"}')])
+
+    async def test_process_message_routes_responses(self):
+        """Tests that responses to our requests are neither heads nor latest message"""
+        websocket = FakeWebsocket([
+            '{"jsonrpc": "2.0", "id": 1, "result": "0xsubscription"}',
+            '{"jsonrpc": "2.0", "method": "eth_subscription", "params": {"result": {"number": "0x1"}}}',
+            '{"jsonrpc": "2.0", "id": "brpc-7", "result": "0x1"}'
+        ])
+        with mock.patch.object(self.web_sock_sub, 'monitor_heads_received'), \
+                mock.patch.object(self.web_sock_sub, '_probe_rpc_latency'):
+            await self.web_sock_sub._process_message(websocket)
+        self.assertEqual(2, self.web_sock_sub.heads_received)
+        self.assertEqual({"number": "0x1"}, self.web_sock_sub._latest_message)
+
+    def test_on_head_propagation_delay(self):
+        """Tests that head arrivals are compared against other subscriptions"""
+        head_arrivals = HeadArrivalIndex()
+        head_arrivals.observe(16, 100.0)
+        subscription = WebsocketSubscription(
+            "wss://test.com", None, None, 'number', head_arrivals, ping_timeout=1)
+        subscription._on_head({"number": "0x10"}, 100.2)
+        subscription._on_head({"number": "0x11"}, 101.0)
+        subscription._on_head({"number": "invalid"}, 101.0)
+        buckets, total = subscription.propagation_delay_histogram.snapshot()
+        self.assertEqual(('+Inf', 2), buckets[-1])
+        self.assertAlmostEqual(0.2, total)
+        self.assertEqual(1, subscription.heads_first_seen)
+
+    def test_on_head_reorg(self):
+        """Tests that reorgs are counted with their depth"""
+        subscription = WebsocketSubscription(
+            "wss://test.com", None, None, 'number', ping_timeout=1)
+        subscription._on_head({"number": "0x10", "hash": "0xa", "parentHash": "0x9"}, 1.0)
+        subscription._on_head({"number": "0x11", "hash": "0xb", "parentHash": "0xa"}, 2.0)
+        subscription._on_head({"number": "0x11", "hash": "0xc", "parentHash": "0xa"}, 3.0)
+        self.assertEqual(1, subscription.reorgs)
+        self.assertEqual(1, subscription.reorg_depth_histogram.snapshot()[1])
+
+    @mock.patch('interfaces.time', return_value=1002.5)
+    def test_on_head_timestamp(self, _):
+        """Tests that the block timestamp gives the arrival delay and head age"""
+        subscription = WebsocketSubscription(
+            "wss://test.com", None, None, 'number', ping_timeout=1)
+        self.assertEqual(None, subscription.head_age)
+        subscription._on_head({"number": "0x11", "timestamp": hex(1001)}, 1.0)
+        subscription._on_head({"number": "0x10", "timestamp": hex(1000)}, 1.0)
+        self.assertEqual(1001, subscription.head_timestamp)
+        self.assertEqual(1.5, subscription.head_age)
+        self.assertEqual(4.0, subscription.head_arrival_delay_histogram.snapshot()[1])
+
+    def test_stall_timeout_learned_from_head_gaps(self):
+        """Tests that the stall timeout is a multiple of the learned block interval"""
+        subscription = WebsocketSubscription(
+            "wss://test.com", None, None, stall_timeout_multiple=4, ping_timeout=1)
+        self.assertEqual(60, subscription.stall_timeout)
+        for arrival in range(0, 9):
+            subscription._observe_head_gap(arrival * 2.0)
+        self.assertEqual(2.0, subscription.block_interval)
+        self.assertEqual(8.0, subscription.stall_timeout)
+        self.assertNotIn('stall_timeout_multiple', subscription._client_parameters)
+
+    def test_stall_timeout_idle_until_first_head_after_reconnect(self):
+        """Tests that a new connection gets IDLE_TIMEOUT until its first head arrived"""
+        subscription = WebsocketSubscription(
+            "wss://test.com", None, None, stall_timeout_multiple=5, ping_timeout=1)
+        for arrival in range(0, 9):
+            subscription._observe_head_gap(arrival * 0.25)
+        self.assertEqual(1.25, subscription.stall_timeout)
+        with mock.patch.object(subscription, 'monitor_heads_received'):
+            asyncio.run(subscription._process_message(FakeWebsocket([])))
+        self.assertEqual(60, subscription.stall_timeout)
+        subscription._observe_head_gap(100.0)
+        self.assertEqual(1.25, subscription.stall_timeout)
+
+    def test_blockchain_info_max_age_not_passed_to_connect(self):
+        """Tests that the https only blockchain_info_max_age does not reach connect"""
+        subscription = WebsocketSubscription(
+            "wss://test.com", None, None, blockchain_info_max_age=60, ping_timeout=1)
+        self.assertEqual({'ping_timeout': 1}, subscription._client_parameters)
+
+    def test_stall_timeout_minimum(self):
+        """Tests that fast chains do not get a stall timeout below the minimum"""
+        subscription = WebsocketSubscription("wss://test.com", None, None, ping_timeout=1)
+        for arrival in range(0, 9):
+            subscription._observe_head_gap(arrival * 0.05)
+        self.assertEqual(1.0, subscription.stall_timeout)
+
+    async def test_monitor_heads_received_closes_stalled_socket(self):
+        """Tests that a subscription without heads within the stall timeout is closed"""
+        websocket = FakeWebsocket([])
+        with mock.patch.object(WebsocketSubscription, 'stall_timeout',
+                               new_callable=mock.PropertyMock, return_value=0.01):
+            await self.web_sock_sub.monitor_heads_received(websocket)
+        self.assertEqual(1, self.web_sock_sub.stalls)
+        websocket.close.assert_awaited_once()
+
+    async def test_monitor_heads_received_stops_on_closed_socket(self):
+        """Tests that monitoring ends without a stall once the socket is closed"""
+        websocket = FakeWebsocket([])
+        websocket.closed = True
+        with mock.patch.object(WebsocketSubscription, 'stall_timeout',
+                               new_callable=mock.PropertyMock, return_value=0.01):
+            await self.web_sock_sub.monitor_heads_received(websocket)
+        self.assertEqual(0, self.web_sock_sub.stalls)
+        websocket.close.assert_not_awaited()
+
+    async def test_subscribe_reconnects_with_backoff(self):
+        """Tests that failed and dropped connections are retried after a backoff
+        and the time to reconnect is recorded"""
+        first, second = FakeWebsocket([]), FakeWebsocket([])
+        with mock.patch('interfaces.connect', new_callable=mock.AsyncMock,
+                        side_effect=[OSError('refused'), first, second,
+                                     asyncio.CancelledError()]), \
+                mock.patch('interfaces.full_jitter', return_value=0) as jitter, \
+                mock.patch.object(self.web_sock_sub, '_process_message'):
+            with self.assertRaises(asyncio.CancelledError):
+                await self.web_sock_sub._subscribe({"method": "eth_subscribe"})
+        self.assertEqual(3, self.web_sock_sub.reconnect_attempts)
+        self.assertEqual([('OSError', 1)], self.web_sock_sub.error_counter.items())
+        self.assertEqual([mock.call(1, 1.0, 60.0), mock.call(0, 1.0, 60.0),
+                          mock.call(0, 1.0, 60.0)], jitter.call_args_list)
+        self.assertEqual(('+Inf', 1),
+                         self.web_sock_sub.reconnect_duration_histogram.snapshot()[0][-1])
+        first.close.assert_awaited_once()
+        second.send.assert_awaited_once_with('{"method":"eth_subscribe"}')
+
+    async def test_subscribe_clears_probe_result_on_disconnect(self):
+        """Tests that the last probe result is not served after the connection closed"""
+        self.web_sock_sub.latest_probe_result = 42
+        self.web_sock_sub.latest_probe_latency = 0.1
+        with mock.patch('interfaces.connect', new_callable=mock.AsyncMock,
+                        side_effect=[FakeWebsocket([]), asyncio.CancelledError()]), \
+                mock.patch('interfaces.full_jitter', return_value=0), \
+                mock.patch.object(self.web_sock_sub, '_process_message'):
+            with self.assertRaises(asyncio.CancelledError):
+                await self.web_sock_sub._subscribe({"method": "eth_subscribe"})
+        self.assertEqual(None, self.web_sock_sub.latest_probe_result)
+        self.assertEqual(None, self.web_sock_sub.latest_probe_latency)
+
+    async def test_probe_rpc_latency_records_round_trip(self):
+        """Tests that a successful probe is recorded in the rpc latency histogram"""
+        websocket = FakeWebsocket([])
+        with mock.patch('interfaces.RPC_PROBE_INTERVAL', 0), \
+                mock.patch.object(self.web_sock_sub, '_request', return_value="0x1"):
+            probe = asyncio.create_task(self.web_sock_sub._probe_rpc_latency(websocket))
+            await asyncio.sleep(0.01)
+            websocket.closed = True
+            await probe
+        buckets, _ = self.web_sock_sub.rpc_latency_histogram.snapshot()
+        self.assertGreater(buckets[-1][1], 0)
+
+        self.assertEqual("0x1", self.web_sock_sub.latest_probe_result)
+        self.assertGreater(self.web_sock_sub.latest_probe_latency, 0)
+
+    async def test_probe_polls_head_without_subscription(self):
+        """Tests that probe responses keep a subscription-less connection from stalling"""
+        websocket = FakeWebsocket([])
+        with mock.patch('interfaces.RPC_PROBE_INTERVAL', 0), \
+                mock.patch.object(self.web_sock_sub, '_request', return_value=42):
+            probe = asyncio.create_task(self.web_sock_sub._probe_rpc_latency(websocket))
+            await asyncio.sleep(0.01)
+            websocket.closed = True
+            await probe
+        self.assertEqual(42, self.web_sock_sub.latest_probe_result)
+        self.assertNotEqual(None, self.web_sock_sub._last_head_arrival)
+
 class TestWebSocketInterface(IsolatedAsyncioTestCase):
     """Tests the web socket interface class"""
 
@@ -160,6 +555,14 @@ class TestWebSocketInterface(IsolatedAsyncioTestCase):
         self.assertEqual(self.client_params,
                          self.web_sock_interface._client_parameters)
 
+    def test_cached_request(self):
+        """Tests that requests over the subscription are sent once per scrape"""
+        with mock.patch.object(self.web_sock_interface, 'request',
+                               return_value=["0x1"]) as request:
+            self.assertEqual(["0x1"], self.web_sock_interface.cached_request([{"method": "a"}]))
+            self.assertEqual(["0x1"], self.web_sock_interface.cached_request([{"method": "a"}]))
+        request.assert_called_once_with([{"method": "a"}])
+
     def test_load_and_validate_json_key_valid_json(self):
         """Tests that the correct value for a key is returned when providing valid json"""
         message = '{"result": "valid"}'
@@ -248,7 +651,9 @@ class TestWebSocketInterface(IsolatedAsyncioTestCase):
         """Tests that the query method is called for a key not in the cache"""
         with mock.patch('interfaces.WebsocketInterface.query') as mocked_query:
             self.web_sock_interface.cached_query('key', False)
-            mocked_query.assert_called_once_with('key', False)
+            request = mocked_query.call_args.args[0]
+            self.assertEqual('key', request.payload)
+            self.assertEqual(False, mocked_query.call_args.args[1])
 
     def test_cache_query_retrieve_invalid_key_added_to_cache(self):
         """Tests that the method adds key to cache if it doesn't already exist"""
@@ -259,7 +664,7 @@ class TestWebSocketInterface(IsolatedAsyncioTestCase):
                 self.web_sock_interface.cache = mocked_cache
                 self.web_sock_interface.cached_query('key')
                 mocked_cache.store_key_value.assert_called_once_with(
-                    'key', 'value')
+                    PreparedRequest('key').cache_key, 'value')
 
     def test_cache_query_retrieve_invalid_key_bad_query(self):
         """Tests that the method returns None if key is not in cache and query returns None"""
@@ -274,3 +679,63 @@ class TestWebSocketInterface(IsolatedAsyncioTestCase):
         self.web_sock_interface._latest_query_latency = 0.123
         self.web_sock_interface.latest_query_latency  # pylint: disable=pointless-statement
         self.assertEqual(None, self.web_sock_interface._latest_query_latency)
+
+
+class TestZmqSubscription(TestCase):
+    """Tests the ZMQ subscription against a local publisher"""
+
+    def setUp(self):
+        self.publisher = zmq.Context.instance().socket(zmq.PUB)
+        self.publisher.bind('tcp://127.0.0.1:*')
+        self.url = self.publisher.getsockopt(zmq.LAST_ENDPOINT).decode()
+        self.received = []
+        self.notified = threading.Event()
+        self.subscription = ZmqSubscription(self.url, [b'hashblock'], self._callback)
+        self.subscription.daemon = True
+
+    def tearDown(self):
+        self.subscription.stop()
+        self.subscription.join(timeout=5)
+        self.publisher.close(linger=0)
+
+    def _callback(self, topic, body):
+        self.received.append((topic, body))
+        self.notified.set()
+
+    def _publish_until_notified(self, *topics):
+        # Subscriptions propagate asynchronously, early messages are dropped.
+        for sequence in range(50):
+            for topic in topics:
+                self.publisher.send_multipart(
+                    [topic, b'\x01' * 32, sequence.to_bytes(4, 'little')])
+            if self.notified.wait(0.1):
+                return
+
+    def test_notification_calls_callback(self):
+        """Tests that a published hashblock notification reaches the callback"""
+        self.subscription.start()
+        self._publish_until_notified(b'hashblock')
+        self.assertEqual((b'hashblock', b'\x01' * 32), self.received[0])
+        self.assertGreater(self.subscription.notifications_received, 0)
+
+    def test_other_topics_ignored(self):
+        """Tests that topics which were not subscribed are not delivered"""
+        self.subscription.start()
+        self._publish_until_notified(b'rawtx', b'hashblock')
+        self.assertEqual({b'hashblock'}, {topic for topic, _ in self.received})
+
+    def test_stop(self):
+        """Tests that the subscription thread ends after stop"""
+        self.subscription.start()
+        self.subscription.stop()
+        self.subscription.join(timeout=5)
+        self.assertFalse(self.subscription.is_alive())
+
+    def test_invalid_url_logged(self):
+        """Tests that a url the socket cannot connect to ends the thread with an error log"""
+        self.subscription = ZmqSubscription('tcp://', [b'hashblock'], self._callback)
+        with mock.patch.object(self.subscription, '_logger') as mocked_logger:
+            self.subscription.start()
+            self.subscription.join(timeout=5)
+        self.assertFalse(self.subscription.is_alive())
+        mocked_logger.error.assert_called_once()
@@ -2,12 +2,14 @@
 """Tests the metrics module"""
 from unittest import TestCase, mock
 from collections import namedtuple
-from prometheus_client.metrics_core import GaugeMetricFamily, CounterMetricFamily, InfoMetricFamily
+from prometheus_client.metrics_core import GaugeMetricFamily, CounterMetricFamily, InfoMetricFamily, HistogramMetricFamily # pylint: disable=line-too-long
 
-from metrics import MetricsLoader, PrometheusCustomCollector
+from collectors import EvmCollector, SolanaCollector
+from metrics import MetricsLoader, PrometheusCustomCollector, ScrapePlan
+from stats import Histogram, LabeledCounter, RollingWindow
 
 
-class TestMetricsLoader(TestCase):
+class TestMetricsLoader(TestCase):  # pylint: disable=too-many-public-methods
     """Tests the MetricsLoader class"""
 
     def setUp(self):
@@ -121,6 +123,260 @@ class TestMetricsLoader(TestCase):
         self.assertEqual(GaugeMetricFamily, type(
             self.metrics_loader.latency_metric))
 
+    def test_latency_histogram_metric(self):
+        """Tests the latency_histogram_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.latency_histogram_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_latency_seconds',
+                'Distribution of all round trips measured on the rpc connection.',
+                labels=self.labels)
+
+    def test_latency_histogram_metric_returns_histogram(self):
+        """Tests the latency_histogram_metric property returns a histogram"""
+        self.assertEqual(HistogramMetricFamily, type(
+            self.metrics_loader.latency_histogram_metric))
+
+    def test_latency_quantile_metric(self):
+        """Tests the latency_quantile_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.latency_quantile_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_latency_quantile_seconds',
+                'Latency quantiles over a rolling window of the most recent round trips.',
+                labels=self.labels + ['quantile'])
+
+    def test_rpc_latency_metric(self):
+        """Tests the rpc_latency_metric property calls HistogramMetric with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.rpc_latency_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_rpc_latency_seconds',
+                'Round trip time of JSON-RPC calls sent over the subscription socket.',
+                labels=self.labels)
+
+    def test_head_propagation_delay_metric(self):
+        """Tests the head_propagation_delay_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.head_propagation_delay_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_head_propagation_delay_seconds',
+                'Delay between the first provider delivering a head and this endpoint.',
+                labels=self.labels)
+
+    def test_heads_first_seen_metric(self):
+        """Tests the heads_first_seen_metric property calls CounterMetric with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.heads_first_seen_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_head_first_seen',
+                'Heads this endpoint delivered before any other endpoint.',
+                labels=self.labels)
+
+    def test_reorgs_metric(self):
+        """Tests the reorgs_metric property calls CounterMetric with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.reorgs_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_reorgs',
+                'Chain reorganizations observed in the head subscription.',
+                labels=self.labels)
+
+    def test_reorg_depth_metric(self):
+        """Tests the reorg_depth_metric property calls HistogramMetric with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.reorg_depth_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_reorg_depth',
+                'Number of replaced heads per observed chain reorganization.',
+                labels=self.labels)
+
+    def test_head_age_metric(self):
+        """Tests the head_age_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.head_age_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_head_age_seconds',
+                'Seconds since the timestamp of the newest head.',
+                labels=self.labels)
+
+    def test_head_arrival_delay_metric(self):
+        """Tests the head_arrival_delay_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.head_arrival_delay_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_head_arrival_delay_seconds',
+                'Delay between the block timestamp and the arrival of the head.',
+                labels=self.labels)
+
+    def test_block_interval_metric(self):
+        """Tests the block_interval_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.block_interval_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_block_interval_seconds',
+                'Moving average of the time between subscribed heads.',
+                labels=self.labels)
+
+    def test_stalls_metric(self):
+        """Tests the stalls_metric property calls CounterMetric with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.stalls_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_stalls',
+                'Subscriptions closed for not receiving a head within the stall timeout.',
+                labels=self.labels)
+
+    def test_reconnect_attempts_metric(self):
+        """Tests the reconnect_attempts_metric property calls CounterMetric
+        with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.reconnect_attempts_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_reconnect_attempts',
+                'Attempts to reconnect the websocket subscription.',
+                labels=self.labels)
+
+    def test_reconnect_duration_metric(self):
+        """Tests the reconnect_duration_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.reconnect_duration_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_reconnect_duration_seconds',
+                'Time from losing the websocket subscription until it was reconnected.',
+                labels=self.labels)
+
+    def test_slot_metric(self):
+        """Tests the slot_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.slot_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_slot',
+                'Latest slot per commitment level.',
+                labels=self.labels + ['commitment'])
+
+    def test_slot_lag_metric(self):
+        """Tests the slot_lag_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.slot_lag_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_slot_lag',
+                'Slots a commitment level trails the processed slot.',
+                labels=self.labels + ['commitment'])
+
+    def test_head_lag_metric(self):
+        """Tests the head_lag_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.head_lag_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_head_lag',
+                'Blocks a tagged block such as safe or finalized trails the latest block.',
+                labels=self.labels + ['tag'])
+
+    def test_syncing_metric(self):
+        """Tests the syncing_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.syncing_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_syncing',
+                'Returns 1 if the endpoint reports that it is not in sync with the network.',
+                labels=self.labels)
+
+    def test_sync_lag_metric(self):
+        """Tests the sync_lag_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.sync_lag_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_sync_lag',
+                'Blocks the endpoint trails the highest block it knows of while syncing.',
+                labels=self.labels)
+
+    def test_server_state_metric(self):
+        """Tests the server_state_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.server_state_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_server_state',
+                'Set to 1 for the state the endpoint server reports itself to be in.',
+                labels=self.labels + ['state'])
+
+    def test_peers_metric(self):
+        """Tests the peers_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.peers_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_peers',
+                'Number of peers the endpoint is connected to.',
+                labels=self.labels)
+
+    def test_chain_tips_metric(self):
+        """Tests the chain_tips_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.chain_tips_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_chain_tips',
+                'Number of chain tips known to the endpoint by status.',
+                labels=self.labels + ['status'])
+
+    def test_mempool_transactions_metric(self):
+        """Tests the mempool_transactions_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.mempool_transactions_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_mempool_transactions',
+                'Number of transactions in the endpoint mempool.',
+                labels=self.labels)
+
+    def test_mempool_bytes_metric(self):
+        """Tests the mempool_bytes_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.mempool_bytes_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_mempool_bytes',
+                'Size of the transactions in the endpoint mempool in bytes.',
+                labels=self.labels)
+
+    def test_ledger_version_metric(self):
+        """Tests the ledger_version_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.ledger_version_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_ledger_version',
+                'Latest ledger version of the endpoint.',
+                labels=self.labels)
+
+    def test_pruning_window_metric(self):
+        """Tests the pruning_window_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.pruning_window_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_pruning_window',
+                'Number of versions between the oldest retained and the latest one.',
+                labels=self.labels)
+
+    def test_request_phase_duration_metric(self):
+        """Tests the request_phase_duration_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.request_phase_duration_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_request_phase_duration_seconds',
+                'Duration of https request phases: dns, connect, tls, ttfb and download.',
+                labels=self.labels + ['phase'])
+
+    def test_response_size_metric(self):
+        """Tests the response_size_metric property calls HistogramMetric with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.response_size_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_response_size_bytes',
+                'Size of https response bodies.',
+                labels=self.labels)
+
     def test_block_height_delta_metric(self):
         """Tests the block_height_delta_metric property calls GaugeMetric with the correct args"""
         with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
@@ -149,8 +405,81 @@ class TestMetricsLoader(TestCase):
         self.assertEqual(GaugeMetricFamily, type(
             self.metrics_loader.difficulty_delta_metric))
 
+    def test_ledger_version_delta_metric(self):
+        """Tests the ledger_version_delta_metric property calls GaugeMetric with the correct args"""
+        with mock.patch('metrics.GaugeMetricFamily') as gauge_mock:
+            self.metrics_loader.ledger_version_delta_metric  # pylint: disable=pointless-statement
+            gauge_mock.assert_called_once_with(
+                'brpc_ledger_version_behind_highest',
+                'Difference between ledger versions relative to the max ledger version',
+                labels=self.labels)
+
+    def test_exporter_scrape_duration_metric(self):
+        """Tests the exporter_scrape_duration_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.exporter_scrape_duration_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_exporter_scrape_duration_seconds',
+                'Time spent collecting metrics from all endpoints per scrape.')
+
+    def test_exporter_probe_duration_metric(self):
+        """Tests the exporter_probe_duration_metric property calls HistogramMetric
+        with the correct args"""
+        with mock.patch('metrics.HistogramMetricFamily') as histogram_mock:
+            self.metrics_loader.exporter_probe_duration_metric  # pylint: disable=pointless-statement
+            histogram_mock.assert_called_once_with(
+                'brpc_exporter_probe_duration_seconds',
+                'Time spent in a single collector probe such as alive or block_height.',
+                labels=self.labels + ['probe'])
+
+    def test_exporter_probe_duration_metric_returns_histogram(self):
+        """Tests the exporter_probe_duration_metric property returns a histogram"""
+        self.assertEqual(HistogramMetricFamily, type(
+            self.metrics_loader.exporter_probe_duration_metric))
+
+    def test_exporter_probe_errors_metric(self):
+        """Tests the exporter_probe_errors_metric property calls CounterMetric
+        with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.exporter_probe_errors_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_exporter_probe_errors',
+                'Exceptions raised by collector probes, by exception type.',
+                labels=self.labels + ['probe', 'error'])
+
+    def test_exporter_probes_in_flight_metric_returns_gauge(self):
+        """Tests the exporter_probes_in_flight_metric property returns a gauge"""
+        self.assertEqual(GaugeMetricFamily, type(
+            self.metrics_loader.exporter_probes_in_flight_metric))
+
+    def test_exporter_requests_metric(self):
+        """Tests the exporter_requests_metric property calls CounterMetric
+        with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.exporter_requests_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_exporter_requests',
+                'Requests sent by the endpoint interface, by RPC method.',
+                labels=self.labels + ['method'])
+
+    def test_exporter_request_errors_metric(self):
+        """Tests the exporter_request_errors_metric property calls CounterMetric
+        with the correct args"""
+        with mock.patch('metrics.CounterMetricFamily') as counter_mock:
+            self.metrics_loader.exporter_request_errors_metric  # pylint: disable=pointless-statement
+            counter_mock.assert_called_once_with(
+                'brpc_exporter_request_errors',
+                'Failed requests of the endpoint interface, by error type including timeouts.',
+                labels=self.labels + ['error'])
+
+    def test_exporter_threads_metric_returns_gauge(self):
+        """Tests the exporter_threads_metric property returns a gauge"""
+        self.assertEqual(GaugeMetricFamily, type(
+            self.metrics_loader.exporter_threads_metric))
+
 
-class TestPrometheusCustomCollector(TestCase):
+class TestPrometheusCustomCollector(TestCase):  # pylint: disable=too-many-public-methods
     """Tests the prometheus custom collector class"""
 
     def setUp(self):
@@ -159,7 +488,8 @@ class TestPrometheusCustomCollector(TestCase):
             mock.patch("metrics.MetricsLoader") as mocked_loader
         ):
             mocked_registry.return_value.get_collector_registry = [
-                mock.Mock(), mock.Mock()]
+                mock.Mock(labels=['test1.com'], INLINE_PROBES=()),
+                mock.Mock(labels=['test2.com'], INLINE_PROBES=())]
             self.prom_collector = PrometheusCustomCollector()
             self.mocked_registry = mocked_registry
             self.mocked_loader = mocked_loader
@@ -174,9 +504,44 @@ class TestPrometheusCustomCollector(TestCase):
             self.mocked_loader.return_value.finalized_block_height_metric,
             self.mocked_loader.return_value.client_version_metric,
             self.mocked_loader.return_value.total_difficulty_metric,
+            self.mocked_loader.return_value.slot_metric,
+            self.mocked_loader.return_value.slot_lag_metric,
+            self.mocked_loader.return_value.head_lag_metric,
+            self.mocked_loader.return_value.syncing_metric,
+            self.mocked_loader.return_value.sync_lag_metric,
+            self.mocked_loader.return_value.server_state_metric,
+            self.mocked_loader.return_value.peers_metric,
+            self.mocked_loader.return_value.chain_tips_metric,
+            self.mocked_loader.return_value.mempool_transactions_metric,
+            self.mocked_loader.return_value.mempool_bytes_metric,
+            self.mocked_loader.return_value.ledger_version_metric,
+            self.mocked_loader.return_value.pruning_window_metric,
             self.mocked_loader.return_value.latency_metric,
+            self.mocked_loader.return_value.latency_histogram_metric,
+            self.mocked_loader.return_value.latency_quantile_metric,
+            self.mocked_loader.return_value.rpc_latency_metric,
+            self.mocked_loader.return_value.head_propagation_delay_metric,
+            self.mocked_loader.return_value.heads_first_seen_metric,
+            self.mocked_loader.return_value.reorgs_metric,
+            self.mocked_loader.return_value.reorg_depth_metric,
+            self.mocked_loader.return_value.head_age_metric,
+            self.mocked_loader.return_value.head_arrival_delay_metric,
+            self.mocked_loader.return_value.block_interval_metric,
+            self.mocked_loader.return_value.stalls_metric,
+            self.mocked_loader.return_value.reconnect_attempts_metric,
+            self.mocked_loader.return_value.reconnect_duration_metric,
+            self.mocked_loader.return_value.request_phase_duration_metric,
+            self.mocked_loader.return_value.response_size_metric,
             self.mocked_loader.return_value.block_height_delta_metric,
-            self.mocked_loader.return_value.difficulty_delta_metric
+            self.mocked_loader.return_value.difficulty_delta_metric,
+            self.mocked_loader.return_value.ledger_version_delta_metric,
+            self.mocked_loader.return_value.exporter_scrape_duration_metric,
+            self.mocked_loader.return_value.exporter_probe_duration_metric,
+            self.mocked_loader.return_value.exporter_probe_errors_metric,
+            self.mocked_loader.return_value.exporter_probes_in_flight_metric,
+            self.mocked_loader.return_value.exporter_requests_metric,
+            self.mocked_loader.return_value.exporter_request_errors_metric,
+            self.mocked_loader.return_value.exporter_threads_metric
         ]
         results = self.prom_collector.collect()
         for result in results:
@@ -185,14 +550,79 @@ class TestPrometheusCustomCollector(TestCase):
     def test_collect_number_of_yields(self):
         """Tests that the collect method yields the expected number of values"""
         results = self.prom_collector.collect()
-        self.assertEqual(10, len(list(results)))
+        self.assertEqual(45, len(list(results)))
 
     def test_get_thread_count(self):
-        """Tests get thread count returns the expected number of threads
-        based on number of metrics and collectors"""
+        """Tests get thread count returns one thread for each remote probe of every collector"""
         thread_count = self.prom_collector.get_thread_count()
-        # Total of 10 metrics times 2 items in our mocked pool should give 20
-        self.assertEqual(20, thread_count)
+        # Total of 18 remote probes times 2 items in our mocked pool should give 36
+        self.assertEqual(36, thread_count)
+
+    def test_scrape_plan(self):
+        """Tests that the plan only lists probes the collector supports"""
+        plan = ScrapePlan(mock.Mock(spec=['alive', 'slots', 'heads_received', 'latency']))
+        self.assertEqual((('alive', False), ('slots', True)), plan.remote)
+        self.assertEqual((('heads_received', False), ('latency', False)), plan.inline)
+
+    def test_scrape_plans_built_once_per_class(self):
+        """Tests that collectors of the same class share one scrape plan"""
+        class Collector():  # pylint: disable=too-few-public-methods
+            """A collector only supporting alive"""
+
+            def alive(self):
+                """Returns the health of the collector."""
+                return True
+
+        self.prom_collector._collector_registry = [Collector(), Collector()]
+        first, second = self.prom_collector._build_scrape_plans()  # pylint: disable=unbalanced-tuple-unpacking
+        self.assertIs(first[1], second[1])
+        self.assertEqual((('alive', False),), first[1].remote)
+
+    def test_subscription_probes_inline(self):
+        """Tests that probes a collector serves from its subscription are not
+        submitted to the executor, and Solana collectors with and without a
+        subscription get separate plans"""
+        with mock.patch('collectors.WebsocketInterface'), \
+                mock.patch('collectors.WebsocketSubscription'):
+            evm = EvmCollector('wss://test1.com', ['test1.com'], 1)
+            subscribed = SolanaCollector('https://test2.com', ['test2.com'], 1,
+                                         subscribe_url='wss://test2.com')
+            polled = SolanaCollector('https://test3.com', ['test3.com'], 1)
+        self.prom_collector._collector_registry = [evm, subscribed, polled]
+        plans = dict(self.prom_collector._build_scrape_plans())
+        self.assertNotIn(('alive', False), plans[evm].remote)
+        self.assertNotIn(('block_height', False), plans[evm].remote)
+        self.assertIn(('alive', False), plans[evm].inline)
+        self.assertIn(('block_height', False), plans[evm].inline)
+        self.assertNotIn(('alive', False), plans[subscribed].remote)
+        self.assertIn(('slots', True), plans[subscribed].inline)
+        self.assertIn(('alive', False), plans[polled].remote)
+        self.assertIn(('slots', True), plans[polled].remote)
+        self.prom_collector._scrape_plans = list(plans.items())
+        self.assertEqual(
+            sum(len(plan.remote) for plan in plans.values()),
+            self.prom_collector.get_thread_count())
+        self.assertEqual(
+            len(plans[polled].remote) - len(SolanaCollector.SUBSCRIPTION_INLINE_PROBES),
+            len(plans[subscribed].remote))
+
+    def test_collect_inline_probes_not_submitted(self):
+        """Tests that inline probes are called on the scrape thread and only
+        probes the collector supports are submitted to the executor"""
+        collector = mock.Mock(spec=['labels', 'interface', 'alive', 'heads_received'])
+        collector.labels = ['test1.com']
+        collector.interface = mock.Mock()
+        collector.heads_received.return_value = 3
+        self.prom_collector._collector_registry = [collector]
+        self.prom_collector._scrape_plans = self.prom_collector._build_scrape_plans()
+        with mock.patch('metrics.ThreadPoolExecutor') as thread_pool_mock:
+            list(self.prom_collector.collect())
+        thread_pool_mock.assert_called_once_with(max_workers=1)
+        thread_pool_mock.return_value.__enter__.return_value.submit.assert_called_once_with(
+            self.prom_collector._write_metric, collector,
+            self.mocked_loader.return_value.health_metric, 'alive')
+        self.mocked_loader.return_value.heads_received_metric.add_metric.assert_called_once_with(
+            ['test1.com'], 3)
 
     def test_collect_thread_max_workers(self):
         """Tests the max workers is correct for the collect threads"""
@@ -222,6 +652,155 @@ class TestPrometheusCustomCollector(TestCase):
             mocked_collector, mocked_metric, 'attr')
         mocked_metric.add_metric.assert_not_called()
 
+    def test_write_metric_records_probe_duration(self):
+        """Test that the duration of each probe is recorded per collector and attribute"""
+        mocked_collector = mock.Mock()
+        getattr(mocked_collector, 'attr').return_value = 20
+        self.prom_collector._write_metric(mocked_collector, mock.Mock(), 'attr')
+        buckets, _ = self.prom_collector._probe_durations[(mocked_collector, 'attr')].snapshot()
+        self.assertEqual(('+Inf', 1), buckets[-1])
+
+    def test_write_metric_exception_counted(self):
+        """Test that an exception raised by a probe is counted by type and not propagated"""
+        mocked_collector = mock.Mock()
+        mocked_metric = mock.Mock()
+        getattr(mocked_collector, 'attr').side_effect = ValueError
+        self.prom_collector._write_metric(
+            mocked_collector, mocked_metric, 'attr')
+        mocked_metric.add_metric.assert_not_called()
+        self.assertEqual([((mocked_collector, 'attr', 'ValueError'), 1)],
+                         self.prom_collector._probe_errors.items())
+        self.assertEqual(0, self.prom_collector._in_flight)
+
+    def test_write_labeled_metric(self):
+        """Test that a sample is written for every entry of a dict valued probe"""
+        mocked_collector = mock.Mock()
+        mocked_collector.labels = ['test1.com']
+        mocked_metric = mock.Mock()
+        getattr(mocked_collector, 'attr').return_value = {'processed': 12, 'finalized': 10}
+        self.prom_collector._write_labeled_metric(
+            mocked_collector, mocked_metric, 'attr')
+        mocked_metric.add_metric.assert_has_calls(
+            [mock.call(['test1.com', 'processed'], 12),
+             mock.call(['test1.com', 'finalized'], 10)])
+
+    def test_write_labeled_metric_no_value(self):
+        """Test that nothing is written when the probe returns no dict"""
+        mocked_collector = mock.Mock()
+        mocked_metric = mock.Mock()
+        getattr(mocked_collector, 'attr').return_value = None
+        self.prom_collector._write_labeled_metric(
+            mocked_collector, mocked_metric, 'attr')
+        mocked_metric.add_metric.assert_not_called()
+
+    def test_write_latency_distributions(self):
+        """Test that latency histograms and window quantiles are written per collector"""
+        collector = self.prom_collector._collector_registry[0]
+        collector.interface.latency_histogram = Histogram(buckets=(0.5,))
+        collector.interface.latency_histogram.observe(0.2)
+        collector.interface.latency_window = RollingWindow()
+        collector.interface.latency_window.observe(0.2)
+        collector.interface.rpc_latency_histogram = None
+        histogram_metric = mock.Mock()
+        quantile_metric = mock.Mock()
+        rpc_metric = mock.Mock()
+        self.prom_collector._write_latency_distributions(
+            histogram_metric, quantile_metric, rpc_metric)
+        rpc_metric.add_metric.assert_not_called()
+        histogram_metric.add_metric.assert_called_once_with(
+            ['test1.com'], [('0.5', 1), ('+Inf', 1)], 0.2)
+        quantile_metric.add_metric.assert_has_calls(
+            [mock.call(['test1.com', '0.5'], 0.2),
+             mock.call(['test1.com', '0.9'], 0.2),
+             mock.call(['test1.com', '0.99'], 0.2)])
+
+    def test_write_head_metrics(self):
+        """Test that propagation delays are written only for head subscriptions"""
+        first = self.prom_collector._collector_registry[0]
+        second = self.prom_collector._collector_registry[1]
+        first.interface.propagation_delay_histogram = Histogram(buckets=(0.5,))
+        first.interface.propagation_delay_histogram.observe(0.1)
+        first.interface.heads_first_seen = 3
+        first.interface.reorg_depth_histogram = Histogram(buckets=(1,))
+        first.interface.reorg_depth_histogram.observe(1)
+        first.interface.reorgs = 1
+        first.interface.head_arrival_delay_histogram = Histogram(buckets=(1,))
+        first.interface.head_arrival_delay_histogram.observe(0.5)
+        first.interface.head_age = 2.5
+        second.interface.propagation_delay_histogram = None
+        second.interface.reorg_depth_histogram = None
+        second.interface.head_arrival_delay_histogram = None
+        delay_metric = mock.Mock()
+        first_seen_metric = mock.Mock()
+        reorgs_metric = mock.Mock()
+        reorg_depth_metric = mock.Mock()
+        head_age_metric = mock.Mock()
+        arrival_delay_metric = mock.Mock()
+        self.prom_collector._write_head_metrics(delay_metric, first_seen_metric,
+                                                reorgs_metric, reorg_depth_metric,
+                                                head_age_metric, arrival_delay_metric)
+        delay_metric.add_metric.assert_called_once_with(
+            ['test1.com'], [('0.5', 1), ('+Inf', 1)], 0.1)
+        first_seen_metric.add_metric.assert_called_once_with(['test1.com'], 3)
+        reorgs_metric.add_metric.assert_called_once_with(['test1.com'], 1)
+        reorg_depth_metric.add_metric.assert_called_once_with(
+            ['test1.com'], [('1.0', 1), ('+Inf', 1)], 1)
+        head_age_metric.add_metric.assert_called_once_with(['test1.com'], 2.5)
+        arrival_delay_metric.add_metric.assert_called_once_with(
+            ['test1.com'], [('1.0', 1), ('+Inf', 1)], 0.5)
+
+    def test_write_connection_metrics(self):
+        """Test that stall and reconnect metrics are written for subscriptions"""
+        first = self.prom_collector._collector_registry[0]
+        second = self.prom_collector._collector_registry[1]
+        first.interface.stalls = 2
+        first.interface.block_interval = 0.25
+        first.interface.reconnect_attempts = 3
+        first.interface.reconnect_duration_histogram = Histogram(buckets=(1,))
+        first.interface.reconnect_duration_histogram.observe(0.5)
+        second.interface.stalls = None
+        block_interval_metric = mock.Mock()
+        stalls_metric = mock.Mock()
+        attempts_metric = mock.Mock()
+        duration_metric = mock.Mock()
+        self.prom_collector._write_connection_metrics(block_interval_metric, stalls_metric,
+                                                      attempts_metric, duration_metric)
+        block_interval_metric.add_metric.assert_called_once_with(['test1.com'], 0.25)
+        stalls_metric.add_metric.assert_called_once_with(['test1.com'], 2)
+        attempts_metric.add_metric.assert_called_once_with(['test1.com'], 3)
+        duration_metric.add_metric.assert_called_once_with(
+            ['test1.com'], [('1.0', 1), ('+Inf', 1)], 0.5)
+
+    def test_write_request_phases(self):
+        """Test that phase histograms and response sizes are written per https collector"""
+        collector = self.prom_collector._collector_registry[0]
+        collector.interface.phase_histograms = {'dns': Histogram(buckets=(0.5,))}
+        collector.interface.phase_histograms['dns'].observe(0.1)
+        collector.interface.response_size_histogram = Histogram(buckets=(1024,))
+        collector.interface.response_size_histogram.observe(100)
+        phase_metric = mock.Mock()
+        size_metric = mock.Mock()
+        self.prom_collector._write_request_phases(phase_metric, size_metric)
+        phase_metric.add_metric.assert_called_once_with(
+            ['test1.com', 'dns'], [('0.5', 1), ('+Inf', 1)], 0.1)
+        size_metric.add_metric.assert_called_once_with(
+            ['test1.com'], [('1024.0', 1), ('+Inf', 1)], 100)
+
+    def test_write_exporter_metrics_interface_counters(self):
+        """Test that interface request and error counters are written per collector"""
+        collector = self.prom_collector._collector_registry[0]
+        collector.interface.request_counter = LabeledCounter()
+        collector.interface.request_counter.inc('eth_blockNumber', 3)
+        collector.interface.error_counter = LabeledCounter()
+        collector.interface.error_counter.inc('ReadTimeout')
+        requests_metric = mock.Mock()
+        errors_metric = mock.Mock()
+        self.prom_collector._write_exporter_metrics(
+            mock.Mock(), mock.Mock(), requests_metric, errors_metric)
+        requests_metric.add_metric.assert_called_once_with(
+            ['test1.com', 'eth_blockNumber'], 3)
+        errors_metric.add_metric.assert_called_once_with(['test1.com', 'ReadTimeout'], 1)
+
     def test_collect_clears_cache_for_each_collector(self):
         """Tests that for each collector the cache is cleared"""
         # generator is added to a list to ensure it yields all results before assertion
@@ -0,0 +1,31 @@
+"""Test module for prepared requests"""
+import json
+from unittest import TestCase
+
+from prepared import PreparedRequest, prepare
+
+
+class TestPreparedRequest(TestCase):
+    """Tests requests encoded once"""
+
+    def setUp(self):
+        self.payload = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+        self.request = PreparedRequest(self.payload)
+
+    def test_body(self):
+        """Tests that the body is the compact JSON encoding of the payload"""
+        self.assertEqual(self.payload, json.loads(self.request.body))
+        self.assertEqual(self.request.text.encode('utf-8'), self.request.body)
+        self.assertNotIn(b' ', self.request.body)
+
+    def test_cache_key_stable(self):
+        """Tests that equal payloads share a cache key and different payloads do not"""
+        self.assertEqual(self.request.cache_key, PreparedRequest(dict(self.payload)).cache_key)
+        self.assertNotEqual(self.request.cache_key,
+                            PreparedRequest({**self.payload, "id": 2}).cache_key)
+        self.assertNotEqual(self.request.cache_key, PreparedRequest([self.payload]).cache_key)
+
+    def test_prepare(self):
+        """Tests that prepared requests are reused and plain payloads prepared"""
+        self.assertIs(self.request, prepare(self.request))
+        self.assertEqual(self.request.cache_key, prepare(self.payload).cache_key)
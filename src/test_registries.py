@@ -5,6 +5,7 @@ from structlog.testing import capture_logs
 
 
 from registries import Endpoint, EndpointRegistry, CollectorRegistry
+from specs import CompiledSpec
 
 
 class TestEndpoint(TestCase):  # pylint: disable=too-many-instance-attributes
@@ -36,6 +37,10 @@ class TestEndpoint(TestCase):  # pylint: disable=too-many-instance-attributes
         """Tests the chain_id attribute is set correctly"""
         self.assertEqual(self.chain_id, self.endpoint.chain_id)
 
+    def test_subscribe_url_attribute(self):
+        """Tests the subscribe_url attribute defaults to None"""
+        self.assertEqual(None, self.endpoint.subscribe_url)
+
     def test_labels_attribute(self):
         """Tests the labels attribute is set correctly"""
         labels = [self.url, self.provider, self.blockchain,
@@ -167,6 +172,40 @@ class TestCollectorRegistry(TestCase):
         with mock.patch('collectors.XRPLCollector', new=mock.Mock()) as collector:
             helper_test_collector_registry(self, collector)
 
+    @mock.patch.dict(os.environ, {
+        "CONFIG_FILE_PATH": "tests/fixtures/configuration_spec.yaml",
+        "VALIDATION_FILE_PATH": "tests/fixtures/validation.yaml"
+    })
+    def test_get_collector_registry_for_spec(self):
+        """Tests that the spec collectors are called with the correct args
+        and share one compiled spec"""
+        self.collector_registry = CollectorRegistry()
+        with mock.patch('collectors.SpecCollector', new=mock.Mock()) as collector:
+            self.collector_registry.get_collector_registry  # pylint: disable=pointless-statement
+        calls = collector.call_args_list
+        self.assertEqual(
+            [(item.url, item.labels, item.chain_id)
+             for item in self.collector_registry.get_endpoint_registry],
+            [call.args for call in calls])
+        spec = calls[0].kwargs.pop('spec')
+        self.assertIsInstance(spec, CompiledSpec)
+        self.assertIs(spec, calls[1].kwargs.pop('spec'))
+        self.assertEqual(['block_height', 'finalized_block_height', 'client_version', 'syncing'],
+                         list(spec.extractors))
+        for call in calls:
+            self.assertEqual(self.collector_registry.client_parameters, call.kwargs)
+
+    @mock.patch.dict(os.environ, {
+        "CONFIG_FILE_PATH": "tests/fixtures/configuration_spec_missing.yaml",
+        "VALIDATION_FILE_PATH": "tests/fixtures/validation.yaml"
+    })
+    def test_get_collector_registry_for_spec_without_spec_exit(self):
+        """Tests that the program exits when the spec collector has no collector_spec"""
+        with self.assertRaises(SystemExit) as raises_context:
+            self.collector_registry = CollectorRegistry()
+            self.collector_registry.get_collector_registry  # pylint: disable=pointless-statement
+        self.assertEqual(1, raises_context.exception.code)
+
     @mock.patch.dict(os.environ, {
         "CONFIG_FILE_PATH": "tests/fixtures/configuration_evm.yaml",
         "VALIDATION_FILE_PATH": "tests/fixtures/validation.yaml"
@@ -230,6 +269,8 @@ def helper_test_collector_registry(test_collector_registry, mock_collector):
         all(isinstance(col, mock.Mock) for col in collector_list))
     calls = []
     for item in test_collector_registry.collector_registry.get_endpoint_registry:
-        calls.append(mock.call(item.url, item.labels, item.chain_id,
-                     **test_collector_registry.collector_registry.client_parameters))
+        parameters = dict(test_collector_registry.collector_registry.client_parameters)
+        if item.subscribe_url is not None:
+            parameters['subscribe_url'] = item.subscribe_url
+        calls.append(mock.call(item.url, item.labels, item.chain_id, **parameters))
     mock_collector.assert_has_calls(calls, False)
@@ -0,0 +1,65 @@
+"""Test module for specs"""
+from unittest import TestCase
+
+from specs import compile_extractor, CompiledSpec
+
+
+class TestCompileExtractor(TestCase):
+    """Tests the compiled extraction functions"""
+
+    def test_path_and_transform(self):
+        """Tests that the value at path of the indexed result is converted"""
+        extract = compile_extractor(1, ['number'], 'hex')
+        self.assertEqual(16, extract([None, {"number": "0x10"}]))
+
+    def test_raw_result(self):
+        """Tests that a result without path or transform is returned as is"""
+        self.assertEqual("v1.0", compile_extractor(0, [], 'raw')(["v1.0"]))
+
+    def test_list_index_in_path(self):
+        """Tests that list items can be addressed by index"""
+        extract = compile_extractor(0, ['blocks', 0, 'height'], 'number')
+        self.assertEqual(5.0, extract([{"blocks": [{"height": "5"}]}]))
+
+    def test_bool(self):
+        """Tests that false and status objects are converted to 0 and 1"""
+        extract = compile_extractor(0, [], 'bool')
+        self.assertEqual(0, extract([False]))
+        self.assertEqual(1, extract([{"currentBlock": "0x1"}]))
+
+    def test_missing_or_invalid_returns_none(self):
+        """Tests that missing keys, failed requests and bad values return None"""
+        extract = compile_extractor(0, ['number'], 'hex')
+        self.assertEqual(None, extract([{}]))
+        self.assertEqual(None, extract([None]))
+        self.assertEqual(None, extract([{"number": "latest"}]))
+        self.assertEqual(None, extract([]))
+
+
+class TestCompiledSpec(TestCase):
+    """Tests compiling a collector spec"""
+
+    def setUp(self):
+        self.spec = CompiledSpec({'probes': {
+            'block_height': {'method': 'eth_getBlockByNumber', 'params': ['latest', False],
+                             'path': ['number'], 'transform': 'hex'},
+            'total_difficulty': {'method': 'eth_getBlockByNumber', 'params': ['latest', False],
+                                 'path': ['totalDifficulty'], 'transform': 'hex'},
+            'client_version': {'method': 'web3_clientVersion'}
+        }})
+
+    def test_payloads(self):
+        """Tests that probes asking for the same request share it in the batch"""
+        self.assertEqual([
+            {'jsonrpc': '2.0', 'method': 'eth_getBlockByNumber', 'params': ['latest', False],
+             'id': 1},
+            {'jsonrpc': '2.0', 'method': 'web3_clientVersion', 'params': [], 'id': 2}
+        ], self.spec.payloads)
+
+    def test_extractors(self):
+        """Tests that every probe extracts its value from the batch results"""
+        results = [{"number": "0x10", "totalDifficulty": "0x20"}, "geth/v1.14"]
+        self.assertEqual({'block_height': 16, 'total_difficulty': 32,
+                          'client_version': "geth/v1.14"},
+                         {probe: extract(results)
+                          for probe, extract in self.spec.extractors.items()})
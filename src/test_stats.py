@@ -0,0 +1,60 @@
+# pylint: disable=protected-access
+"""Test module for stats"""
+from unittest import TestCase
+
+from stats import Histogram, LabeledCounter, RollingWindow
+
+
+class TestHistogram(TestCase):
+    """Tests the histogram accumulator"""
+
+    def setUp(self):
+        self.histogram = Histogram(buckets=(0.5, 0.1, 1))
+
+    def test_empty_snapshot(self):
+        """Tests that an empty histogram has sorted zero buckets and +Inf"""
+        buckets, total = self.histogram.snapshot()
+        self.assertEqual([('0.1', 0), ('0.5', 0), ('1.0', 0), ('+Inf', 0)], buckets)
+        self.assertEqual(0.0, total)
+
+    def test_observe_cumulative_buckets(self):
+        """Tests that observations are counted cumulatively with inclusive bounds"""
+        for value in (0.05, 0.1, 0.3, 2):
+            self.histogram.observe(value)
+        buckets, total = self.histogram.snapshot()
+        self.assertEqual([('0.1', 2), ('0.5', 3), ('1.0', 3), ('+Inf', 4)], buckets)
+        self.assertAlmostEqual(2.45, total)
+
+
+class TestLabeledCounter(TestCase):
+    """Tests the labeled counter accumulator"""
+
+    def test_inc(self):
+        """Tests that counts are tracked per key"""
+        counter = LabeledCounter()
+        counter.inc('a')
+        counter.inc('a', 2)
+        counter.inc(('b', 'c'))
+        self.assertEqual({'a': 3, ('b', 'c'): 1}, dict(counter.items()))
+
+
+class TestRollingWindow(TestCase):
+    """Tests the rolling window accumulator"""
+
+    def test_empty_quantiles(self):
+        """Tests that no quantiles are returned before the first observation"""
+        self.assertEqual({}, RollingWindow().quantiles())
+
+    def test_quantiles_nearest_rank(self):
+        """Tests that quantiles use the nearest rank of the observations"""
+        window = RollingWindow(size=100)
+        for value in range(100, 0, -1):
+            window.observe(value)
+        self.assertEqual({0.5: 50, 0.9: 90, 0.99: 99}, window.quantiles())
+
+    def test_oldest_values_evicted(self):
+        """Tests that the window only keeps the most recent observations"""
+        window = RollingWindow(size=2)
+        for value in (100, 1, 2):
+            window.observe(value)
+        self.assertEqual({1.0: 2}, window.quantiles((1.0,)))
@@ -0,0 +1,141 @@
+"""Module providing sample node responses shared by the tests."""
+import json
+import tracemalloc
+
+
+def peak_memory(function):
+    """Returns peak traced memory allocated while running function."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def filecoin_tipset(blocks):
+    """Returns a Filecoin.ChainHead response with realistically sized block headers."""
+    def cid(index):
+        return {"/": f"bafy2bzaced{index:0>52}"}
+
+    def proof(size):
+        return "q" * (size * 4 // 3)
+
+    headers = [{
+        "Miner": f"f0{1000 + index}",
+        "Ticket": {"VRFProof": proof(96)},
+        "ElectionProof": {"WinCount": 1, "VRFProof": proof(96)},
+        "BeaconEntries": [{"Round": 3000000, "Data": proof(96)}],
+        "WinPoStProof": [{"PoStProof": 3, "ProofBytes": proof(192)}],
+        "Parents": [cid(parent) for parent in range(5)],
+        "ParentWeight": "89765432123456",
+        "Height": 3400000,
+        "ParentStateRoot": cid(index),
+        "ParentMessageReceipts": cid(index),
+        "Messages": cid(index),
+        "BLSAggregate": {"Type": 2, "Data": proof(96)},
+        "Timestamp": 1700000000,
+        "BlockSig": {"Type": 2, "Data": proof(96)},
+        "ForkSignaling": 0,
+        "ParentBaseFee": "100"
+    } for index in range(blocks)]
+    return json.dumps({"jsonrpc": "2.0", "result": {
+        "Cids": [cid(index) for index in range(blocks)],
+        "Blocks": headers,
+        "Height": 3400001
+    }, "id": 1})
+
+
+def evm_block():
+    """Returns an eth_getBlockByNumber response with 150 transaction hashes."""
+    return json.dumps({"jsonrpc": "2.0", "id": 5, "result": {
+        "number": "0x12a05f2", "hash": "0x" + "ab" * 32, "parentHash": "0x" + "cd" * 32,
+        "timestamp": "0x65a1b2c3", "gasUsed": "0x1c9c380", "gasLimit": "0x1c9c380",
+        "baseFeePerGas": "0x3b9aca00", "miner": "0x" + "11" * 20,
+        "logsBloom": "0x" + "00" * 256, "extraData": "0x" + "ee" * 32,
+        "transactions": ["0x" + f"{index:064x}" for index in range(150)]
+    }})
+
+
+def bitcoin_batch():
+    """Returns a getnetworkinfo, getchaintips, getmempoolinfo and getblockchaininfo batch."""
+    return json.dumps([
+        {"result": {"version": 270000, "subversion": "/Satoshi:27.0.0/", "connections": 10},
+         "error": None, "id": "getnetworkinfo"},
+        {"result": [{"height": 840000 - index, "hash": f"{index:064x}", "branchlen": index,
+                     "status": "valid-fork" if index else "active"} for index in range(20)],
+         "error": None, "id": "getchaintips"},
+        {"result": {"size": 50000, "bytes": 30000000, "usage": 150000000},
+         "error": None, "id": "getmempoolinfo"},
+        {"result": {"chain": "main", "blocks": 840000, "headers": 840000,
+                    "difficulty": 86388558925171.02, "initialblockdownload": False,
+                    "chainwork": "0" * 40 + "7b" * 12},
+         "error": None, "id": "getblockchaininfo"}
+    ])
+
+
+def solana_batch():
+    """Returns a getVersion, getBlockHeight, getHealth and getSlot batch."""
+    return json.dumps([
+        {"jsonrpc": "2.0", "result": {"solana-core": "1.18.15", "feature-set": 4215500110},
+         "id": "getVersion"},
+        {"jsonrpc": "2.0", "result": 250000000, "id": "getBlockHeight"},
+        {"jsonrpc": "2.0", "result": "ok", "id": "getHealth"}
+    ] + [{"jsonrpc": "2.0", "result": 270000000 - index, "id": f"getSlot:{commitment}"}
+         for index, commitment in enumerate(('processed', 'confirmed', 'finalized'))])
+
+
+def starknet_block():
+    """Returns a starknet_getBlockWithTxHashes response with 200 transactions."""
+    return json.dumps({"jsonrpc": "2.0", "id": "starknet_getBlockWithTxHashes", "result": {
+        "status": "ACCEPTED_ON_L2", "block_number": 650000, "timestamp": 1718000000,
+        "block_hash": "0x" + "12" * 31, "parent_hash": "0x" + "34" * 31,
+        "sequencer_address": "0x" + "56" * 31, "starknet_version": "0.13.1",
+        "l1_gas_price": {"price_in_fri": "0x1", "price_in_wei": "0x2"},
+        "transactions": ["0x" + f"{index:062x}" for index in range(200)]
+    }})
+
+
+def aptos_ledger():
+    """Returns the ledger information of the Aptos REST API."""
+    return json.dumps({
+        "chain_id": 1, "epoch": "7000", "ledger_version": "1000000000",
+        "oldest_ledger_version": "900000000", "ledger_timestamp": "1718000000000000",
+        "node_role": "full_node", "oldest_block_height": "300000000",
+        "block_height": "350000000", "git_hash": "a" * 40
+    })
+
+
+def xrpl_server_info():
+    """Returns an XRPL server_info response."""
+    return json.dumps({"result": {"status": "success", "info": {
+        "build_version": "2.2.0", "server_state": "full", "peers": 21,
+        "complete_ledgers": "32570-88000000",
+        "validated_ledger": {"seq": 88000000, "age": 2, "hash": "F" * 64,
+                             "base_fee_xrp": 1e-05, "reserve_base_xrp": 10},
+        "state_accounting": {state: {"duration_us": "1000", "transitions": "1"}
+                             for state in ("connected", "disconnected", "full", "syncing")}
+    }}})
+
+
+def conflux_notification():
+    """Returns a Conflux newHeads notification."""
+    return json.dumps({"jsonrpc": "2.0", "method": "cfx_subscription", "params": {
+        "subscription": "0x" + "9" * 16, "result": {
+            "height": "0x5f5e100", "epochNumber": "0x5f5e100", "hash": "0x" + "ab" * 32,
+            "timestamp": "0x65a1b2c3", "refereeHashes": ["0x" + "cd" * 32] * 3,
+            "deferredStateRoot": "0x" + "ef" * 32, "powQuality": "0x1a2b3c"
+        }}})
+
+
+# Responses of each chain by collector.
+PAYLOADS = {
+    'evm': evm_block,
+    'bitcoin': bitcoin_batch,
+    'solana': solana_batch,
+    'starknet': starknet_block,
+    'aptos': aptos_ledger,
+    'xrpl': xrpl_server_info,
+    'conflux': conflux_notification,
+    'filecoin': lambda: filecoin_tipset(5)
+}